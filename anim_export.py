@@ -0,0 +1,172 @@
+"""
+HEADLESS ANIMATION EXPORT
+- Opens every .blend file (a single file or all files of a directory) in one `blender -b` session
+- Bakes every action of each rig once to the deform bones (control and helper bones are skipped)
+- glb: one file per rig, mesh + skin shared by all clips, one glTF animation per action
+- bvh: one file per action, joints renamed to Bento names with the preset's name map
+- anim: one SL .anim per action, Bento names, quantized keys reduced to the tolerance
+
+Usage (plain Python, Blender on PATH or via --blender, or directly with blender -b --python):
+    python anim_export.py FILE_OR_DIR --output export_dir
+    python anim_export.py FILE_OR_DIR --output export_dir --format glb --step 2 --tolerance 0.001
+    python anim_export.py FILE_OR_DIR --output export_dir --format bvh --preset BENTO_FULL --skeleton-offsets
+    python anim_export.py FILE_OR_DIR --output export_dir --format anim --priority 4 --loop
+
+Exit code: 0 success, 1 error.
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import subprocess
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_NAME = os.path.basename(ADDON_DIR)
+FORMATS = ("glb", "bvh", "anim")
+
+
+# ------------------------------------------------------------------------
+# ARGUMENTS
+# ------------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless export of all rig actions")
+    parser.add_argument("input", help=".blend file or directory")
+    parser.add_argument("--output", default="anim_export", help="Output directory")
+    parser.add_argument("--format", default="glb", choices=FORMATS, help="Output format")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable")
+    parser.add_argument("--armature", default="", help="Only this armature (default: every armature with actions)")
+    parser.add_argument("--step", type=int, default=1, help="Sample every n-th frame")
+    parser.add_argument("--tolerance", type=float, default=0.0005, help="Key reduction tolerance (0 = off)")
+    parser.add_argument("--preset", default="BENTO_FULL", help="Bone mapping preset for the Bento names")
+    parser.add_argument("--skeleton-offsets", action="store_true", help="BVH offsets from avatar_skeleton.xml")
+    parser.add_argument("--priority", type=int, default=3, help=".anim priority (0-6)")
+    parser.add_argument("--loop", action="store_true", help=".anim loops over the whole clip")
+    return parser
+
+
+# ------------------------------------------------------------------------
+# WORKER (runs inside Blender)
+# ------------------------------------------------------------------------
+def enable_addon():
+    import addon_utils
+
+    addon_parent = os.path.dirname(ADDON_DIR)
+    if addon_parent not in sys.path:
+        sys.path.insert(0, addon_parent)
+    addon_utils.enable(ADDON_NAME, default_set=True)
+
+
+def find_blend_files(path):
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names if name.lower().endswith(".blend"))
+    return sorted(files)
+
+
+def export_glb(armature, filepath, args):
+    gltf_writer = importlib.import_module(ADDON_NAME + ".lib.gltf_writer")
+    return gltf_writer.export(bpy.context, armature, filepath + ".glb", step=args.step, tolerance=args.tolerance)
+
+
+def bento_name_map(armature, args):
+    addon = importlib.import_module(ADDON_NAME + ".mixamo_rename_opensim")
+    prefix = addon.bone_map.detect_prefix([bone.name for bone in armature.data.bones])
+    return addon.bone_map.compile_name_map(addon.PRESETS[args.preset], prefix)
+
+
+def export_bvh(armature, filepath, args):
+    addon = importlib.import_module(ADDON_NAME + ".mixamo_rename_opensim")
+    bvh_writer = importlib.import_module(ADDON_NAME + ".lib.bvh_writer")
+    reference = addon.bone_fix.Skeleton.from_xml(addon.SKELETON_FILE) if args.skeleton_offsets else None
+    os.makedirs(filepath, exist_ok=True)
+    return bvh_writer.export(bpy.context, armature, filepath, name_map=bento_name_map(armature, args),
+                             reference=reference, step=args.step)
+
+
+def export_anim(armature, filepath, args):
+    addon = importlib.import_module(ADDON_NAME + ".mixamo_rename_opensim")
+    anim_writer = importlib.import_module(ADDON_NAME + ".lib.anim_writer")
+    joint_names = set(addon.bone_fix.Skeleton.from_xml(addon.SKELETON_FILE).names)
+    os.makedirs(filepath, exist_ok=True)
+    return anim_writer.export(bpy.context, armature, filepath, name_map=bento_name_map(armature, args),
+                              joint_names=joint_names, step=args.step, tolerance=args.tolerance,
+                              position_tolerance=args.tolerance, priority=args.priority, loop=args.loop)
+
+
+EXPORTERS = {"glb": export_glb, "bvh": export_bvh, "anim": export_anim}
+
+
+def export_file(filepath, args):
+    anim_bake = importlib.import_module(ADDON_NAME + ".lib.anim_bake")
+    result = {"file": filepath, "exports": []}
+    t0 = time.perf_counter()
+    try:
+        bpy.ops.wm.open_mainfile(filepath=filepath, load_ui=False)
+        base = os.path.splitext(os.path.basename(filepath))[0]
+        for armature in [o for o in bpy.context.scene.objects if o.type == 'ARMATURE']:
+            if args.armature and armature.name != args.armature:
+                continue
+            if not anim_bake.rig_actions(armature) or not len(anim_bake.DeformSkeleton(armature)):
+                continue
+            target = os.path.join(args.output, f"{base}_{armature.name}")
+            stats = EXPORTERS[args.format](armature, target, args)
+            result["exports"].append(dict(armature=armature.name, **stats))
+    except Exception as e:
+        result["error"] = str(e)
+    result["time"] = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def run_worker(args):
+    enable_addon()
+    os.makedirs(args.output, exist_ok=True)
+
+    results = [export_file(f, args) for f in find_blend_files(args.input)]
+    for r in results:
+        for e in r["exports"]:
+            print(f"  OK     {os.path.basename(r['file'])}: {e['armature']} {e.get('clips', 0)} clips, "
+                  f"{e['bytes'] / 1024:.1f} KB in {e['time']:.2f}s")
+        if "error" in r:
+            print(f"  ERROR  {os.path.basename(r['file'])}: {r['error']}")
+    print(f"{sum(len(r['exports']) for r in results)} exports from {len(results)} files")
+    return 1 if any("error" in r for r in results) else 0
+
+
+# ------------------------------------------------------------------------
+# LAUNCHER (plain Python)
+# ------------------------------------------------------------------------
+def launch_blender(args):
+    cmd = [args.blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--"]
+    cmd += [os.path.abspath(args.input), "--output", os.path.abspath(args.output), "--format", args.format]
+    if args.armature:
+        cmd += ["--armature", args.armature]
+    cmd += ["--step", str(args.step), "--tolerance", str(args.tolerance), "--preset", args.preset]
+    if args.skeleton_offsets:
+        cmd.append("--skeleton-offsets")
+    cmd += ["--priority", str(args.priority)]
+    if args.loop:
+        cmd.append("--loop")
+    return subprocess.run(cmd).returncode
+
+
+def main(argv):
+    args = build_parser().parse_args(argv)
+    if bpy is None:
+        return launch_blender(args)
+    return run_worker(args)
+
+
+if __name__ == "__main__":
+    # inside Blender the script arguments follow "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    code = main(argv)
+    sys.exit(code)
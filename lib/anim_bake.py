@@ -0,0 +1,252 @@
+import bpy
+import numpy as np
+
+# Baking of the control rig down to the deform bones, as NumPy arrays:
+# one frame_set per frame, all pose matrices read with one foreach_get, everything else vectorized.
+# Matrices are (..., 4, 4) row-major, in armature space unless noted; a skeleton built with world=True
+# bakes in world space instead (object transform of the armature included, per frame).
+
+CTRL_PREFIX = "Ctrl_"
+
+
+def is_helper(bone):
+    # control rig bones: tagged controllers, Ctrl_ names, and every non-deforming bone (MCH helpers)
+    return not bone.use_deform or "mixamo_ctrl" in bone.keys() or bone.name.startswith(CTRL_PREFIX)
+
+
+class DeformSkeleton:
+    # deform bones of an armature, parent = nearest deforming ancestor, parents before children
+
+    def __init__(self, armature, names=None, world=False):
+        bones = armature.data.bones
+        if names is None:
+            names = [b.name for b in bones if not is_helper(b)]
+        wanted = set(names)
+
+        self.names = []
+        self.parent = []
+        index = {}
+
+        def visit(bone, parent_index):
+            if bone.name in wanted:
+                index[bone.name] = len(self.names)
+                self.names.append(bone.name)
+                self.parent.append(parent_index)
+                parent_index = index[bone.name]
+            for child in bone.children:
+                visit(child, parent_index)
+
+        for bone in bones:
+            if bone.parent is None:
+                visit(bone, -1)
+
+        self.parent = np.array(self.parent, dtype=np.int64)
+        self.index = index
+
+        all_names = [b.name for b in bones]
+        rest = read_matrices(bones, "matrix_local")
+        self.bone_rows = np.array([all_names.index(n) for n in self.names], dtype=np.int64)
+        self.rest = rest[self.bone_rows]
+        # formats without an object transform of their own (BVH, .anim) get the rest pose in world space
+        self.world = world
+        if world:
+            self.rest = np.array(armature.matrix_world, dtype=np.float64) @ self.rest
+
+        pose_names = [pb.name for pb in armature.pose.bones]
+        pose_index = {n: i for i, n in enumerate(pose_names)}
+        self.pose_rows = np.array([pose_index[n] for n in self.names], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def rest_local(self):
+        return parent_relative(self.rest, self.parent)
+
+    def roots(self):
+        return np.flatnonzero(self.parent < 0)
+
+
+def read_matrices(collection, attr):
+    # foreach_get returns Blender's column-major 4x4 layout, transposed to row-major
+    buf = np.empty(len(collection) * 16, dtype=np.float32)
+    collection.foreach_get(attr, buf)
+    return buf.reshape(-1, 4, 4).transpose(0, 2, 1).astype(np.float64)
+
+
+def parent_relative(matrices, parent):
+    # (..., B, 4, 4) armature space -> relative to the parent bone (roots unchanged)
+    local = matrices.copy()
+    child = np.flatnonzero(parent >= 0)
+    if child.size:
+        local[..., child, :, :] = np.linalg.inv(matrices[..., parent[child], :, :]) @ matrices[..., child, :, :]
+    return local
+
+
+class BakedClip:
+    # armature-space pose matrices of the deform bones, one row per sampled frame
+
+    def __init__(self, name, frames, fps, matrices, skeleton):
+        self.name = name
+        self.frames = np.asarray(frames, dtype=np.float64)
+        self.fps = fps
+        self.matrices = matrices
+        self.skeleton = skeleton
+
+    @property
+    def times(self):
+        return (self.frames - self.frames[0]) / self.fps
+
+    @property
+    def num_frames(self):
+        return len(self.frames)
+
+    def local(self):
+        # parent-relative pose matrices, (F, B, 4, 4)
+        return parent_relative(self.matrices, self.skeleton.parent)
+
+    def rest_deltas(self):
+        # rotations from the rest pose as seen by formats whose joints rest axis-aligned (BVH, SL .anim):
+        # armature-space delta of every bone, relative to its parent's delta, (F, B, 3, 3)
+        rest = self.skeleton.rest[:, :3, :3]
+        rest = rest / np.linalg.norm(rest, axis=-2, keepdims=True)
+        pose = self.matrices[..., :3, :3]
+        pose = pose / np.linalg.norm(pose, axis=-2, keepdims=True)
+        delta = pose @ np.swapaxes(rest, -1, -2)
+        local = delta.copy()
+        parent = self.skeleton.parent
+        child = np.flatnonzero(parent >= 0)
+        local[:, child] = np.swapaxes(delta[:, parent[child]], -1, -2) @ delta[:, child]
+        return local
+
+    def root_offsets(self):
+        # head positions relative to the rest pose, (F, B, 3)
+        return self.matrices[..., :3, 3] - self.skeleton.rest[:, :3, 3]
+
+
+def action_frame_range(action):
+    start, end = action.frame_range
+    return int(np.floor(start)), int(np.ceil(end))
+
+
+def rig_actions(armature):
+    # actions animating bones of this armature
+    bone_paths = tuple(f'pose.bones["{b.name}"]' for b in armature.data.bones)
+    actions = []
+    for action in bpy.data.actions:
+        fcurves = getattr(action, "fcurves", None) or []
+        if any(fc.data_path.startswith(bone_paths) for fc in fcurves):
+            actions.append(action)
+    return actions
+
+
+def bake_action(scene, armature, action, skeleton, step=1, frame_range=None):
+    # evaluates the whole rig (constraints, IK, drivers) per frame and keeps the deform bones
+    anim = armature.animation_data_create()
+    old_action, old_frame = anim.action, scene.frame_current
+    start, end = frame_range or action_frame_range(action)
+    frames = np.arange(start, end + 1, step)
+
+    matrices = np.empty((len(frames), len(skeleton), 4, 4), dtype=np.float64)
+    pose_bones = armature.pose.bones
+    buf = np.empty(len(pose_bones) * 16, dtype=np.float32)
+    try:
+        anim.action = action
+        for i, frame in enumerate(frames.tolist()):
+            scene.frame_set(frame)
+            pose_bones.foreach_get("matrix", buf)
+            matrices[i] = buf.reshape(-1, 4, 4)[skeleton.pose_rows].transpose(0, 2, 1)
+            if skeleton.world:
+                matrices[i] = np.array(armature.matrix_world, dtype=np.float64) @ matrices[i]
+    finally:
+        anim.action = old_action
+        scene.frame_set(old_frame)
+
+    fps = scene.render.fps / scene.render.fps_base
+    return BakedClip(action.name, frames, fps, matrices, skeleton)
+
+
+# ----------  Decomposition  ----------
+def quaternion_from_matrix(rot):
+    # (..., 3, 3) pure rotations -> (..., 4) quaternions w, x, y, z (Shepperd's method, branch per element)
+    m = rot
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    q = np.empty(rot.shape[:-2] + (4,), dtype=np.float64)
+
+    c0 = trace > 0.0
+    c1 = ~c0 & (m[..., 0, 0] >= m[..., 1, 1]) & (m[..., 0, 0] >= m[..., 2, 2])
+    c2 = ~c0 & ~c1 & (m[..., 1, 1] >= m[..., 2, 2])
+    c3 = ~c0 & ~c1 & ~c2
+
+    s = np.sqrt(np.maximum(trace[c0] + 1.0, 1e-12)) * 2.0
+    q[c0] = np.stack([0.25 * s, (m[c0][:, 2, 1] - m[c0][:, 1, 2]) / s,
+                      (m[c0][:, 0, 2] - m[c0][:, 2, 0]) / s, (m[c0][:, 1, 0] - m[c0][:, 0, 1]) / s], axis=-1)
+    mc = m[c1]
+    s = np.sqrt(np.maximum(1.0 + mc[:, 0, 0] - mc[:, 1, 1] - mc[:, 2, 2], 1e-12)) * 2.0
+    q[c1] = np.stack([(mc[:, 2, 1] - mc[:, 1, 2]) / s, 0.25 * s,
+                      (mc[:, 0, 1] + mc[:, 1, 0]) / s, (mc[:, 0, 2] + mc[:, 2, 0]) / s], axis=-1)
+    mc = m[c2]
+    s = np.sqrt(np.maximum(1.0 + mc[:, 1, 1] - mc[:, 0, 0] - mc[:, 2, 2], 1e-12)) * 2.0
+    q[c2] = np.stack([(mc[:, 0, 2] - mc[:, 2, 0]) / s, (mc[:, 0, 1] + mc[:, 1, 0]) / s,
+                      0.25 * s, (mc[:, 1, 2] + mc[:, 2, 1]) / s], axis=-1)
+    mc = m[c3]
+    s = np.sqrt(np.maximum(1.0 + mc[:, 2, 2] - mc[:, 0, 0] - mc[:, 1, 1], 1e-12)) * 2.0
+    q[c3] = np.stack([(mc[:, 1, 0] - mc[:, 0, 1]) / s, (mc[:, 0, 2] + mc[:, 2, 0]) / s,
+                      (mc[:, 1, 2] + mc[:, 2, 1]) / s, 0.25 * s], axis=-1)
+
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def continuous(quats, axis=0):
+    # flip signs along the time axis so neighbouring keys take the short path
+    q = np.moveaxis(quats, axis, 0).copy()
+    for i in range(1, len(q)):
+        flip = np.sum(q[i] * q[i - 1], axis=-1) < 0.0
+        q[i][flip] *= -1.0
+    return np.moveaxis(q, 0, axis)
+
+
+def decompose(matrices):
+    # (..., 4, 4) -> translation (..., 3), rotation w,x,y,z (..., 4), scale (..., 3)
+    translation = matrices[..., :3, 3].copy()
+    basis = matrices[..., :3, :3]
+    scale = np.linalg.norm(basis, axis=-2)
+    rot = basis / np.maximum(scale[..., None, :], 1e-12)
+    # mirrored bases: negative scale on X keeps the rotation proper
+    negative = np.linalg.det(rot) < 0.0
+    scale[negative, 0] *= -1.0
+    rot[negative, :, 0] *= -1.0
+    return translation, quaternion_from_matrix(rot), scale
+
+
+# ----------  Key reduction  ----------
+def reduce_keys(values, tolerance):
+    # Ramer-Douglas-Peucker over time: indices of the keys to keep so that linear interpolation
+    # between them stays within tolerance (max abs error over all components) of every sample
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    n = len(values)
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        t = (np.arange(a + 1, b) - a) / (b - a)
+        line = values[a] + t[:, None] * (values[b] - values[a])
+        error = np.abs(values[a + 1:b] - line).max(axis=1)
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            split = a + 1 + worst
+            keep[split] = True
+            stack.append((a, split))
+            stack.append((split, b))
+    return np.flatnonzero(keep)
+
+
+def is_constant(values, tolerance):
+    values = np.asarray(values).reshape(len(values), -1)
+    return bool(np.all(np.abs(values - values[0]) <= tolerance))
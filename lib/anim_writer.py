@@ -0,0 +1,144 @@
+import os, re, struct, time
+import numpy as np
+from .anim_bake import DeformSkeleton, bake_action, quaternion_from_matrix, reduce_keys, rig_actions
+from .bone_fix import SL_TO_BLENDER
+
+# SL keyframe motion (.anim), version 1.0: per joint quantized U16 rotation (x, y, z of a unit
+# quaternion with w >= 0) and position keys; times quantized over the clip duration
+VERSION = 1
+SUB_VERSION = 0
+U16_MAX = 65535
+MAX_PELVIS_OFFSET = 5.0
+MAX_DURATION = 60.0
+SIZE_LIMIT = 250000
+MAX_PASSES = 8
+
+BLENDER_TO_SL = SL_TO_BLENDER.T
+
+HAND_POSES = ('SPREAD', 'RELAXED', 'POINT', 'FIST', 'RELAXED_L', 'POINT_L', 'FIST_L',
+              'RELAXED_R', 'POINT_R', 'FIST_R', 'SALUTE_R', 'TYPING', 'PEACE_R', 'PALM_R')
+
+
+def quantize(values, lower, upper):
+    values = (np.clip(values, lower, upper) - lower) / (upper - lower)
+    return np.floor(values * U16_MAX + 0.5).astype(np.uint16)
+
+
+class JointTrack:
+    # keys of one joint after reduction: times in seconds, rotations (x, y, z), positions
+
+    def __init__(self, name, priority, rot_times, rotations, pos_times=None, positions=None):
+        self.name = name
+        self.priority = priority
+        self.rot_times = rot_times
+        self.rotations = rotations
+        self.pos_times = np.zeros(0) if pos_times is None else pos_times
+        self.positions = np.zeros((0, 3)) if positions is None else positions
+
+
+def joint_curves(clip):
+    # rest-relative local rotations as quaternions x, y, z (w >= 0 implied) and root offsets, SL axes
+    local = BLENDER_TO_SL @ clip.rest_deltas() @ BLENDER_TO_SL.T
+    quats = quaternion_from_matrix(local)
+    # the format drops w: every key must sit on the w >= 0 half
+    quats = np.where(quats[..., :1] < 0.0, -quats, quats)
+    offsets = clip.root_offsets() @ BLENDER_TO_SL.T
+    return quats[..., 1:], offsets
+
+
+def build_tracks(clip, names, joints, priority, tolerance, position_tolerance):
+    # error-bounded reduction per joint; unchanged joints are left to lower priority motions
+    rotations, offsets = joint_curves(clip)
+    times = clip.times
+    parent = clip.skeleton.parent
+    tracks = []
+    for b in joints:
+        rot = rotations[:, b]
+        has_pos = parent[b] < 0 and np.abs(offsets[:, b]).max() > position_tolerance
+        if np.abs(rot).max() <= tolerance and not has_pos:
+            continue
+        keys = reduce_keys(rot, tolerance)
+        track = JointTrack(names[b], priority, times[keys], rot[keys])
+        if has_pos:
+            pos = offsets[:, b]
+            keys = reduce_keys(pos, position_tolerance)
+            track.pos_times, track.positions = times[keys], pos[keys]
+        tracks.append(track)
+    return tracks
+
+
+def encode(tracks, duration, priority=3, loop=False, loop_in=0.0, loop_out=None, ease_in=0.3, ease_out=0.3,
+           hand_pose='RELAXED', emote=""):
+    duration = max(duration, 1e-3)
+    loop_out = duration if loop_out is None else loop_out
+    parts = [struct.pack("<HHif", VERSION, SUB_VERSION, priority, duration),
+             emote.encode("utf-8") + b"\0",
+             struct.pack("<ffiffII", loop_in, loop_out, int(loop), ease_in, ease_out,
+                         HAND_POSES.index(hand_pose), len(tracks))]
+    for track in tracks:
+        parts.append(track.name.encode("utf-8") + b"\0")
+        parts.append(struct.pack("<ii", track.priority, len(track.rot_times)))
+        keys = np.empty((len(track.rot_times), 4), dtype="<u2")
+        keys[:, 0] = quantize(track.rot_times, 0.0, duration)
+        keys[:, 1:] = quantize(track.rotations, -1.0, 1.0)
+        parts.append(keys.tobytes())
+        parts.append(struct.pack("<i", len(track.pos_times)))
+        keys = np.empty((len(track.pos_times), 4), dtype="<u2")
+        keys[:, 0] = quantize(track.pos_times, 0.0, duration)
+        keys[:, 1:] = quantize(track.positions, -MAX_PELVIS_OFFSET, MAX_PELVIS_OFFSET)
+        parts.append(keys.tobytes())
+    # no constraints
+    parts.append(struct.pack("<i", 0))
+    return b"".join(parts)
+
+
+def clip_filename(action_name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", action_name) + ".anim"
+
+
+def write_clip(filepath, clip, names, joints, tolerance=0.001, position_tolerance=0.001,
+               size_limit=SIZE_LIMIT, **settings):
+    # tolerances are doubled until the clip fits the upload limit
+    duration = float(clip.times[-1]) if clip.num_frames > 1 else 1.0 / clip.fps
+    for _ in range(MAX_PASSES):
+        tracks = build_tracks(clip, names, joints, settings.get('priority', 3), tolerance, position_tolerance)
+        data = encode(tracks, duration, **settings)
+        if len(data) <= size_limit:
+            break
+        tolerance *= 2.0
+        position_tolerance *= 2.0
+    with open(filepath, "wb") as f:
+        f.write(data)
+    return {'bytes': len(data), 'joints': len(tracks), 'keys': sum(len(t.rot_times) + len(t.pos_times) for t in tracks),
+            'tolerance': tolerance, 'fits': len(data) <= size_limit, 'duration': duration}
+
+
+def export(context, armature, directory, actions=None, name_map=None, joint_names=None, step=1,
+           tolerance=0.001, position_tolerance=0.001, size_limit=SIZE_LIMIT, filenames=None, **settings):
+    # one .anim per action; joint_names: SL joints to keep (after renaming), None = all deform bones
+    t0 = time.perf_counter()
+    actions = rig_actions(armature) if actions is None else list(actions)
+    # world space: pelvis offsets in meters even with an unapplied object transform
+    skeleton = DeformSkeleton(armature, world=True)
+    name_map = name_map or {}
+    names = [name_map.get(n, n) for n in skeleton.names]
+    joints = [b for b, n in enumerate(names) if joint_names is None or n in joint_names]
+    stats = {'clips': 0, 'frames': 0, 'keys': 0, 'bytes': 0, 'joints': len(joints), 'files': [],
+             'too_large': [], 'too_long': []}
+
+    for i, action in enumerate(actions):
+        clip = bake_action(context.scene, armature, action, skeleton, step)
+        filepath = os.path.join(directory, filenames[i] if filenames else clip_filename(action.name))
+        result = write_clip(filepath, clip, names, joints, tolerance, position_tolerance, size_limit, **settings)
+        stats['clips'] += 1
+        stats['frames'] += clip.num_frames
+        stats['keys'] += result['keys']
+        stats['bytes'] += result['bytes']
+        stats['files'].append(filepath)
+        if not result['fits']:
+            stats['too_large'].append(action.name)
+        if result['duration'] > MAX_DURATION:
+            stats['too_long'].append(action.name)
+
+    stats['time'] = time.perf_counter() - t0
+    return stats
@@ -0,0 +1,242 @@
+import xml.etree.ElementTree as ET
+import numpy as np
+
+# avatar_skeleton.xml: X forward, Y left, Z up; Blender rigs face -Y with the character's left at +X
+SL_TO_BLENDER = np.array([[0.0, 1.0, 0.0],
+                          [-1.0, 0.0, 0.0],
+                          [0.0, 0.0, 1.0]])
+
+CONNECT_TOLERANCE = 0.001
+FALLBACK_LENGTH = 0.05
+
+
+class Skeleton:
+    # reference skeleton: names, parent index, pos offsets (relative to the parent) and end vectors
+
+    def __init__(self, names, parent, pos, end):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.pos = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+        self.end = np.asarray(end, dtype=np.float64).reshape(-1, 3)
+        self.head = accumulate(self.parent, self.pos)
+
+    @classmethod
+    def from_xml(cls, filepath):
+        names, parent, pos, end = [], [], [], []
+
+        def visit(elem, parent_index):
+            index = len(names)
+            names.append(elem.get('name'))
+            parent.append(parent_index)
+            pos.append([float(x) for x in elem.get('pos', "0 0 0").split()])
+            end.append([float(x) for x in elem.get('end', "0 0 0.05").split()])
+            for child in elem.findall('bone'):
+                visit(child, index)
+
+        for elem in ET.parse(filepath).getroot().findall('bone'):
+            visit(elem, -1)
+
+        # converted to Blender axes once, all later math is in armature space
+        return cls(names, parent, np.array(pos) @ SL_TO_BLENDER.T, np.array(end) @ SL_TO_BLENDER.T)
+
+    @property
+    def tail(self):
+        return self.head + self.end
+
+
+def accumulate(parent, offsets):
+    # world position = sum of the offsets along the path to the root, by pointer jumping:
+    # every pass doubles the covered path length, so depth d needs log2(d) passes
+    world = np.array(offsets, dtype=np.float64)
+    up = np.array(parent, dtype=np.int64)
+    while (up >= 0).any():
+        has = up >= 0
+        nxt = world.copy()
+        nxt[has] += world[up[has]]
+        world = nxt
+        up = np.where(has, up[np.maximum(up, 0)], -1)
+    return world
+
+
+def depth_order(parents):
+    # indices sorted so every bone comes after its parent (parents: index or -1);
+    # a cyclic table stops after len(parents) passes instead of looping forever
+    parents = np.asarray(parents, dtype=np.int64)
+    depth = np.zeros(len(parents), dtype=np.int64)
+    up = parents.copy()
+    for _ in range(len(parents)):
+        if not (up >= 0).any():
+            break
+        has = up >= 0
+        depth[has] += 1
+        up = np.where(has, parents[np.maximum(up, 0)], -1)
+    return np.argsort(depth, kind='stable')
+
+
+def rig_scale(rig, skeleton):
+    # median ratio of the distances to the root, over the bones the rig and the skeleton share
+    shared = [(rig.index[n], skeleton.index[n]) for n in rig.names if n in skeleton.index]
+    if len(shared) < 2:
+        return 1.0
+    ri, si = np.array(shared).T
+    d_rig = np.linalg.norm(rig.head[ri] - rig.head[ri[0]], axis=1)
+    d_skel = np.linalg.norm(skeleton.head[si] - skeleton.head[si[0]], axis=1)
+    valid = d_skel > 1e-6
+    if not valid.any():
+        return 1.0
+    return float(np.median(d_rig[valid] / d_skel[valid]))
+
+
+class FixPlan:
+    # everything apply_plan() would change, computed from the rest data only
+
+    def __init__(self):
+        self.added = []        # (name, parent, head, tail)
+        self.reparented = []   # (name, old parent, new parent)
+        self.connected = []    # names
+        self.warnings = []
+
+    def is_empty(self):
+        return not (self.added or self.reparented or self.connected)
+
+    def counts(self):
+        return {'added': len(self.added), 'parented': len(self.reparented), 'connected': len(self.connected)}
+
+    def lines(self):
+        lines = []
+        for name, parent, head, tail in self.added:
+            lines.append(f"+ {name} -> {parent or '-'} "
+                         f"({head[0]:.3f}, {head[1]:.3f}, {head[2]:.3f})")
+        for name, old, new in self.reparented:
+            lines.append(f"~ {name}: {old or '-'} -> {new}")
+        for name in self.connected:
+            lines.append(f"= {name} verbunden")
+        return lines + [f"! {w}" for w in self.warnings]
+
+    def to_dict(self):
+        return {
+            'added': [{'bone': n, 'parent': p, 'head': list(map(float, h)), 'tail': list(map(float, t))}
+                      for n, p, h, t in self.added],
+            'reparented': [{'bone': n, 'old': o, 'new': p} for n, o, p in self.reparented],
+            'connected': list(self.connected),
+            'warnings': list(self.warnings),
+        }
+
+
+def plan_fixes(rig, bone_parents, skeleton=None):
+    # rig: rig_validation.RigData; bone_parents: target hierarchy {bone: parent}
+    plan = FixPlan()
+    expected = set(bone_parents.keys()).union(bone_parents.values()) - {None}
+
+    # final bone list: existing bones, then missing ones parents first
+    names = list(rig.names)
+    missing = sorted(n for n in expected if n not in rig.index)
+    names += missing
+    index = {n: i for i, n in enumerate(names)}
+    n_old = len(rig.names)
+
+    target = np.array([index.get(bone_parents.get(n), -1) if bone_parents.get(n) else -1 for n in names],
+                      dtype=np.int64)
+    current = np.concatenate([rig.parent, np.full(len(missing), -1, dtype=np.int64)])
+    # bones without a table entry keep their parent
+    untouched = np.array([n not in bone_parents for n in names], dtype=bool)
+    target[untouched] = current[untouched]
+
+    head = np.zeros((len(names), 3))
+    tail = np.zeros((len(names), 3))
+    head[:n_old], tail[:n_old] = rig.head, rig.tail
+
+    if missing:
+        order = depth_order(target)
+        order = order[order >= n_old]
+        placed = _place_missing(rig, skeleton, names, order, target, n_old, head, tail)
+        for i in np.flatnonzero(~placed):
+            plan.warnings.append(f"{names[n_old + i]}: nicht in avatar_skeleton.xml, am Parent-Ende platziert")
+
+        for i in order:
+            parent = names[target[i]] if target[i] >= 0 else None
+            plan.added.append((names[i], parent, head[i].copy(), tail[i].copy()))
+
+    changed = np.flatnonzero((target[:n_old] != current[:n_old]) & (target[:n_old] >= 0))
+    for i in changed:
+        old = names[current[i]] if current[i] >= 0 else None
+        plan.reparented.append((names[i], old, names[target[i]]))
+
+    # connect where the head already sits on the (new) parent's tail; only bones of the table or just added,
+    # other bones (face, wings, ...) keep their location channel for translation animation
+    connect = np.zeros(len(names), dtype=bool)
+    connect[:n_old] = rig.use_connect & ~np.isin(np.arange(n_old), changed)
+    candidate = ~untouched
+    candidate[n_old:] = True
+    has = target >= 0
+    gap = np.full(len(names), np.inf)
+    gap[has] = np.linalg.norm(head[has] - tail[target[has]], axis=1)
+    plan.connected = [names[i] for i in np.flatnonzero(candidate & ~connect & (gap < CONNECT_TOLERANCE))]
+    return plan
+
+
+def _place_missing(rig, skeleton, names, order, target, n_old, head, tail):
+    # missing bone = anchor head + (skeleton offset to the anchor) * rig scale,
+    # anchor = nearest ancestor that exists in the rig; all missing bones in one pass
+    new = np.arange(n_old, len(names))
+    placed = np.zeros(len(new), dtype=bool)
+    if skeleton is None:
+        _place_fallback(order, target, head, tail)
+        return placed
+
+    sk = np.array([skeleton.index.get(names[i], -1) for i in new], dtype=np.int64)
+    anchor = target[new].copy()
+    for _ in range(len(new)):
+        pending = anchor >= n_old
+        if not pending.any():
+            break
+        anchor[pending] = target[anchor[pending]]
+    anchor[anchor >= n_old] = -1
+
+    anchor_sk = np.array([skeleton.index.get(names[a], -1) if a >= 0 else -1 for a in anchor], dtype=np.int64)
+    placed = sk >= 0
+    scale = rig_scale(rig, skeleton)
+
+    rel = np.zeros((len(new), 3))
+    with_anchor = placed & (anchor_sk >= 0)
+    rel[with_anchor] = skeleton.head[sk[with_anchor]] - skeleton.head[anchor_sk[with_anchor]]
+    # no common ancestor: absolute skeleton position
+    rel[placed & ~with_anchor] = skeleton.head[sk[placed & ~with_anchor]]
+
+    base = np.zeros((len(new), 3))
+    base[with_anchor] = head[anchor[with_anchor]]
+    head[new[placed]] = base[placed] + rel[placed] * scale
+    tail[new[placed]] = head[new[placed]] + skeleton.end[sk[placed]] * scale
+
+    _place_fallback(order[~placed[order - n_old]], target, head, tail)
+    return placed
+
+
+def _place_fallback(bones, target, head, tail):
+    # bones in depth order, so a chain of unknown bones still grows from its parent
+    for i in bones:
+        p = target[i]
+        head[i] = tail[p] if p >= 0 else (0.0, 0.0, 0.0)
+        tail[i] = head[i] + (0.0, 0.0, FALLBACK_LENGTH)
+
+
+def apply_plan(armature, plan):
+    # one Edit Mode session for all changes; the caller switches the mode
+    bones = armature.data.edit_bones
+    for name, parent, head, tail in plan.added:
+        bone = bones.new(name)
+        bone.head = head
+        bone.tail = tail
+        if parent and parent in bones:
+            bone.parent = bones[parent]
+    for name, old, new in plan.reparented:
+        bone = bones.get(name)
+        if bone is not None and new in bones:
+            bone.use_connect = False
+            bone.parent = bones[new]
+    for name in plan.connected:
+        bone = bones.get(name)
+        if bone is not None and bone.parent is not None:
+            bone.use_connect = True
+    return plan.counts()
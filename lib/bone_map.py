@@ -0,0 +1,145 @@
+import os, json, zlib
+from collections import Counter
+
+# "mixamorig:Hips", "Armature|mixamorig1:Hips"
+NAMESPACE_SEPARATORS = (':', '|')
+
+MIRROR_SUFFIXES = (('.L', '.R'), ('_L', '_R'), ('.l', '.r'), ('_l', '_r'))
+
+_preset_index = None
+_preset_index_stamp = None
+
+
+def split_namespace(name):
+    i = max(name.rfind(sep) for sep in NAMESPACE_SEPARATORS)
+    if i < 0:
+        return "", name
+    return name[:i+1], name[i+1:]
+
+
+def strip_namespace(name):
+    return split_namespace(name)[1]
+
+
+def mirror_name(name):
+    # "mHandThumb1Left" <-> "mHandThumb1Right", "LeftArm" <-> "RightArm", "hand.L" <-> "hand.R"
+    prefix, base = split_namespace(name)
+    if "Left" in base:
+        return prefix + base.replace("Left", "Right")
+    if "Right" in base:
+        return prefix + base.replace("Right", "Left")
+    for left, right in MIRROR_SUFFIXES:
+        if base.endswith(left):
+            return prefix + base[:-len(left)] + right
+        if base.endswith(right):
+            return prefix + base[:-len(right)] + left
+    return name
+
+
+def name_hash(name):
+    return zlib.crc32(strip_namespace(name).lower().encode('utf-8'))
+
+
+def name_signature(names):
+    return frozenset(name_hash(n) for n in names)
+
+
+def compile_name_map(mapping, prefix):
+    # full source name -> target name, so lookups need no regex
+    prefix = prefix or ""
+    return {prefix + src: dst for src, dst in mapping.items()}
+
+
+def detect_prefix(names, known=None):
+    # most common namespace, optionally only over names the preset knows
+    counts = Counter()
+    for name in names:
+        prefix, base = split_namespace(name)
+        if not prefix:
+            continue
+        if known is not None and name_hash(base) not in known:
+            continue
+        counts[prefix] += 1
+
+    if not counts:
+        return None
+    return counts.most_common(1)[0][0]
+
+
+class PresetIndex:
+    # inverted index: bone name hash -> presets containing that bone
+
+    def __init__(self):
+        self.presets = {}
+        self.postings = {}
+
+    def add(self, key, label, mapping, source):
+        signature = name_signature(mapping.keys())
+        self.presets[key] = {'label': label, 'mapping': mapping, 'signature': signature, 'source': source}
+        for h in signature:
+            self.postings.setdefault(h, []).append(key)
+
+    def rank(self, names, limit=5):
+        signature = name_signature(names)
+        if not signature:
+            return []
+
+        overlap = Counter()
+        for h in signature:
+            for key in self.postings.get(h, ()):
+                overlap[key] += 1
+
+        results = []
+        for key, inter in overlap.items():
+            preset_sig = self.presets[key]['signature']
+            jaccard = inter / (len(signature) + len(preset_sig) - inter)
+            results.append((jaccard, key))
+
+        results.sort(key=lambda r: (-r[0], r[1]))
+        return results[:limit]
+
+
+def list_preset_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(".json"))
+
+
+def load_preset_file(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("Ungültiges Preset-Format")
+    return data
+
+
+def build_preset_index(builtin_presets, directory):
+    index = PresetIndex()
+
+    for name, mapping in builtin_presets.items():
+        index.add(name, name, mapping, 'BUILTIN')
+
+    for filepath in list_preset_files(directory):
+        try:
+            mapping = load_preset_file(filepath)
+        except Exception as e:
+            print(f"[WARNUNG] Preset {os.path.basename(filepath)} übersprungen: {e}")
+            continue
+        label = os.path.splitext(os.path.basename(filepath))[0]
+        index.add(filepath, label, mapping, 'FILE')
+
+    return index
+
+
+def get_preset_index(builtin_presets, directory):
+    # rebuilt only when the preset files change
+    global _preset_index, _preset_index_stamp
+
+    stamp = tuple((f, os.path.getmtime(f)) for f in list_preset_files(directory))
+    stamp += (len(builtin_presets),)
+
+    if _preset_index is None or stamp != _preset_index_stamp:
+        _preset_index = build_preset_index(builtin_presets, directory)
+        _preset_index_stamp = stamp
+
+    return _preset_index
@@ -0,0 +1,152 @@
+import os, re, time
+import numpy as np
+from .anim_bake import DeformSkeleton, bake_action, rig_actions
+
+# BVH for SL/OpenSim uploads: Y-up, character facing +Z, offsets and positions in inches;
+# rest orientation of every joint is the identity, rotations are deltas from the rest pose
+INCHES = 1.0 / 0.0254
+CHUNK_ROWS = 2048
+FLOAT = "%.4f"
+
+# Blender (Z-up, facing -Y) -> BVH (Y-up, facing +Z)
+BLENDER_TO_BVH = np.array([[1.0, 0.0, 0.0],
+                           [0.0, 0.0, 1.0],
+                           [0.0, -1.0, 0.0]])
+
+AXES = {'X': 0, 'Y': 1, 'Z': 2}
+
+
+def euler_from_matrix(rot, order="ZXY"):
+    # (..., 3, 3) -> angles in degrees per axis of `order`, R = R_order[0] @ R_order[1] @ R_order[2]
+    i, j, k = (AXES[a] for a in order)
+    sign = 1.0 if (j - i) % 3 == 1 else -1.0
+    b = np.arcsin(np.clip(sign * rot[..., i, k], -1.0, 1.0))
+    a = np.arctan2(-sign * rot[..., j, k], rot[..., k, k])
+    c = np.arctan2(-sign * rot[..., i, j], rot[..., i, i])
+    return np.degrees(np.stack([a, b, c], axis=-1))
+
+
+class BvhSkeleton:
+    # exported joints: deform bones renamed with the name map, offsets in BVH axes
+
+    def __init__(self, skeleton, name_map=None, reference=None, scale=INCHES):
+        name_map = name_map or {}
+        self.skeleton = skeleton
+        self.names = [name_map.get(n, n) for n in skeleton.names]
+        self.parent = skeleton.parent
+        self.scale = scale
+
+        head = skeleton.rest[:, :3, 3]
+        offsets = head.copy()
+        child = self.parent >= 0
+        offsets[child] = head[child] - head[self.parent[child]]
+
+        # avatar_skeleton.xml offsets for joints it knows (already in Blender axes, meters)
+        if reference is not None:
+            ref = np.array([reference.index.get(n, -1) for n in self.names], dtype=np.int64)
+            known = (ref >= 0) & child
+            known[child] &= ref[self.parent[child]] >= 0
+            offsets[known] = reference.head[ref[known]] - reference.head[ref[self.parent[known]]]
+
+        self.offsets = offsets @ BLENDER_TO_BVH.T * scale
+        self.offsets[~child] = 0.0
+
+        self.children = [[] for _ in self.names]
+        for b, p in enumerate(self.parent.tolist()):
+            if p >= 0:
+                self.children[p].append(b)
+
+    def roots(self):
+        return np.flatnonzero(self.parent < 0)
+
+
+def motion_channels(clip, bvh, order="ZXY"):
+    # (F, channels) in HIERARCHY order: root positions + rotations of every joint
+    local = BLENDER_TO_BVH @ clip.rest_deltas() @ BLENDER_TO_BVH.T
+
+    angles = np.unwrap(np.radians(euler_from_matrix(local, order)), axis=0)
+    angles = np.degrees(angles)
+
+    columns = []
+    for b in joint_order(bvh):
+        if bvh.parent[b] < 0:
+            columns.append(clip.matrices[:, b, :3, 3] @ BLENDER_TO_BVH.T * bvh.scale)
+        columns.append(angles[:, b])
+    return np.concatenate(columns, axis=1)
+
+
+def joint_order(bvh):
+    order = []
+    stack = list(reversed(bvh.roots().tolist()))
+    while stack:
+        b = stack.pop()
+        order.append(b)
+        stack.extend(reversed(bvh.children[b]))
+    return order
+
+
+def write_hierarchy(f, bvh, order="ZXY"):
+    rotations = " ".join(f"{axis}rotation" for axis in order)
+    f.write("HIERARCHY\n")
+
+    def joint(b, depth):
+        indent = "\t" * depth
+        keyword = "ROOT" if bvh.parent[b] < 0 else "JOINT"
+        f.write(f"{indent}{keyword} {bvh.names[b]}\n{indent}{{\n")
+        f.write(f"{indent}\tOFFSET {' '.join(FLOAT % x for x in bvh.offsets[b])}\n")
+        if bvh.parent[b] < 0:
+            f.write(f"{indent}\tCHANNELS 6 Xposition Yposition Zposition {rotations}\n")
+        else:
+            f.write(f"{indent}\tCHANNELS 3 {rotations}\n")
+        for c in bvh.children[b]:
+            joint(c, depth + 1)
+        if not bvh.children[b]:
+            axis = bvh.skeleton.rest[b, :3, 1] / np.linalg.norm(bvh.skeleton.rest[b, :3, 1])
+            tail = axis @ BLENDER_TO_BVH.T * bvh.scale * 0.1
+            f.write(f"{indent}\tEnd Site\n{indent}\t{{\n"
+                    f"{indent}\t\tOFFSET {' '.join(FLOAT % x for x in tail)}\n{indent}\t}}\n")
+        f.write(f"{indent}}}\n")
+
+    for root in bvh.roots().tolist():
+        joint(root, 0)
+
+
+def write_clip(filepath, clip, bvh, order="ZXY"):
+    channels = motion_channels(clip, bvh, order)
+    frame_time = (clip.frames[1] - clip.frames[0]) / clip.fps if clip.num_frames > 1 else 1.0 / clip.fps
+    with open(filepath, 'w', encoding='utf-8', newline='\n') as f:
+        write_hierarchy(f, bvh, order)
+        f.write(f"MOTION\nFrames: {clip.num_frames}\nFrame Time: {frame_time:.6f}\n")
+        # formatted in blocks of rows, straight to the file
+        line = " ".join([FLOAT] * channels.shape[1]) + "\n"
+        for start in range(0, len(channels), CHUNK_ROWS):
+            block = channels[start:start + CHUNK_ROWS]
+            f.write((line * len(block)) % tuple(block.ravel().tolist()))
+    return channels.shape[1]
+
+
+def clip_filename(action_name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", action_name) + ".bvh"
+
+
+def export(context, armature, directory, actions=None, name_map=None, reference=None, step=1,
+           order="ZXY", scale=INCHES, filenames=None):
+    # one .bvh per action (file name from the action unless given), the skeleton is built once for the batch
+    t0 = time.perf_counter()
+    actions = rig_actions(armature) if actions is None else list(actions)
+    # world space: an unapplied object transform (FBX import: 0.01 scale, 90° X) is part of the motion
+    skeleton = DeformSkeleton(armature, world=True)
+    bvh = BvhSkeleton(skeleton, name_map, reference, scale)
+    stats = {'clips': 0, 'frames': 0, 'joints': len(skeleton), 'bytes': 0, 'files': []}
+
+    for i, action in enumerate(actions):
+        clip = bake_action(context.scene, armature, action, skeleton, step)
+        filepath = os.path.join(directory, filenames[i] if filenames else clip_filename(action.name))
+        write_clip(filepath, clip, bvh, order)
+        stats['clips'] += 1
+        stats['frames'] += clip.num_frames
+        stats['bytes'] += os.path.getsize(filepath)
+        stats['files'].append(filepath)
+
+    stats['time'] = time.perf_counter() - t0
+    return stats
@@ -0,0 +1,152 @@
+import bpy, re, time
+from .bone_map import compile_name_map
+
+
+class PipelineStage:
+    # mode: 'EDIT', 'POSE' or 'OBJECT' - stages of one mode share a session
+
+    def __init__(self, name, mode, func):
+        self.name = name
+        self.mode = mode
+        self.func = func
+
+
+def stage_rename_bones(armature, state):
+    bones = armature.data.edit_bones
+    bone_map = state['bone_map']
+    pattern = state['pattern']
+
+    for bone in bones:
+        if not pattern.match(bone.name):
+            state['skipped'] += 1
+            continue
+
+        base_name = pattern.sub("", bone.name)
+        if base_name not in bone_map:
+            continue
+
+        new_name = bone_map[base_name]
+        # Skip if name exists (unless it's the same bone)
+        existing = bones.get(new_name)
+        if existing is not None and existing != bone:
+            state['warnings'].append(f"Skipped: {new_name} already exists")
+            state['skipped'] += 1
+            continue
+
+        bone.name = new_name
+        state['renamed'] += 1
+
+
+def stage_fix_roll(armature, state):
+    for eb in armature.data.edit_bones:
+        eb.roll = 0.0
+
+
+def stage_reparent(armature, state):
+    bones = armature.data.edit_bones
+    count = 0
+    for bone_name, parent_name in state['bone_parents'].items():
+        bone = bones.get(bone_name)
+        parent = bones.get(parent_name) if parent_name else None
+        if bone is None or parent is None or bone == parent:
+            continue
+        if bone.parent != parent:
+            bone.parent = parent
+            bone.use_connect = False
+            count += 1
+    state['reparented'] = count
+
+
+def stage_apply_rest_pose(armature, state):
+    bpy.ops.pose.armature_apply()
+
+
+def stage_rename_vertex_groups(armature, state):
+    # one pass per deformed mesh, dict lookup per group
+    name_map = state['name_map']
+    for mesh in state['meshes']:
+        groups = mesh.vertex_groups
+        existing = set(groups.keys())
+        for vg in groups:
+            new_name = name_map.get(vg.name)
+            if new_name is None or new_name == vg.name:
+                continue
+            if new_name in existing:
+                state['warnings'].append(f"Skipped: vertex group {new_name} already exists in {mesh.name}")
+                continue
+            existing.discard(vg.name)
+            vg.name = new_name
+            existing.add(new_name)
+            state['groups_renamed'] += 1
+
+
+CONVERSION_STAGES = (
+    PipelineStage("rename", 'EDIT', stage_rename_bones),
+    PipelineStage("roll", 'EDIT', stage_fix_roll),
+    PipelineStage("reparent", 'EDIT', stage_reparent),
+    PipelineStage("rest_pose", 'POSE', stage_apply_rest_pose),
+    PipelineStage("vertex_groups", 'OBJECT', stage_rename_vertex_groups),
+)
+
+
+def build_deform_index(objects):
+    # armature name -> meshes deformed by it (parent or Armature modifier), one scan
+    index = {}
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        targets = set()
+        if obj.parent is not None and obj.parent.type == 'ARMATURE':
+            targets.add(obj.parent.name)
+        for mod in obj.modifiers:
+            if mod.type == 'ARMATURE' and mod.object is not None:
+                targets.add(mod.object.name)
+        for name in targets:
+            index.setdefault(name, []).append(obj)
+    return index
+
+
+def make_conversion_state(bone_map, prefix, bone_parents, meshes):
+    return {
+        'bone_map': bone_map,
+        'pattern': re.compile(f"^{re.escape(prefix)}"),
+        'name_map': compile_name_map(bone_map, prefix),
+        'bone_parents': bone_parents,
+        'meshes': meshes,
+        'renamed': 0,
+        'skipped': 0,
+        'reparented': 0,
+        'groups_renamed': 0,
+        'warnings': [],
+    }
+
+
+def run_pipeline(armature, stages, state):
+    # one mode session per mode, in the order the modes first appear
+    timings = []
+    modes = []
+    for stage in stages:
+        if stage.mode not in modes:
+            modes.append(stage.mode)
+
+    try:
+        for mode in modes:
+            t0 = time.perf_counter()
+            bpy.ops.object.mode_set(mode=mode)
+            timings.append(("mode_set " + mode, time.perf_counter() - t0))
+
+            for stage in stages:
+                if stage.mode != mode:
+                    continue
+                t0 = time.perf_counter()
+                stage.func(armature, state)
+                timings.append((stage.name, time.perf_counter() - t0))
+    finally:
+        if armature.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+    return timings
+
+
+def format_timings(timings):
+    return ", ".join(f"{name} {t*1000:.1f}ms" for name, t in timings)
@@ -0,0 +1,442 @@
+import os, re, sys, time, tempfile, subprocess
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, quoteattr
+from .weights import WeightTable, limit_influences
+from .weight_rules import find_armature
+from . import lod
+
+# SL/OpenSim subset of COLLADA 1.4.1: triangulated geometry with normals + one UV set,
+# skin controllers (joints, bind shape, inverse bind matrices, <= 4 influences), joint hierarchy;
+# number arrays are formatted in chunks and written straight to the file
+CHUNK = 1 << 16
+FLOAT = "%.6g"
+INT = "%d"
+
+# LOD files next to the main DAE, in the order of the ratios (SL uploader naming: medium, low, lowest)
+LOD_SUFFIXES = ("_LOD2", "_LOD1", "_LOD0")
+LOD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lod.py")
+LOD_TIMEOUT = 600.0
+
+
+def xml_id(name):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def write_values(f, values, fmt):
+    values = np.asarray(values).ravel()
+    for start in range(0, values.size, CHUNK):
+        chunk = values[start:start + CHUNK].tolist()
+        if start:
+            f.write(" ")
+        f.write(" ".join([fmt] * len(chunk)) % tuple(chunk))
+
+
+def write_float_source(f, source_id, values, params):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    stride = len(params)
+    f.write(f'<source id="{source_id}"><float_array id="{source_id}-array" count="{values.size}">')
+    write_values(f, values, FLOAT)
+    f.write(f'</float_array><technique_common><accessor source="#{source_id}-array" '
+            f'count="{values.size // stride}" stride="{stride}">')
+    f.write("".join(f'<param name="{p}" type="float"/>' for p in params))
+    f.write('</accessor></technique_common></source>\n')
+
+
+def matrix_values(matrix):
+    # mathutils.Matrix -> 16 row-major values (COLLADA order)
+    return np.array(matrix, dtype=np.float64).ravel()
+
+
+# ----------  Extraction  ----------
+@contextmanager
+def rest_pose_evaluation(objects):
+    # evaluated meshes without the Armature modifiers: the skin is written in bind pose
+    disabled = []
+    for obj in objects:
+        for mod in obj.modifiers:
+            if mod.type == 'ARMATURE' and mod.show_viewport:
+                mod.show_viewport = False
+                disabled.append(mod)
+    try:
+        yield
+    finally:
+        for mod in disabled:
+            mod.show_viewport = True
+
+
+def corner_normals(mesh):
+    normals = np.empty(len(mesh.loops) * 3, dtype=np.float32)
+    if hasattr(mesh, "corner_normals"):
+        mesh.corner_normals.foreach_get("vector", normals)
+    else:
+        mesh.calc_normals_split()
+        mesh.loops.foreach_get("normal", normals)
+    return normals.reshape(-1, 3)
+
+
+def deduplicate(values, decimals=5):
+    # unique rows + index per input row, shrinks per-corner normals and UVs considerably
+    uniq, inverse = np.unique(np.round(values, decimals), axis=0, return_inverse=True)
+    return uniq, inverse.reshape(-1)
+
+
+class MeshArrays:
+    # geometry of one evaluated mesh, read with foreach_get
+
+    def __init__(self, mesh):
+        self.positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", self.positions)
+
+        mesh.calc_loop_triangles()
+        num_tris = len(mesh.loop_triangles)
+        self.tri_verts = np.empty(num_tris * 3, dtype=np.int64)
+        tri_loops = np.empty(num_tris * 3, dtype=np.int64)
+        self.tri_material = np.empty(num_tris, dtype=np.int64)
+        mesh.loop_triangles.foreach_get("vertices", self.tri_verts)
+        mesh.loop_triangles.foreach_get("loops", tri_loops)
+        mesh.loop_triangles.foreach_get("material_index", self.tri_material)
+
+        self.normals, normal_index = deduplicate(corner_normals(mesh))
+        self.tri_normals = normal_index[tri_loops]
+
+        self.uvs = None
+        self.tri_uvs = None
+        layer = mesh.uv_layers.active
+        if layer is not None:
+            uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+            layer.data.foreach_get("uv", uv)
+            self.uvs, uv_index = deduplicate(uv.reshape(-1, 2), 6)
+            self.tri_uvs = uv_index[tri_loops]
+
+    def subset(self, positions, tri_verts, kept):
+        # decimated copy: new vertices, the kept triangles with their corner normals and UVs
+        arrays = MeshArrays.__new__(MeshArrays)
+        arrays.positions = np.asarray(positions, dtype=np.float32).ravel()
+        arrays.tri_verts = np.asarray(tri_verts, dtype=np.int64).ravel()
+        arrays.tri_material = self.tri_material[kept]
+        # only the normals and UVs the kept triangles still use
+        used, index = np.unique(self.tri_normals.reshape(-1, 3)[kept], return_inverse=True)
+        arrays.normals, arrays.tri_normals = self.normals[used], index.reshape(-1)
+        arrays.uvs = arrays.tri_uvs = None
+        if self.tri_uvs is not None:
+            used, index = np.unique(self.tri_uvs.reshape(-1, 3)[kept], return_inverse=True)
+            arrays.uvs, arrays.tri_uvs = self.uvs[used], index.reshape(-1)
+        return arrays
+
+    @property
+    def num_verts(self):
+        return self.positions.size // 3
+
+    @property
+    def num_tris(self):
+        return self.tri_material.size
+
+
+class MeshPart:
+    # one exported mesh: geometry, and armature + weight table when it is skinned
+
+    def __init__(self, obj, arrays, armature=None, table=None):
+        self.obj = obj
+        self.arrays = arrays
+        self.armature = armature
+        self.table = table
+
+    def lod(self, levels, i):
+        arrays = self.arrays.subset(levels[f"positions_{i}"], levels[f"tri_verts_{i}"], levels[f"kept_{i}"])
+        table = None if self.table is None else self.table.merge_rows(levels[f"labels_{i}"], arrays.num_verts)
+        return MeshPart(self.obj, arrays, self.armature, table)
+
+
+class Skin:
+    # sparse weights limited to the deforming bones, as COLLADA joints / vcount / v arrays
+
+    def __init__(self, obj, armature, table, max_influences=4):
+        bones = armature.data.bones
+        # own copy, the mesh part keeps its table for the LOD levels
+        table = WeightTable(table.num_verts, table.rows, table.groups, table.weights,
+                            table.group_names, table.locked.copy())
+        deform = np.array([bones.get(name) is not None and bones[name].use_deform for name in table.group_names],
+                          dtype=bool)
+        if table.nnz:
+            table.filter(deform[table.groups])
+        table.locked[:] = False
+        limit_influences(table, max_influences=max_influences, normalize=True)
+
+        used = np.unique(table.groups)
+        joint_index = np.full(max(table.num_groups, 1), -1, dtype=np.int64)
+        joint_index[used] = np.arange(used.size)
+
+        self.armature = armature
+        self.joints = [table.group_names[g] for g in used.tolist()]
+        self.inverse_bind = [(armature.matrix_world @ bones[name].matrix_local).inverted() for name in self.joints]
+        self.bind_shape = obj.matrix_world.copy()
+        self.vcount = table.row_counts()
+        self.weights = table.weights
+        self.v = np.stack([joint_index[table.groups], np.arange(table.nnz)], axis=1)
+
+
+# ----------  Writer  ----------
+class DaeWriter:
+
+    def __init__(self, f):
+        self.f = f
+
+    def header(self):
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.f.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                     '<COLLADA xmlns="http://www.collada.org/2005/11/COLLADASchema" version="1.4.1">\n'
+                     '<asset><contributor><authoring_tool>Mixamo to OpenSim Rig Converter</authoring_tool>'
+                     f'</contributor><created>{stamp}</created><modified>{stamp}</modified>'
+                     '<unit name="meter" meter="1"/><up_axis>Z_UP</up_axis></asset>\n')
+
+    def materials(self, materials):
+        # materials: {symbol id: (name, rgba)}
+        f = self.f
+        f.write('<library_effects>\n')
+        for mid, (name, color) in materials.items():
+            f.write(f'<effect id="{mid}-effect"><profile_COMMON><technique sid="common"><lambert><diffuse>'
+                    f'<color sid="diffuse">{" ".join(FLOAT % c for c in color)}</color>'
+                    '</diffuse></lambert></technique></profile_COMMON></effect>\n')
+        f.write('</library_effects>\n<library_materials>\n')
+        for mid, (name, color) in materials.items():
+            f.write(f'<material id="{mid}-material" name={quoteattr(name)}>'
+                    f'<instance_effect url="#{mid}-effect"/></material>\n')
+        f.write('</library_materials>\n')
+
+    def geometry(self, gid, name, arrays, material_ids):
+        f = self.f
+        f.write(f'<geometry id="{gid}" name={quoteattr(name)}><mesh>\n')
+        write_float_source(f, f"{gid}-positions", arrays.positions, "XYZ")
+        write_float_source(f, f"{gid}-normals", arrays.normals, "XYZ")
+        if arrays.uvs is not None:
+            write_float_source(f, f"{gid}-map-0", arrays.uvs, "ST")
+        f.write(f'<vertices id="{gid}-vertices"><input semantic="POSITION" source="#{gid}-positions"/></vertices>\n')
+
+        columns = [arrays.tri_verts, arrays.tri_normals]
+        if arrays.tri_uvs is not None:
+            columns.append(arrays.tri_uvs)
+        corners = np.stack(columns, axis=1).reshape(-1, 3, len(columns))
+
+        order = np.argsort(arrays.tri_material, kind='stable')
+        slots, starts = np.unique(arrays.tri_material[order], return_index=True)
+        ends = np.append(starts[1:], order.size)
+        for slot, s, e in zip(slots.tolist(), starts.tolist(), ends.tolist()):
+            symbol = material_ids[min(slot, len(material_ids) - 1)]
+            f.write(f'<triangles material="{symbol}-material" count="{e - s}">'
+                    f'<input semantic="VERTEX" source="#{gid}-vertices" offset="0"/>'
+                    f'<input semantic="NORMAL" source="#{gid}-normals" offset="1"/>')
+            if arrays.tri_uvs is not None:
+                f.write(f'<input semantic="TEXCOORD" source="#{gid}-map-0" offset="2" set="0"/>')
+            f.write('<p>')
+            write_values(f, corners[order[s:e]], INT)
+            f.write('</p></triangles>\n')
+        f.write('</mesh></geometry>\n')
+
+    def controller(self, cid, gid, skin):
+        f = self.f
+        f.write(f'<controller id="{cid}"><skin source="#{gid}">'
+                f'<bind_shape_matrix>{" ".join(FLOAT % x for x in matrix_values(skin.bind_shape))}'
+                '</bind_shape_matrix>\n')
+        f.write(f'<source id="{cid}-joints"><Name_array id="{cid}-joints-array" count="{len(skin.joints)}">'
+                f'{escape(" ".join(skin.joints))}</Name_array><technique_common>'
+                f'<accessor source="#{cid}-joints-array" count="{len(skin.joints)}" stride="1">'
+                '<param name="JOINT" type="name"/></accessor></technique_common></source>\n')
+
+        bind = np.concatenate([matrix_values(m) for m in skin.inverse_bind]) if skin.joints else np.zeros(0)
+        f.write(f'<source id="{cid}-bind_poses"><float_array id="{cid}-bind_poses-array" count="{bind.size}">')
+        write_values(f, bind, FLOAT)
+        f.write(f'</float_array><technique_common><accessor source="#{cid}-bind_poses-array" '
+                f'count="{len(skin.joints)}" stride="16"><param name="TRANSFORM" type="float4x4"/>'
+                '</accessor></technique_common></source>\n')
+        write_float_source(f, f"{cid}-weights", skin.weights, ["WEIGHT"])
+
+        f.write(f'<joints><input semantic="JOINT" source="#{cid}-joints"/>'
+                f'<input semantic="INV_BIND_MATRIX" source="#{cid}-bind_poses"/></joints>\n'
+                f'<vertex_weights count="{skin.vcount.size}">'
+                f'<input semantic="JOINT" source="#{cid}-joints" offset="0"/>'
+                f'<input semantic="WEIGHT" source="#{cid}-weights" offset="1"/><vcount>')
+        write_values(f, skin.vcount, INT)
+        f.write('</vcount><v>')
+        write_values(f, skin.v, INT)
+        f.write('</v></vertex_weights></skin></controller>\n')
+
+    def armature_node(self, armature):
+        f = self.f
+        aid = xml_id(armature.name)
+        f.write(f'<node id="{aid}" name={quoteattr(armature.name)} type="NODE">'
+                f'<matrix sid="transform">{" ".join(FLOAT % x for x in matrix_values(armature.matrix_world))}'
+                '</matrix>\n')
+
+        def joint(bone):
+            local = bone.matrix_local if bone.parent is None else bone.parent.matrix_local.inverted() @ bone.matrix_local
+            bid = xml_id(bone.name)
+            f.write(f'<node id="{aid}_{bid}" name={quoteattr(bone.name)} sid={quoteattr(bone.name)} type="JOINT">'
+                    f'<matrix sid="transform">{" ".join(FLOAT % x for x in matrix_values(local))}</matrix>\n')
+            for child in bone.children:
+                joint(child)
+            f.write('</node>\n')
+
+        for bone in armature.data.bones:
+            if bone.parent is None:
+                joint(bone)
+        f.write('</node>\n')
+
+    def mesh_node(self, obj, gid, cid, skin, material_ids):
+        f = self.f
+        bind = "".join(f'<instance_material symbol="{m}-material" target="#{m}-material"/>' for m in material_ids)
+        bind = f'<bind_material><technique_common>{bind}</technique_common></bind_material>'
+        if skin is not None:
+            # world transform is in the bind shape matrix
+            identity = " ".join(FLOAT % x for x in np.eye(4).ravel())
+            aid = xml_id(skin.armature.name)
+            roots = "".join(f'<skeleton>#{aid}_{xml_id(b.name)}</skeleton>'
+                            for b in skin.armature.data.bones if b.parent is None)
+            f.write(f'<node id="{xml_id(obj.name)}" name={quoteattr(obj.name)} type="NODE">'
+                    f'<matrix sid="transform">{identity}</matrix>'
+                    f'<instance_controller url="#{cid}">{roots}{bind}</instance_controller></node>\n')
+        else:
+            f.write(f'<node id="{xml_id(obj.name)}" name={quoteattr(obj.name)} type="NODE">'
+                    f'<matrix sid="transform">{" ".join(FLOAT % x for x in matrix_values(obj.matrix_world))}'
+                    f'</matrix><instance_geometry url="#{gid}">{bind}</instance_geometry></node>\n')
+
+
+def material_table(meshes):
+    # one entry per material used by the meshes, "default" for meshes without materials
+    materials = {}
+    per_object = {}
+    for obj in meshes:
+        ids = []
+        for slot in obj.material_slots:
+            mat = slot.material
+            name = mat.name if mat is not None else "default"
+            mid = xml_id(name)
+            color = tuple(mat.diffuse_color) if mat is not None else (0.8, 0.8, 0.8, 1.0)
+            materials.setdefault(mid, (name, color))
+            ids.append(mid)
+        if not ids:
+            materials.setdefault("default", ("default", (0.8, 0.8, 0.8, 1.0)))
+            ids = ["default"]
+        per_object[obj.name] = ids
+    return materials, per_object
+
+
+def extract(context, meshes, apply_modifiers=True):
+    # evaluated bind pose geometry and weight table of every mesh, read once
+    parts = []
+    with rest_pose_evaluation(meshes):
+        depsgraph = context.evaluated_depsgraph_get()
+        for obj in meshes:
+            evaluated = obj.evaluated_get(depsgraph) if apply_modifiers else obj
+            mesh = evaluated.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
+            try:
+                armature = find_armature(obj)
+                table = WeightTable.from_object(obj, mesh) if armature is not None else None
+                parts.append(MeshPart(obj, MeshArrays(mesh), armature, table))
+            finally:
+                evaluated.to_mesh_clear()
+    return parts
+
+
+def write_file(filepath, parts, armatures, materials, material_ids, max_influences=4):
+    stats = {'meshes': len(parts), 'vertices': 0, 'triangles': 0, 'joints': 0}
+    with open(filepath, 'w', encoding='utf-8') as f:
+        writer = DaeWriter(f)
+        writer.header()
+        writer.materials(materials)
+
+        skins = {}
+        f.write('<library_geometries>\n')
+        for part in parts:
+            obj = part.obj
+            writer.geometry(xml_id(obj.name) + "-mesh", obj.name, part.arrays, material_ids[obj.name])
+            stats['vertices'] += part.arrays.num_verts
+            stats['triangles'] += part.arrays.num_tris
+            if part.table is not None:
+                skins[obj.name] = Skin(obj, part.armature, part.table, max_influences)
+        f.write('</library_geometries>\n')
+
+        if skins:
+            f.write('<library_controllers>\n')
+            for part in parts:
+                skin = skins.get(part.obj.name)
+                if skin is not None:
+                    writer.controller(xml_id(part.obj.name) + "-skin", xml_id(part.obj.name) + "-mesh", skin)
+                    stats['joints'] = max(stats['joints'], len(skin.joints))
+            f.write('</library_controllers>\n')
+
+        f.write('<library_visual_scenes><visual_scene id="Scene" name="Scene">\n')
+        for armature in armatures.values():
+            writer.armature_node(armature)
+        for part in parts:
+            obj = part.obj
+            writer.mesh_node(obj, xml_id(obj.name) + "-mesh", xml_id(obj.name) + "-skin", skins.get(obj.name),
+                             material_ids[obj.name])
+        f.write('</visual_scene></library_visual_scenes>\n'
+                '<scene><instance_visual_scene url="#Scene"/></scene>\n</COLLADA>\n')
+    stats['bytes'] = os.path.getsize(filepath)
+    return stats
+
+
+# ----------  LOD levels  ----------
+def decimate_part(part, ratios, workdir, index):
+    # one worker process per mesh on Blender's Python; in-process when no interpreter is available
+    arrays = part.arrays
+    positions = arrays.positions.reshape(-1, 3)
+    tri_verts = arrays.tri_verts.reshape(-1, 3)
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        job = os.path.join(workdir, f"job_{index}.npz")
+        result = os.path.join(workdir, f"result_{index}.npz")
+        np.savez(job, positions=positions, tri_verts=tri_verts, ratios=np.asarray(ratios, dtype=np.float64))
+        try:
+            proc = subprocess.run([sys.executable, LOD_SCRIPT, job, result], capture_output=True,
+                                  timeout=LOD_TIMEOUT)
+            if proc.returncode == 0 and os.path.exists(result):
+                with np.load(result) as data:
+                    return {key: data[key] for key in data.files}
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    return lod.decimate_levels(positions, tri_verts, ratios)
+
+
+def generate_lods(parts, ratios, jobs=None):
+    # per mesh all levels in one worker, the meshes in parallel
+    jobs = jobs or max(1, (os.cpu_count() or 2) - 1)
+    with tempfile.TemporaryDirectory(prefix="opensim_lod_") as workdir:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            levels = list(pool.map(lambda item: decimate_part(item[1], ratios, workdir, item[0]),
+                                   enumerate(parts)))
+    return levels
+
+
+def export(context, objects, filepath, max_influences=4, apply_modifiers=True, lod_ratios=(), jobs=None):
+    # lod_ratios: triangle ratios of the extra LOD files (at most len(LOD_SUFFIXES)), same skin as the main file
+    t0 = time.perf_counter()
+    meshes = [o for o in objects if o.type == 'MESH']
+    armatures = {o.name: o for o in objects if o.type == 'ARMATURE'}
+    for obj in meshes:
+        armature = find_armature(obj)
+        if armature is not None:
+            armatures.setdefault(armature.name, armature)
+
+    materials, material_ids = material_table(meshes)
+    parts = extract(context, meshes, apply_modifiers)
+    stats = write_file(filepath, parts, armatures, materials, material_ids, max_influences)
+
+    lod_ratios = list(lod_ratios)[:len(LOD_SUFFIXES)]
+    if lod_ratios:
+        t_lod = time.perf_counter()
+        levels = generate_lods(parts, lod_ratios, jobs)
+        base = os.path.splitext(filepath)[0]
+        stats['lods'] = []
+        for i, (ratio, suffix) in enumerate(zip(lod_ratios, LOD_SUFFIXES)):
+            lod_parts = [part.lod(level, i) for part, level in zip(parts, levels)]
+            lod_path = base + suffix + ".dae"
+            lod_stats = write_file(lod_path, lod_parts, armatures, materials, material_ids, max_influences)
+            stats['lods'].append({'file': lod_path, 'ratio': ratio, 'triangles': lod_stats['triangles'],
+                                  'vertices': lod_stats['vertices'], 'bytes': lod_stats['bytes']})
+        stats['lod_time'] = time.perf_counter() - t_lod
+
+    stats['time'] = time.perf_counter() - t0
+    return stats
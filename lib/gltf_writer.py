@@ -0,0 +1,276 @@
+import os, json, struct, time
+import numpy as np
+from .anim_bake import DeformSkeleton, bake_action, decompose, continuous, reduce_keys, is_constant, rig_actions
+from .dae_writer import MeshArrays, rest_pose_evaluation
+from .weights import WeightTable, limit_influences
+from .weight_rules import find_armature
+
+# binary glTF 2.0: one skin over the deform bones, meshes and skin written once,
+# one animation per action sharing the same node tree; all data in a single buffer
+GLB_MAGIC = 0x46546C67
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+# Blender is Z-up, glTF Y-up: (x, y, z) -> (x, z, -y)
+Z_UP_TO_Y_UP = np.array([[1.0, 0.0, 0.0, 0.0],
+                         [0.0, 0.0, 1.0, 0.0],
+                         [0.0, -1.0, 0.0, 0.0],
+                         [0.0, 0.0, 0.0, 1.0]])
+
+TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4", 16: "MAT4"}
+
+
+class GltfBuilder:
+    # glTF json + binary buffer, accessors appended with 4-byte alignment
+
+    def __init__(self):
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "Mixamo to OpenSim Rig Converter"},
+            "scene": 0, "scenes": [{"nodes": []}], "nodes": [], "meshes": [], "materials": [],
+            "skins": [], "animations": [], "accessors": [], "bufferViews": [], "buffers": [],
+        }
+        self.chunks = []
+        self.size = 0
+
+    def add_node(self, node):
+        self.gltf["nodes"].append(node)
+        return len(self.gltf["nodes"]) - 1
+
+    def view(self, data, target=None):
+        data = data.tobytes()
+        view = {"buffer": 0, "byteOffset": self.size, "byteLength": len(data)}
+        if target is not None:
+            view["target"] = target
+        self.chunks.append(data)
+        self.size += len(data)
+        pad = -self.size % 4
+        if pad:
+            self.chunks.append(b"\0" * pad)
+            self.size += pad
+        self.gltf["bufferViews"].append(view)
+        return len(self.gltf["bufferViews"]) - 1
+
+    def accessor(self, values, components, component_type=FLOAT, target=None, bounds=False):
+        dtype = {FLOAT: np.float32, UNSIGNED_SHORT: np.uint16, UNSIGNED_INT: np.uint32}[component_type]
+        values = np.ascontiguousarray(values, dtype=dtype).reshape(-1, components)
+        accessor = {"bufferView": self.view(values, target), "componentType": component_type,
+                    "count": len(values), "type": TYPES[components]}
+        if bounds and len(values):
+            accessor["min"] = values.min(axis=0).tolist()
+            accessor["max"] = values.max(axis=0).tolist()
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def write(self, filepath):
+        gltf = {k: v for k, v in self.gltf.items() if v != []}
+        gltf["buffers"] = [{"byteLength": self.size}]
+        text = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+        text += b" " * (-len(text) % 4)
+        total = 12 + 8 + len(text) + 8 + self.size
+        with open(filepath, "wb") as f:
+            f.write(struct.pack("<III", GLB_MAGIC, 2, total))
+            f.write(struct.pack("<II", len(text), CHUNK_JSON))
+            f.write(text)
+            f.write(struct.pack("<II", self.size, CHUNK_BIN))
+            for chunk in self.chunks:
+                f.write(chunk)
+
+
+def node_trs(matrix):
+    t, r, s = decompose(matrix[None])
+    return {"translation": t[0].tolist(), "rotation": r[0, [1, 2, 3, 0]].tolist(), "scale": s[0].tolist()}
+
+
+# ----------  Mesh + skin  ----------
+def skin_attributes(obj, mesh, skeleton, max_influences=4):
+    # dense JOINTS_0 / WEIGHTS_0 per mesh vertex, joints indexed into the deform skeleton
+    table = WeightTable.from_object(obj, mesh)
+    joint_of_group = np.array([skeleton.index.get(name, -1) for name in table.group_names] or [-1], dtype=np.int64)
+    if table.nnz:
+        table.filter(joint_of_group[table.groups] >= 0)
+    table.locked[:] = False
+    limit_influences(table, max_influences=max_influences, normalize=True)
+
+    # slot of every entry inside its vertex row
+    slot = np.arange(table.nnz) - table.indptr[table.rows]
+    joints = np.zeros((table.num_verts, 4), dtype=np.uint16)
+    weights = np.zeros((table.num_verts, 4), dtype=np.float32)
+    joints[table.rows, slot] = joint_of_group[table.groups]
+    weights[table.rows, slot] = table.weights
+    # vertices without deform weights follow the first root instead of collapsing to the origin
+    empty = weights.sum(axis=1) <= 0.0
+    joints[empty, 0] = skeleton.roots()[0]
+    weights[empty, 0] = 1.0
+    return joints, weights
+
+
+def write_mesh(builder, obj, mesh, armature, skeleton, material_index, max_influences=4):
+    # corners -> unique (vertex, normal, uv) tuples, positions in armature space
+    arrays = MeshArrays(mesh)
+    columns = [arrays.tri_verts, arrays.tri_normals]
+    if arrays.tri_uvs is not None:
+        columns.append(arrays.tri_uvs)
+    corners, index = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+    index = index.reshape(-1)
+
+    to_armature = np.array(armature.matrix_world.inverted() @ obj.matrix_world, dtype=np.float64)
+    co = arrays.positions.reshape(-1, 3)[corners[:, 0]] @ to_armature[:3, :3].T + to_armature[:3, 3]
+    normal_matrix = np.linalg.inv(to_armature[:3, :3]).T
+    normals = arrays.normals[corners[:, 1]] @ normal_matrix.T
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+    attributes = {
+        "POSITION": builder.accessor(co, 3, target=ARRAY_BUFFER, bounds=True),
+        "NORMAL": builder.accessor(normals, 3, target=ARRAY_BUFFER),
+    }
+    if arrays.tri_uvs is not None:
+        uv = arrays.uvs[corners[:, 2]].copy()
+        uv[:, 1] = 1.0 - uv[:, 1]
+        attributes["TEXCOORD_0"] = builder.accessor(uv, 2, target=ARRAY_BUFFER)
+
+    joints, weights = skin_attributes(obj, mesh, skeleton, max_influences)
+    attributes["JOINTS_0"] = builder.accessor(joints[corners[:, 0]], 4, UNSIGNED_SHORT, ARRAY_BUFFER)
+    attributes["WEIGHTS_0"] = builder.accessor(weights[corners[:, 0]], 4, target=ARRAY_BUFFER)
+
+    # one primitive per material slot, all sharing the vertex attributes
+    index_type = UNSIGNED_SHORT if len(corners) < 65536 else UNSIGNED_INT
+    tri_index = index.reshape(-1, 3)
+    primitives = []
+    for slot in np.unique(arrays.tri_material).tolist():
+        primitive = {"attributes": attributes,
+                     "indices": builder.accessor(tri_index[arrays.tri_material == slot], 1, index_type,
+                                                 ELEMENT_ARRAY_BUFFER)}
+        material = material_index[min(slot, len(material_index) - 1)] if material_index else None
+        if material is not None:
+            primitive["material"] = material
+        primitives.append(primitive)
+
+    builder.gltf["meshes"].append({"name": obj.name, "primitives": primitives})
+    return len(builder.gltf["meshes"]) - 1, len(corners), arrays.num_tris
+
+
+def material_index(builder, obj, cache):
+    # glTF material per slot (None for empty slots), shared between meshes by name
+    indices = []
+    for slot in obj.material_slots:
+        mat = slot.material
+        if mat is None:
+            indices.append(None)
+            continue
+        if mat.name not in cache:
+            builder.gltf["materials"].append({
+                "name": mat.name,
+                "pbrMetallicRoughness": {"baseColorFactor": list(mat.diffuse_color),
+                                         "metallicFactor": float(mat.metallic),
+                                         "roughnessFactor": float(mat.roughness)},
+            })
+            cache[mat.name] = len(builder.gltf["materials"]) - 1
+        indices.append(cache[mat.name])
+    return indices
+
+
+# ----------  Animation  ----------
+def write_clip(builder, clip, joint_nodes, tolerance=0.0):
+    # one glTF animation per baked clip, LINEAR samplers, keys reduced per channel
+    translation, rotation, scale = decompose(clip.local())
+    rotation = continuous(rotation[..., [1, 2, 3, 0]])
+    times = clip.times
+    time_accessors = {}
+    samplers, channels = [], []
+
+    def input_accessor(keys):
+        stamp = keys.tobytes()
+        if stamp not in time_accessors:
+            time_accessors[stamp] = builder.accessor(times[keys], 1, bounds=True)
+        return time_accessors[stamp]
+
+    for b, node in enumerate(joint_nodes):
+        for path, values in (("translation", translation[:, b]), ("rotation", rotation[:, b]),
+                             ("scale", scale[:, b])):
+            if tolerance > 0.0:
+                if is_constant(values, tolerance):
+                    keys = np.array([0])
+                else:
+                    keys = reduce_keys(values, tolerance)
+            else:
+                keys = np.arange(len(times))
+            samplers.append({"input": input_accessor(keys), "output": builder.accessor(values[keys], values.shape[1]),
+                             "interpolation": "LINEAR"})
+            channels.append({"sampler": len(samplers) - 1, "target": {"node": node, "path": path}})
+
+    builder.gltf["animations"].append({"name": clip.name, "samplers": samplers, "channels": channels})
+    return sum(builder.gltf["accessors"][s["output"]]["count"] for s in samplers)
+
+
+# ----------  Export  ----------
+def skinned_meshes(armature, objects):
+    return [o for o in objects if o.type == 'MESH' and find_armature(o) == armature]
+
+
+def export(context, armature, filepath, objects=None, actions=None, step=1, tolerance=0.0, max_influences=4):
+    # actions: None = every action that animates the rig
+    t0 = time.perf_counter()
+    scene = context.scene
+    objects = context.scene.objects if objects is None else objects
+    meshes = skinned_meshes(armature, objects)
+    actions = rig_actions(armature) if actions is None else list(actions)
+    skeleton = DeformSkeleton(armature)
+    builder = GltfBuilder()
+    stats = {'meshes': len(meshes), 'vertices': 0, 'triangles': 0, 'joints': len(skeleton),
+             'clips': 0, 'frames': 0, 'keys': 0}
+
+    # node tree: root (axis conversion + armature transform) -> deform bones -> meshes
+    root = builder.add_node({"name": armature.name,
+                             "matrix": (Z_UP_TO_Y_UP @ np.array(armature.matrix_world)).T.ravel().tolist()})
+    builder.gltf["scenes"][0]["nodes"].append(root)
+    joint_nodes = []
+    for name, rest in zip(skeleton.names, skeleton.rest_local):
+        joint_nodes.append(builder.add_node(dict(name=name, **node_trs(rest))))
+    children = {root: []}
+    for b, parent in enumerate(skeleton.parent.tolist()):
+        owner = root if parent < 0 else joint_nodes[parent]
+        children.setdefault(owner, []).append(joint_nodes[b])
+    for node, kids in children.items():
+        builder.gltf["nodes"][node]["children"] = kids
+
+    builder.gltf["skins"].append({
+        "name": armature.name,
+        "skeleton": root,
+        "joints": joint_nodes,
+        "inverseBindMatrices": builder.accessor(np.linalg.inv(skeleton.rest).transpose(0, 2, 1), 16),
+    })
+
+    # bind pose geometry, written once and shared by every animation
+    materials = {}
+    with rest_pose_evaluation(meshes):
+        depsgraph = context.evaluated_depsgraph_get()
+        for obj in meshes:
+            evaluated = obj.evaluated_get(depsgraph)
+            mesh = evaluated.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
+            try:
+                mesh_id, verts, tris = write_mesh(builder, obj, mesh, armature, skeleton,
+                                                  material_index(builder, obj, materials), max_influences)
+            finally:
+                evaluated.to_mesh_clear()
+            builder.gltf["nodes"][root]["children"].append(
+                builder.add_node({"name": obj.name, "mesh": mesh_id, "skin": 0}))
+            stats['vertices'] += verts
+            stats['triangles'] += tris
+
+    # one bake per clip, the matrices are dropped as soon as the keys are in the buffer
+    for action in actions:
+        clip = bake_action(scene, armature, action, skeleton, step)
+        stats['keys'] += write_clip(builder, clip, joint_nodes, tolerance)
+        stats['frames'] += clip.num_frames
+        stats['clips'] += 1
+
+    builder.write(filepath)
+    stats['time'] = time.perf_counter() - t0
+    stats['bytes'] = os.path.getsize(filepath)
+    return stats
@@ -0,0 +1,181 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from .convert_pipeline import build_deform_index
+from .rig_validation import RigData, SCOPES, deformed_meshes, make_report, rules_in_scopes, run_rules
+from .weights import revision
+
+# the depsgraph handler only marks scopes dirty, a deferred timer re-reads the changed data
+# and re-runs the rules of those scopes; the panel reads the cached reports
+DELAY = 0.25
+
+_validators = {}
+_settings = {}
+
+
+class LiveValidator:
+    # cached issues of one armature object
+
+    def __init__(self, name):
+        self.name = name
+        self.rig = None
+        self.issues = {}
+        self.dirty = set(SCOPES)
+        self.mesh_stamps = {}
+        self.changed_bones = []
+
+    def refresh(self, armature, objects):
+        rebuilt = self.rig is None or self.rig.names != [b.name for b in armature.data.bones]
+        if rebuilt:
+            # bones added, removed or renamed: every rule reads the name index
+            self.rig = RigData(armature)
+            self.mesh_stamps = {}
+            self.changed_bones = list(self.rig.names)
+            self.dirty = set(SCOPES)
+        else:
+            self.changed_bones = []
+            if 'BONES' in self.dirty and not self._update_bones(armature):
+                self.dirty.discard('BONES')
+            if 'POSE' in self.dirty and not self._update_pose(armature):
+                self.dirty.discard('POSE')
+
+        if 'WEIGHTS' in self.dirty and not self._update_weights(armature, objects):
+            self.dirty.discard('WEIGHTS')
+
+        if self.dirty:
+            # bone-local rules only re-check the changed bones (and their children)
+            bones = None if rebuilt else self.changed_bones
+            self.issues.update(run_rules(self.rig, rules_in_scopes(self.dirty), bones=bones,
+                                         previous=self.issues, **_settings))
+        self.dirty = set()
+
+    def _update_bones(self, armature):
+        rig = self.rig
+        old = (rig.head, rig.tail, rig.parent, rig.use_connect)
+        rig.read_bones(armature)
+        changed = ((np.abs(rig.head - old[0]) > 1e-6).any(axis=1) | (np.abs(rig.tail - old[1]) > 1e-6).any(axis=1) |
+                   (rig.parent != old[2]) | (rig.use_connect != old[3]))
+        self.changed_bones = [rig.names[i] for i in np.flatnonzero(changed)]
+        return bool(self.changed_bones)
+
+    def _update_pose(self, armature):
+        old = self.rig.scale
+        if armature.pose is None:
+            return False
+        self.rig.read_pose(armature.pose)
+        if old is None:
+            changed = np.ones(len(self.rig), dtype=bool)
+        else:
+            changed = (old != self.rig.scale).any(axis=1)
+        known = set(self.changed_bones)
+        self.changed_bones += [self.rig.names[i] for i in np.flatnonzero(changed) if self.rig.names[i] not in known]
+        return bool(changed.any())
+
+    def _update_weights(self, armature, objects):
+        # only meshes whose weight revision or group names changed are read again
+        meshes = {obj.name: obj for obj in deformed_meshes(armature, objects)}
+        changed = False
+        for name in list(self.rig.meshes):
+            if name not in meshes:
+                del self.rig.meshes[name]
+                self.mesh_stamps.pop(name, None)
+                changed = True
+        for name, obj in meshes.items():
+            stamp = (revision(obj.data), tuple(vg.name for vg in obj.vertex_groups))
+            if self.mesh_stamps.get(name) != stamp:
+                self.rig.read_weights(obj)
+                self.mesh_stamps[name] = stamp
+                changed = True
+        return changed
+
+    def report(self):
+        if self.rig is None:
+            return None
+        report = make_report(self.rig, self.issues)
+        report['changed_bones'] = self.changed_bones
+        return report
+
+
+def _mark(name, *scopes):
+    validator = _validators.get(name)
+    if validator is None:
+        validator = _validators[name] = LiveValidator(name)
+    validator.dirty.update(scopes)
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    marked = False
+    for update in depsgraph.updates:
+        id_data = update.id.original
+        if isinstance(id_data, bpy.types.Armature):
+            # leaving Edit mode writes the bones back to the armature data
+            for obj in scene.objects:
+                if obj.type == 'ARMATURE' and obj.data == id_data:
+                    _mark(obj.name, 'BONES', 'POSE')
+                    marked = True
+        elif isinstance(id_data, bpy.types.Object):
+            if id_data.type == 'ARMATURE':
+                _mark(id_data.name, 'POSE')
+                marked = True
+        elif isinstance(id_data, bpy.types.Mesh) and update.is_updated_geometry:
+            # weights live in the Mesh datablock: only the armatures deforming one of its users re-read them;
+            # object geometry updates (posing, playback, modifier evaluation) do not touch the weights
+            users = [obj for obj in scene.objects if obj.type == 'MESH' and obj.data == id_data]
+            for name in build_deform_index(users):
+                _mark(name, 'WEIGHTS')
+                marked = True
+
+    if marked and not bpy.app.timers.is_registered(_flush):
+        bpy.app.timers.register(_flush, first_interval=DELAY)
+
+
+def _flush():
+    objects = bpy.data.objects
+    for name in list(_validators):
+        validator = _validators[name]
+        armature = objects.get(name)
+        if armature is None or armature.type != 'ARMATURE':
+            del _validators[name]
+            continue
+        # bones of an armature in Edit mode are written back when leaving it
+        if validator.dirty and armature.mode != 'EDIT':
+            validator.refresh(armature, objects)
+
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+    return None
+
+
+def start(scene, **settings):
+    _settings.clear()
+    _settings.update(settings)
+    _validators.clear()
+    for obj in scene.objects:
+        if obj.type == 'ARMATURE':
+            _mark(obj.name, *SCOPES)
+
+    if on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+    if not bpy.app.timers.is_registered(_flush):
+        bpy.app.timers.register(_flush, first_interval=0.0)
+
+
+def stop():
+    if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    if bpy.app.timers.is_registered(_flush):
+        bpy.app.timers.unregister(_flush)
+    _validators.clear()
+
+
+def is_running():
+    return on_depsgraph_update in bpy.app.handlers.depsgraph_update_post
+
+
+def cached_report(armature):
+    # last result for the armature, None while it has not been checked yet
+    validator = _validators.get(armature.name)
+    return validator.report() if validator is not None else None
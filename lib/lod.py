@@ -0,0 +1,78 @@
+import sys
+import numpy as np
+
+# LOD decimation: pure NumPy without bpy or addon imports, so it also runs as a worker process
+# on Blender's bundled interpreter:  python lod.py job.npz result.npz
+# job: positions (V, 3), tri_verts (T, 3), ratios (L,)
+# result per level i: labels_i (vertex -> LOD vertex, -1 = dropped), positions_i, tri_verts_i, kept_i
+
+SEARCH_STEPS = 16
+
+
+def cluster(positions, tri_verts, cell):
+    # vertex clustering on a grid of the given cell size; triangles that collapse are dropped
+    cells = np.floor((positions - positions.min(axis=0)) / cell).astype(np.int64)
+    _, labels = np.unique(cells, axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    tris = labels[tri_verts]
+    valid = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+    kept = np.flatnonzero(valid)
+    # two faces over the same corners (front/back) are both kept, exact duplicates are not
+    _, first = np.unique(tris[kept], axis=0, return_index=True)
+    kept = kept[np.sort(first)]
+    return labels, kept
+
+
+def decimate(positions, tri_verts, ratio):
+    # largest cell size (log bisection) that keeps at least ratio * triangles
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    tri_verts = np.asarray(tri_verts, dtype=np.int64).reshape(-1, 3)
+    target = max(1, int(len(tri_verts) * ratio))
+    extent = float(np.ptp(positions, axis=0).max()) if len(positions) else 0.0
+    if ratio >= 1.0 or extent <= 0.0 or len(tri_verts) <= target:
+        return np.arange(len(positions)), positions, tri_verts, np.arange(len(tri_verts))
+
+    lo, hi = np.log(extent * 1e-6), np.log(extent)
+    best = None
+    for _ in range(SEARCH_STEPS):
+        mid = 0.5 * (lo + hi)
+        labels, kept = cluster(positions, tri_verts, np.exp(mid))
+        if len(kept) >= target:
+            best = (labels, kept)
+            lo = mid
+        else:
+            hi = mid
+    if best is None:
+        best = cluster(positions, tri_verts, np.exp(lo))
+    labels, kept = best
+
+    # LOD vertex = mean of its cluster; unused clusters are compacted away
+    count = labels.max() + 1
+    members = np.bincount(labels, minlength=count)
+    centers = np.stack([np.bincount(labels, weights=positions[:, a], minlength=count) for a in range(3)], axis=1)
+    centers /= np.maximum(members, 1)[:, None]
+    used = np.unique(labels[tri_verts[kept]])
+    compact = np.full(count, -1, dtype=np.int64)
+    compact[used] = np.arange(used.size)
+    return compact[labels], centers[used], compact[labels[tri_verts[kept]]], kept
+
+
+def decimate_levels(positions, tri_verts, ratios):
+    result = {}
+    for i, ratio in enumerate(ratios):
+        labels, lod_positions, lod_tris, kept = decimate(positions, tri_verts, float(ratio))
+        result[f"labels_{i}"] = labels
+        result[f"positions_{i}"] = lod_positions
+        result[f"tri_verts_{i}"] = lod_tris
+        result[f"kept_{i}"] = kept
+    return result
+
+
+def main(argv):
+    job = np.load(argv[0])
+    np.savez(argv[1], **decimate_levels(job["positions"], job["tri_verts"], job["ratios"]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
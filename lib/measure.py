@@ -0,0 +1,119 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from . import weights
+
+# World-space extents of evaluated meshes (modifiers, parenting and rotation included), read as
+# bulk vertex arrays; results are cached per object until its weights, evaluated geometry or transform change
+
+# evaluated-geometry revision per object (pose, modifiers, edits), and the cached extents
+_revisions = {}
+_extents_cache = {}
+
+
+def evaluated_positions(context, obj, deform_only=False):
+    # (V, 3) world positions of the evaluated mesh, only deform-weighted vertices if requested
+    depsgraph = context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+        if deform_only and len(co):
+            co = co[deform_mask(obj, mesh)]
+        matrix = np.array(obj_eval.matrix_world, dtype=np.float64)
+    finally:
+        obj_eval.to_mesh_clear()
+    return co @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def deform_mask(obj, mesh):
+    # vertices with weight in a group of a deform bone of the object's armature
+    armature = obj.find_armature()
+    if armature is None:
+        return np.zeros(len(mesh.vertices), dtype=bool)
+    deform = {bone.name for bone in armature.data.bones if bone.use_deform}
+    table = weights.WeightTable.from_object(obj, mesh)
+    if table.num_verts != len(mesh.vertices):
+        return np.zeros(len(mesh.vertices), dtype=bool)
+    is_deform = np.array([name in deform for name in table.group_names], dtype=bool)
+    used = (table.weights > 0.0) & is_deform[table.groups] if table.nnz else np.zeros(0, dtype=bool)
+    mask = np.zeros(table.num_verts, dtype=bool)
+    mask[table.rows[used]] = True
+    return mask
+
+
+def object_extents(context, obj, deform_only=False):
+    # (min, max) of one mesh object, None without vertices
+    key = (obj.session_uid, obj.data.session_uid, deform_only)
+    stamp = (weights.revision(obj.data), _revisions.get(obj.session_uid, 0), len(obj.data.vertices),
+             tuple(v for row in obj.matrix_world for v in row))
+    cached = _extents_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        positions = evaluated_positions(context, obj, deform_only)
+        extents = (positions.min(axis=0), positions.max(axis=0)) if len(positions) else None
+        cached = (stamp, extents)
+        _extents_cache[key] = cached
+    return cached[1]
+
+
+def world_extents(context, objects, deform_only=False):
+    # combined (min, max) over the mesh objects, None without vertices
+    lows, highs = [], []
+    for obj in objects:
+        if obj.type != 'MESH':
+            continue
+        extents = object_extents(context, obj, deform_only)
+        if extents is not None:
+            lows.append(extents[0])
+            highs.append(extents[1])
+    if not lows:
+        return None
+    return np.min(lows, axis=0), np.max(highs, axis=0)
+
+
+def height(context, objects, deform_only=False):
+    extents = world_extents(context, objects, deform_only)
+    return 0.0 if extents is None else float(extents[1][2] - extents[0][2])
+
+
+def size(context, objects, deform_only=False):
+    # length of the world bounding box diagonal
+    extents = world_extents(context, objects, deform_only)
+    return 0.0 if extents is None else float(np.linalg.norm(extents[1] - extents[0]))
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    # the evaluated mesh also changes with the pose and modifier settings, not only with the Mesh datablock
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Object):
+            key = update.id.original.session_uid
+            _revisions[key] = _revisions.get(key, 0) + 1
+
+
+@persistent
+def on_load_post(dummy):
+    # session uids and revisions start over with every loaded file
+    clear_cache()
+
+
+def clear_cache():
+    _revisions.clear()
+    _extents_cache.clear()
+
+
+def register_handlers():
+    if on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+    if on_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(on_load_post)
+
+
+def unregister_handlers():
+    if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    if on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_load_post)
+    clear_cache()
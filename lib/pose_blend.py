@@ -0,0 +1,154 @@
+import numpy as np
+
+# blend groups of the Bento pose sliders
+BLEND_GROUPS = ('SPINE', 'HANDS', 'FACE', 'BODY')
+
+_SPINE_BONES = {"mPelvis", "mTorso", "mChest", "mNeck", "mHead", "mSkull"}
+
+# compiled poses by id of the source tree, bound blenders by armature
+_compiled_poses = {}
+_blenders = {}
+
+
+def get_blend_group(bone_name):
+    if bone_name.startswith("mFace") or bone_name.startswith("mEye"):
+        return 'FACE'
+    if bone_name.startswith("mHand") or bone_name.startswith("mWrist"):
+        return 'HANDS'
+    if bone_name.startswith("mSpine") or bone_name in _SPINE_BONES:
+        return 'SPINE'
+    return 'BODY'
+
+
+class CompiledPose:
+    # flat per-bone arrays of a nested {"name": {"pos", "rot", "children"}} pose tree
+
+    def __init__(self, tree):
+        entries = []
+
+        def walk(bone_dict):
+            for name, data in bone_dict.items():
+                if not isinstance(data, dict):
+                    continue
+                if 'pos' in data:
+                    entries.append((name, data['pos'], data.get('rot')))
+                if 'children' in data:
+                    walk(data['children'])
+
+        walk(tree)
+
+        self.names = [e[0] for e in entries]
+        self.pos = np.array([e[1] for e in entries], dtype=np.float32).reshape(-1, 3)
+        self.rot = np.array([e[2] if e[2] is not None else (0.0, 0.0, 0.0) for e in entries], dtype=np.float32).reshape(-1, 3)
+        self.has_rot = np.array([e[2] is not None for e in entries], dtype=bool)
+        self.groups = np.array([BLEND_GROUPS.index(get_blend_group(n)) for n in self.names], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def compile_pose(tree):
+    pose = _compiled_poses.get(id(tree))
+    if pose is None:
+        pose = CompiledPose(tree)
+        _compiled_poses[id(tree)] = pose
+    return pose
+
+
+class PoseBlender:
+    # pose bound to the pose bone indices of one armature
+
+    def __init__(self, armature, pose, resolve_bone):
+        bones = armature.pose.bones
+        bone_index = {pb.name: i for i, pb in enumerate(bones)}
+
+        rows = []
+        sources = []
+        self.missing = []
+        for i, name in enumerate(pose.names):
+            pb = resolve_bone(armature, name)
+            if pb is None:
+                self.missing.append(name)
+                continue
+            rows.append(bone_index[pb.name])
+            sources.append(i)
+            if pose.has_rot[i] and pb.rotation_mode != 'XYZ':
+                pb.rotation_mode = 'XYZ'
+
+        sources = np.array(sources, dtype=np.int32)
+        self.bone_count = len(bones)
+        self.rows = np.array(rows, dtype=np.int32)
+        self.target_pos = pose.pos[sources]
+        self.target_rot = pose.rot[sources]
+        self.has_rot = pose.has_rot[sources]
+        self.groups = pose.groups[sources]
+
+        self.base_mode = None
+        self.base_pos = None
+        self.base_rot = None
+        self.last_weights = None
+
+    def read_channels(self, armature):
+        bones = armature.pose.bones
+        loc = np.empty(self.bone_count * 3, dtype=np.float32)
+        rot = np.empty(self.bone_count * 3, dtype=np.float32)
+        bones.foreach_get("location", loc)
+        bones.foreach_get("rotation_euler", rot)
+        return loc.reshape(-1, 3), rot.reshape(-1, 3)
+
+    def capture_base(self, armature, mode):
+        if mode == 'REST':
+            self.base_pos = np.zeros_like(self.target_pos)
+            self.base_rot = np.zeros_like(self.target_rot)
+        else:
+            loc, rot = self.read_channels(armature)
+            self.base_pos = loc[self.rows]
+            self.base_rot = rot[self.rows]
+        self.base_mode = mode
+
+    def apply(self, armature, weights, base_mode='CURRENT', use_position=True, use_rotation=True):
+        # weights: scalar or one weight per blend group
+        if not len(self.rows):
+            return 0
+
+        w = np.asarray(weights, dtype=np.float32)
+        if w.ndim:
+            w = w[self.groups]
+        else:
+            w = np.full(len(self.rows), w, dtype=np.float32)
+
+        # a new drag starts from zero: capture the pose we blend from
+        restart = self.last_weights is None or not np.any(self.last_weights)
+        if self.base_pos is None or self.base_mode != base_mode or (restart and base_mode == 'CURRENT'):
+            self.capture_base(armature, base_mode)
+
+        loc, rot = self.read_channels(armature)
+        w = w[:, None]
+        if use_position:
+            loc[self.rows] = self.base_pos + (self.target_pos - self.base_pos) * w
+        if use_rotation:
+            rot_rows = self.rows[self.has_rot]
+            rot[rot_rows] = (self.base_rot + (self.target_rot - self.base_rot) * w)[self.has_rot]
+
+        bones = armature.pose.bones
+        bones.foreach_set("location", loc.ravel())
+        bones.foreach_set("rotation_euler", rot.ravel())
+        armature.update_tag()
+
+        self.last_weights = w.ravel()
+        return len(self.rows)
+
+
+def get_pose_blender(armature, key, tree, resolve_bone):
+    # bound blenders are reused until the armature changes its bone count;
+    # clear_pose_blenders() drops them when another file is loaded
+    cache_key = (armature.name, key)
+    blender = _blenders.get(cache_key)
+    if blender is None or blender.bone_count != len(armature.pose.bones):
+        blender = PoseBlender(armature, compile_pose(tree), resolve_bone)
+        _blenders[cache_key] = blender
+    return blender
+
+
+def clear_pose_blenders():
+    _blenders.clear()
@@ -0,0 +1,75 @@
+import bpy
+import numpy as np
+from .weights import WeightTable, interpolate
+from .spatial import SurfaceTree, mesh_triangles, vertex_positions
+
+
+def make_proxy(context, obj, ratio):
+    # decimated copy of obj, same local space and world matrix, without vertex groups
+    source = bpy.data.objects.new(obj.name + "_proxy_src", obj.data)
+    source.matrix_world = obj.matrix_world
+    context.scene.collection.objects.link(source)
+
+    decimate = source.modifiers.new("ProxyDecimate", 'DECIMATE')
+    decimate.decimate_type = 'COLLAPSE'
+    decimate.ratio = ratio
+    decimate.use_collapse_triangulate = True
+
+    depsgraph = context.evaluated_depsgraph_get()
+    mesh = bpy.data.meshes.new_from_object(source.evaluated_get(depsgraph))
+    bpy.data.objects.remove(source)
+
+    proxy = bpy.data.objects.new(obj.name + "_proxy", mesh)
+    proxy.matrix_world = obj.matrix_world
+    context.scene.collection.objects.link(proxy)
+    proxy.vertex_groups.clear()
+    return proxy
+
+
+def remove_proxy(proxy):
+    mesh = proxy.data
+    bpy.data.objects.remove(proxy)
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+
+def heat_weight(context, proxy, armature):
+    # ARMATURE_AUTO parents the selection to the active armature
+    bpy.ops.object.select_all(action='DESELECT')
+    proxy.select_set(True)
+    armature.select_set(True)
+    context.view_layer.objects.active = armature
+    bpy.ops.object.parent_set(type='ARMATURE_AUTO')
+
+
+def transfer_from_proxy(proxy, obj):
+    # nearest surface point on the proxy for every vertex, weights interpolated from its triangle
+    proxy_table = WeightTable.from_object(proxy)
+    tree = SurfaceTree(vertex_positions(proxy.data), mesh_triangles(proxy.data))
+    corners, factors = tree.query(vertex_positions(obj.data))
+    return interpolate(proxy_table, corners, factors, len(obj.data.vertices))
+
+
+def replace_groups(table, transferred):
+    # entries of the transferred groups replace the existing ones, other groups stay
+    names = set(transferred.group_names)
+    stale = [gi for gi, name in enumerate(table.group_names) if name in names]
+    if stale:
+        table.filter(~np.isin(table.groups, stale))
+
+    index_map = np.array([table.add_group(name) for name in transferred.group_names], dtype=np.int64)
+    if transferred.nnz:
+        table.merge_entries(transferred.rows, index_map[transferred.groups], transferred.weights, 'REPLACE')
+    return table
+
+
+def bind_to_armature(obj, armature):
+    # what ARMATURE_AUTO sets up besides the weights
+    if obj.parent != armature:
+        world = obj.matrix_world.copy()
+        obj.parent = armature
+        obj.matrix_parent_inverse = armature.matrix_world.inverted()
+        obj.matrix_world = world
+    if not any(m.type == 'ARMATURE' and m.object == armature for m in obj.modifiers):
+        mod = obj.modifiers.new("Armature", 'ARMATURE')
+        mod.object = armature
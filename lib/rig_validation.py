@@ -0,0 +1,262 @@
+import json
+import numpy as np
+from .weights import get_group_stats
+from .convert_pipeline import build_deform_index
+
+# rules read a RigData snapshot and return a list of issues {'bone': name, 'message': text, ...};
+# scope tells which part of the rig a rule reads: 'BONES' (rest data), 'POSE' or 'WEIGHTS';
+# local rules judge every bone by its own data and its parent's, so they can re-check a subset of bones
+RULES = {}
+SCOPES = ('BONES', 'POSE', 'WEIGHTS')
+
+DEFAULTS = {
+    'root': "mPelvis",
+    'connect_tolerance': 0.001,
+    'scale_tolerance': 0.001,
+    'min_length': 0.001,
+    'min_avg_weight': 0.2,
+}
+
+
+class Rule:
+    def __init__(self, name, func, scope, title, local=False):
+        self.name = name
+        self.func = func
+        self.scope = scope
+        self.title = title
+        self.local = local
+
+
+def rule(name, scope='BONES', title=None, local=False):
+    # decorator: registers func(rig, settings) -> issues under name
+    if scope not in SCOPES:
+        raise ValueError(f"Unbekannter Scope: {scope}")
+
+    def decorator(func):
+        RULES[name] = Rule(name, func, scope, title or name, local)
+        return func
+    return decorator
+
+
+def unregister_rule(name):
+    RULES.pop(name, None)
+
+
+class RigData:
+    # rest bones, pose scale and weight stats of one armature, read in bulk without a mode change
+
+    def __init__(self, armature, meshes=()):
+        self.name = armature.name
+        self.read_bones(armature)
+
+        self.scale = None
+        if armature.pose is not None:
+            self.read_pose(armature.pose)
+
+        self.meshes = {}
+        for obj in meshes:
+            self.read_weights(obj)
+
+    def read_bones(self, armature):
+        bones = armature.data.bones
+        n = len(bones)
+        self.names = [b.name for b in bones]
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        head = np.empty(n * 3, dtype=np.float32)
+        tail = np.empty(n * 3, dtype=np.float32)
+        connect = np.empty(n, dtype=bool)
+        bones.foreach_get("head_local", head)
+        bones.foreach_get("tail_local", tail)
+        bones.foreach_get("use_connect", connect)
+        self.head = head.reshape(-1, 3)
+        self.tail = tail.reshape(-1, 3)
+        self.use_connect = connect
+
+        # parent is a pointer, foreach_get cannot read it
+        self.parent = np.array([self.index[b.parent.name] if b.parent else -1 for b in bones], dtype=np.int64)
+
+    def read_pose(self, pose):
+        pose_bones = pose.bones
+        scale = np.empty(len(pose_bones) * 3, dtype=np.float32)
+        pose_bones.foreach_get("scale", scale)
+        scale = scale.reshape(-1, 3)
+
+        # pose channels normally follow the bone order, map by name if not
+        pose_names = [pb.name for pb in pose_bones]
+        if pose_names != self.names:
+            pose_index = {name: i for i, name in enumerate(pose_names)}
+            order = np.array([pose_index.get(name, -1) for name in self.names], dtype=np.int64)
+            scale = np.where(order[:, None] >= 0, scale[order], 1.0)
+        self.scale = scale
+
+    def read_weights(self, obj):
+        self.meshes[obj.name] = ([vg.name for vg in obj.vertex_groups], get_group_stats(obj))
+
+    @property
+    def lengths(self):
+        return np.linalg.norm(self.tail - self.head, axis=1)
+
+    def __len__(self):
+        return len(self.names)
+
+
+# ----------  Rules  ----------
+def selected_bones(rig, settings):
+    # bone indices a local rule checks: all, or settings['bones'] on an incremental run
+    bones = settings.get('bones')
+    return np.arange(len(rig)) if bones is None else bones
+
+
+@rule('missing', title="Fehlende Bones")
+def check_missing(rig, settings):
+    bone_parents = settings.get('bone_parents')
+    if not bone_parents:
+        return []
+    expected = set(bone_parents.keys()).union(bone_parents.values()) - {None}
+    return [{'bone': name, 'message': name} for name in sorted(expected) if name not in rig.index]
+
+
+@rule('extra_roots', title="Unerwünschte Root-Bones")
+def check_extra_roots(rig, settings):
+    roots = np.flatnonzero(rig.parent < 0)
+    root = settings.get('root')
+    if root:
+        extra = [rig.names[i] for i in roots if rig.names[i] != root]
+    else:
+        extra = [rig.names[i] for i in roots[1:]]
+    return [{'bone': name, 'message': name} for name in extra]
+
+
+@rule('wrong_parents', title="Falsches Parenting", local=True)
+def check_wrong_parents(rig, settings):
+    bone_parents = settings.get('bone_parents')
+    if not bone_parents:
+        return []
+    issues = []
+    bones = selected_bones(rig, settings)
+    for i in bones[rig.parent[bones] >= 0]:
+        name = rig.names[i]
+        expected = bone_parents.get(name)
+        actual = rig.names[rig.parent[i]]
+        if expected and actual != expected:
+            issues.append({'bone': name, 'expected': expected, 'actual': actual,
+                           'message': f"{name} (erwartet: {expected}, aktuell: {actual})"})
+    return issues
+
+
+@rule('disconnected', title="Unverbundene Bones (use_connect)", local=True)
+def check_disconnected(rig, settings):
+    bones = selected_bones(rig, settings)
+    child = bones[rig.use_connect[bones] & (rig.parent[bones] >= 0)]
+    gap = np.linalg.norm(rig.head[child] - rig.tail[rig.parent[child]], axis=1)
+    bad = gap > settings['connect_tolerance']
+    return [{'bone': rig.names[i], 'gap': float(g), 'message': rig.names[i]}
+            for i, g in zip(child[bad], gap[bad])]
+
+
+@rule('non_uniform_scale', scope='POSE', title="Nicht-uniforme Skalierung", local=True)
+def check_non_uniform_scale(rig, settings):
+    if rig.scale is None:
+        return []
+    bones = selected_bones(rig, settings)
+    s = rig.scale
+    tol = settings['scale_tolerance']
+    bad = bones[(np.abs(s[bones, 0] - s[bones, 1]) > tol) | (np.abs(s[bones, 1] - s[bones, 2]) > tol)]
+    return [{'bone': rig.names[i], 'scale': s[i].tolist(), 'message': rig.names[i]} for i in bad]
+
+
+@rule('tiny_bones', title="Extrem kurze Knochen", local=True)
+def check_tiny_bones(rig, settings):
+    lengths = np.full(len(rig), np.inf)
+    bones = selected_bones(rig, settings)
+    lengths[bones] = np.linalg.norm(rig.tail[bones] - rig.head[bones], axis=1)
+    bad = bones[lengths[bones] < settings['min_length']]
+    return [{'bone': rig.names[i], 'length': float(lengths[i]),
+             'message': f"{rig.names[i]} (Länge: {lengths[i]:.4f})"} for i in bad]
+
+
+@rule('weak_weights', scope='WEIGHTS', title="Geringer Einfluss")
+def check_weak_weights(rig, settings):
+    issues = []
+    for mesh_name, (group_names, stats) in rig.meshes.items():
+        for gi, name in enumerate(group_names):
+            if name not in rig.index or not stats['count'][gi]:
+                continue
+            avg = float(stats['sum'][gi] / stats['count'][gi])
+            if avg < settings['min_avg_weight']:
+                issues.append({'bone': name, 'mesh': mesh_name, 'average': avg,
+                               'message': f"{name} @ {mesh_name} (Avg: {avg:.2f})"})
+    return issues
+
+
+# ----------  Engine  ----------
+def deformed_meshes(armature, objects):
+    # meshes deformed by this armature (parent or Armature modifier), same rule as the conversion
+    return build_deform_index(objects).get(armature.name, [])
+
+
+def rules_in_scopes(scopes):
+    return [name for name, r in RULES.items() if r.scope in scopes]
+
+
+def affected_bones(rig, bones):
+    # changed bones and their children (local rules also read the parent)
+    changed = np.zeros(len(rig), dtype=bool)
+    changed[[rig.index[name] for name in bones if name in rig.index]] = True
+    has_parent = rig.parent >= 0
+    changed[has_parent] |= changed[rig.parent[has_parent]]
+    return np.flatnonzero(changed)
+
+
+def run_rules(rig, names=None, bones=None, previous=None, **settings):
+    # {rule name: issues} for the given rules (default: all registered); with bones (changed bone names)
+    # and the previous issues, local rules re-check only the affected bones and keep the other issues
+    settings = {**DEFAULTS, **settings}
+    selected = RULES if names is None else {n: RULES[n] for n in names if n in RULES}
+    subset = None
+    if bones is not None and previous is not None:
+        subset = affected_bones(rig, bones)
+        affected = {rig.names[i] for i in subset}
+
+    issues = {}
+    for name, r in selected.items():
+        if subset is None or not r.local or name not in previous:
+            issues[name] = r.func(rig, settings)
+            continue
+        kept = [issue for issue in previous[name] if issue['bone'] not in affected]
+        found = kept + r.func(rig, {**settings, 'bones': subset})
+        issues[name] = sorted(found, key=lambda issue: rig.index.get(issue['bone'], -1))
+    return issues
+
+
+def make_report(rig, issues):
+    return {
+        'armature': rig.name,
+        'bones': len(rig),
+        'meshes': sorted(rig.meshes),
+        'ok': not any(issues.values()),
+        'counts': {name: len(found) for name, found in issues.items()},
+        'issues': issues,
+    }
+
+
+def validate(armature, meshes=(), rules=None, **settings):
+    rig = RigData(armature, meshes)
+    return make_report(rig, run_rules(rig, rules, **settings))
+
+
+def report_lines(report):
+    # readable summary for popups and the console, one section per rule with issues
+    lines = []
+    for name, found in report['issues'].items():
+        if not found:
+            continue
+        lines.append(f"{RULES[name].title if name in RULES else name}:")
+        lines.extend(f"- {issue['message']}" for issue in found)
+    return lines
+
+
+def write_json(filepath, reports):
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(reports, f, indent=2)
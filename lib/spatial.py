@@ -0,0 +1,126 @@
+import numpy as np
+from mathutils import kdtree, bvhtree
+
+# SciPy is not bundled with Blender: use it when installed, else mathutils.kdtree
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+def vertex_positions(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3)
+
+
+class PointTree:
+    # k-nearest queries over a fixed point set, batched over all query points
+
+    def __init__(self, points):
+        self.points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        if cKDTree is not None:
+            self._tree = cKDTree(self.points)
+        else:
+            self._tree = kdtree.KDTree(len(self.points))
+            for i, co in enumerate(self.points.tolist()):
+                self._tree.insert(co, i)
+            self._tree.balance()
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, queries, k=1):
+        # returns (distances, indices), both shaped (len(queries), k)
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        k = max(1, min(k, len(self.points)))
+
+        if cKDTree is not None:
+            dist, index = self._tree.query(queries, k=k, workers=-1)
+            return dist.reshape(-1, k), index.reshape(-1, k).astype(np.int64)
+
+        dist = np.empty((len(queries), k), dtype=np.float64)
+        index = np.empty((len(queries), k), dtype=np.int64)
+        find_n = self._tree.find_n
+        for i, co in enumerate(queries.tolist()):
+            hits = find_n(co, k)
+            index[i] = [h[1] for h in hits]
+            dist[i] = [h[2] for h in hits]
+        return dist, index
+
+
+def inverse_distance_factors(dist, power=2.0, eps=1e-8):
+    # per query row: factors summing to 1.0, an exact hit takes everything
+    factors = 1.0 / np.maximum(dist, eps) ** power
+    return factors / factors.sum(axis=1, keepdims=True)
+
+
+def mesh_triangles(mesh):
+    # loop triangles as vertex index triples
+    mesh.calc_loop_triangles()
+    tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", tris)
+    return tris.reshape(-1, 3)
+
+
+def barycentric(points, a, b, c):
+    # weights of the triangle corners for points on (or projected onto) the triangle
+    v0, v1, v2 = b - a, c - a, points - a
+    d00 = np.einsum('ij,ij->i', v0, v0)
+    d01 = np.einsum('ij,ij->i', v0, v1)
+    d11 = np.einsum('ij,ij->i', v1, v1)
+    d20 = np.einsum('ij,ij->i', v2, v0)
+    d21 = np.einsum('ij,ij->i', v2, v1)
+    denom = d00 * d11 - d01 * d01
+    degenerate = np.abs(denom) < 1e-20
+    denom[degenerate] = 1.0
+
+    v = (d11 * d20 - d01 * d21) / denom
+    w = (d00 * d21 - d01 * d20) / denom
+    factors = np.clip(np.stack([1.0 - v - w, v, w], axis=1), 0.0, None)
+    factors[degenerate] = (1.0, 0.0, 0.0)
+    return factors / np.maximum(factors.sum(axis=1, keepdims=True), 1e-12)
+
+
+class SurfaceTree:
+    # nearest point on a triangle surface, as corner indices + barycentric factors
+
+    def __init__(self, points, triangles):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self._tree = bvhtree.BVHTree.FromPolygons(self.points.tolist(), self.triangles.tolist(), all_triangles=True)
+
+    def query(self, queries):
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        location = queries.copy()
+        face = np.zeros(len(queries), dtype=np.int64)
+
+        find_nearest = self._tree.find_nearest
+        for i, co in enumerate(queries.tolist()):
+            hit, _normal, index, _dist = find_nearest(co)
+            if hit is not None:
+                location[i] = hit
+                face[i] = index
+
+        corners = self.triangles[face]
+        factors = barycentric(location, self.points[corners[:, 0]], self.points[corners[:, 1]],
+                              self.points[corners[:, 2]])
+        return corners, factors
+
+
+def mirror_partners(positions, tolerance=0.001, side=None):
+    # one KD-tree of the X-reflected positions, one query for all vertices;
+    # returns the partner of every vertex and the vertices to update ('POSITIVE'/'NEGATIVE': that X side only)
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    tree = PointTree(positions * (-1.0, 1.0, 1.0))
+    dist, index = tree.query(positions, 1)
+    partner = index[:, 0]
+    valid = dist[:, 0] <= tolerance
+
+    if side == 'POSITIVE':
+        valid_side = valid & (positions[:, 0] > tolerance)
+    elif side == 'NEGATIVE':
+        valid_side = valid & (positions[:, 0] < -tolerance)
+    else:
+        valid_side = valid
+    return partner, np.flatnonzero(valid_side), int((~valid).sum())
@@ -0,0 +1,177 @@
+import numpy as np
+from mathutils import Matrix
+
+# Apply location/rotation/scale at data level: object data transformed in place, children keep their
+# world transform through their parent inverse, no operators and no selection changes
+
+# parent types whose parent matrix comes from bones or vertices of the parent data: the data transform
+# moves them, the parent inverse alone cannot keep the child in place
+INDIRECT_PARENTS = {'BONE', 'VERTEX', 'VERTEX_3'}
+
+# modifier distances that scale with the object (uniform part of the applied scale)
+SCALED_MODIFIER_PROPS = {
+    'SOLIDIFY': ('thickness',),
+    'BEVEL': ('width',),
+    'DISPLACE': ('strength',),
+    'SHRINKWRAP': ('offset',),
+    'WELD': ('merge_threshold',),
+    'MIRROR': ('merge_threshold',),
+    'WIREFRAME': ('thickness',),
+}
+# modifier vectors in object space
+TRANSFORMED_MODIFIER_VECTORS = {
+    'ARRAY': ('constant_offset_displacement',),
+}
+
+
+def hierarchy_order(objects):
+    # parents before children
+    def depth(obj):
+        d = 0
+        while obj.parent is not None:
+            obj = obj.parent
+            d += 1
+        return d
+    return sorted(objects, key=depth)
+
+
+def can_apply(obj):
+    # object data that Blender can transform in place, and not shared with other objects
+    data = obj.data
+    if data is None or not hasattr(data, "transform"):
+        return False, "kein transformierbarer Datentyp"
+    if data.users > 1:
+        return False, "Daten werden von mehreren Objekten verwendet"
+    if data.library is not None:
+        return False, "verlinkte Daten"
+    return True, ""
+
+
+def reset_basis(obj):
+    obj.location = (0.0, 0.0, 0.0)
+    obj.rotation_euler = (0.0, 0.0, 0.0)
+    obj.rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+    obj.rotation_axis_angle = (0.0, 0.0, 1.0, 0.0)
+    obj.scale = (1.0, 1.0, 1.0)
+    obj.delta_location = (0.0, 0.0, 0.0)
+    obj.delta_rotation_euler = (0.0, 0.0, 0.0)
+    obj.delta_rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+    obj.delta_scale = (1.0, 1.0, 1.0)
+
+
+def clear_pose(pose):
+    # pose.transforms_clear for every bone, as bulk writes
+    bones = pose.bones
+    n = len(bones)
+    if not n:
+        return
+    bones.foreach_set("location", np.zeros(n * 3, dtype=np.float32))
+    bones.foreach_set("rotation_quaternion", np.tile(np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32), n))
+    bones.foreach_set("rotation_euler", np.zeros(n * 3, dtype=np.float32))
+    bones.foreach_set("rotation_axis_angle", np.tile(np.array([0.0, 0.0, 1.0, 0.0], dtype=np.float32), n))
+    bones.foreach_set("scale", np.ones(n * 3, dtype=np.float32))
+
+
+def fix_modifiers(obj, matrix):
+    scale = abs(matrix.to_3x3().determinant()) ** (1.0 / 3.0)
+    linear = matrix.to_3x3()
+    fixed = 0
+    for mod in obj.modifiers:
+        for prop in SCALED_MODIFIER_PROPS.get(mod.type, ()):
+            if mod.type == 'BEVEL' and mod.offset_type == 'PERCENT':
+                continue
+            setattr(mod, prop, getattr(mod, prop) * scale)
+            fixed += 1
+        for prop in TRANSFORMED_MODIFIER_VECTORS.get(mod.type, ()):
+            setattr(mod, prop, linear @ getattr(mod, prop))
+            fixed += 1
+    return fixed
+
+
+def bake_matrix(obj, matrix, children=()):
+    # matrix was removed from the object transform: move it into the data, children keep their world transform
+    if hasattr(obj.data, "shape_keys"):
+        # meshes, curves, lattices: the key blocks (Basis included) move with the vertices
+        obj.data.transform(matrix, shape_keys=True)
+    else:
+        obj.data.transform(matrix)
+    if obj.type == 'MESH' and matrix.to_3x3().determinant() < 0.0 and hasattr(obj.data, "flip_normals"):
+        # mirrored: keep the faces pointing outwards
+        obj.data.flip_normals()
+    direct = [child for child in children if child.parent_type not in INDIRECT_PARENTS]
+    for child in direct:
+        child.matrix_parent_inverse = matrix @ child.matrix_parent_inverse
+    return len(direct), fix_modifiers(obj, matrix)
+
+
+def hold_children(children):
+    # (child, parent frame in world space) of bone/vertex parented children, before the parent data changes
+    return [(child, child.matrix_world @ child.matrix_basis.inverted_safe())
+            for child in children if child.parent_type in INDIRECT_PARENTS]
+
+
+def restore_children(held, view_layer):
+    # after the parent data changed: new parent inverse from the evaluated parent matrix, so the
+    # children's parent frame (and world transform) is the one stored by hold_children
+    if not held:
+        return 0
+    view_layer.update()
+    for child, frame in held:
+        parent_inverse = child.matrix_parent_inverse @ child.matrix_basis @ child.matrix_world.inverted_safe()
+        child.matrix_parent_inverse = parent_inverse @ frame
+    view_layer.update()
+    return len(held)
+
+
+def apply_object(obj, children, clear_poses=True):
+    # bake matrix_basis into the data; the world transform of obj and its children stays the same
+    if obj.type == 'ARMATURE' and clear_poses and obj.pose is not None:
+        clear_pose(obj.pose)
+    matrix = obj.matrix_basis.copy()
+    if matrix == Matrix.Identity(4):
+        return 0, 0
+    reset_basis(obj)
+    return bake_matrix(obj, matrix, children)
+
+
+def apply_scale(obj, children=(), view_layer=None):
+    # transform_apply(scale=True) for one object: only the scale is baked, location and rotation stay;
+    # with a view layer, bone/vertex parented children are kept in place too
+    sx, sy, sz = obj.scale
+    matrix = Matrix.Diagonal((sx, sy, sz, 1.0))
+    if matrix == Matrix.Identity(4):
+        return 0, 0
+    held = hold_children(children) if view_layer is not None else []
+    obj.scale = (1.0, 1.0, 1.0)
+    fixed_children, fixed_modifiers = bake_matrix(obj, matrix, children)
+    return fixed_children + restore_children(held, view_layer), fixed_modifiers
+
+
+def apply_transforms(objects, all_objects, view_layer, clear_poses=True):
+    # objects: to apply, all_objects: scene objects (for the children of the applied ones);
+    # view_layer is updated once at the end, twice if bone/vertex parented children need a new inverse
+    children = {}
+    for obj in all_objects:
+        if obj.parent is not None:
+            children.setdefault(obj.parent.name, []).append(obj)
+
+    held = []
+    for obj in objects:
+        held += hold_children(children.get(obj.name, []))
+
+    stats = {'applied': 0, 'children': 0, 'modifiers': 0, 'skipped': []}
+    for obj in hierarchy_order(objects):
+        ok, reason = can_apply(obj)
+        if not ok:
+            stats['skipped'].append((obj.name, reason))
+            continue
+        fixed_children, fixed_modifiers = apply_object(obj, children.get(obj.name, []), clear_poses)
+        stats['applied'] += 1
+        stats['children'] += fixed_children
+        stats['modifiers'] += fixed_modifiers
+
+    if held:
+        stats['children'] += restore_children(held, view_layer)
+    else:
+        view_layer.update()
+    return stats
@@ -0,0 +1,143 @@
+import json
+import numpy as np
+from .bone_map import strip_namespace
+
+# rules file:
+# {"rules": [
+#     {"source": "Head", "mode": "RATIO", "targets": {"mHead": 0.7, "mSkull": 0.3}},
+#     {"source": "Spine", "mode": "GRADIENT", "targets": ["mSpine1", "mSpine2", "mSpine3", "mSpine4"],
+#      "axis": ["Spine", "Spine2"]}
+# ]}
+# source and axis names are compared without namespace ("mixamorig:Head" == "Head")
+SPLIT_MODES = ('RATIO', 'GRADIENT')
+
+
+class SplitRule:
+    # source group -> N targets, by fixed ratios or along the axis head(first) -> tail(last bone)
+
+    def __init__(self, source, targets, mode='RATIO', ratios=None, axis=None, keep_source=False):
+        self.source = strip_namespace(source)
+        self.targets = list(targets)
+        self.mode = mode
+        self.ratios = None
+        if ratios is not None:
+            ratios = np.asarray(ratios, dtype=np.float32)
+            self.ratios = ratios / ratios.sum()
+        self.axis = [strip_namespace(b) for b in (axis or [source])]
+        self.keep_source = keep_source
+
+    @classmethod
+    def from_dict(cls, data):
+        source = data.get('source')
+        targets = data.get('targets')
+        if not source or not targets:
+            raise ValueError("Regel braucht 'source' und 'targets'")
+
+        mode = data.get('mode', 'RATIO' if isinstance(targets, dict) else 'GRADIENT').upper()
+        if mode not in SPLIT_MODES:
+            raise ValueError(f"Unbekannter Modus: {mode}")
+
+        if mode == 'RATIO':
+            if not isinstance(targets, dict) or sum(targets.values()) <= 0:
+                raise ValueError(f"{source}: RATIO braucht {{Ziel: Anteil}}")
+            return cls(source, targets.keys(), mode, ratios=list(targets.values()),
+                       keep_source=data.get('keep_source', False))
+
+        return cls(source, targets, mode, axis=data.get('axis'), keep_source=data.get('keep_source', False))
+
+
+def load_rules(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    entries = data.get('rules', []) if isinstance(data, dict) else data
+    return [SplitRule.from_dict(entry) for entry in entries]
+
+
+def find_armature(obj):
+    for mod in obj.modifiers:
+        if mod.type == 'ARMATURE' and mod.object is not None:
+            return mod.object
+    if obj.parent is not None and obj.parent.type == 'ARMATURE':
+        return obj.parent
+    return None
+
+
+def bone_axes(armature, mesh_obj):
+    # stripped bone name -> (head, tail) in the mesh's local space
+    matrix = np.array(mesh_obj.matrix_world.inverted() @ armature.matrix_world, dtype=np.float64)
+    axes = {}
+    for bone in armature.data.bones:
+        points = np.array([bone.head_local[:] + (1.0,), bone.tail_local[:] + (1.0,)]) @ matrix.T
+        axes[strip_namespace(bone.name)] = (points[0, :3], points[1, :3])
+    return axes
+
+
+def gradient_factors(positions, head, tail, count):
+    # tent functions along head -> tail: every row sums to 1.0
+    if count == 1:
+        return np.ones((len(positions), 1), dtype=np.float32)
+
+    direction = tail - head
+    length2 = float(direction @ direction) or 1e-12
+    t = np.clip((positions - head) @ direction / length2, 0.0, 1.0)
+
+    x = t * (count - 1)
+    lower = np.minimum(np.floor(x).astype(np.int64), count - 2)
+    frac = (x - lower).astype(np.float32)
+
+    factors = np.zeros((len(positions), count), dtype=np.float32)
+    rows = np.arange(len(positions))
+    factors[rows, lower] = 1.0 - frac
+    factors[rows, lower + 1] = frac
+    return factors
+
+
+def needs_axes(rules):
+    return any(rule.mode == 'GRADIENT' for rule in rules)
+
+
+def apply_split_rules(table, rules, positions=None, axes=None):
+    # all rules read the original table, their results are merged in one step
+    lookup = {strip_namespace(name): gi for gi, name in enumerate(table.group_names)}
+    new_verts, new_groups, new_values = [], [], []
+    sources = []
+    applied = 0
+    warnings = []
+
+    for rule in rules:
+        gi = lookup.get(rule.source)
+        if gi is None or table.locked[gi]:
+            continue
+
+        verts, w = table.column(gi)
+        positive = w > 0.0
+        verts, w = verts[positive], w[positive]
+        if not verts.size:
+            continue
+
+        if rule.mode == 'GRADIENT':
+            if positions is None or axes is None or rule.axis[0] not in axes or rule.axis[-1] not in axes:
+                warnings.append(f"{rule.source}: Achse {' -> '.join(rule.axis)} nicht gefunden")
+                continue
+            head = axes[rule.axis[0]][0]
+            tail = axes[rule.axis[-1]][1]
+            factors = gradient_factors(positions[verts], head, tail, len(rule.targets))
+        else:
+            factors = np.broadcast_to(rule.ratios, (verts.size, len(rule.targets)))
+
+        targets = np.array([table.add_group(name) for name in rule.targets], dtype=np.int64)
+        new_verts.append(np.repeat(verts, targets.size))
+        new_groups.append(np.tile(targets, verts.size))
+        new_values.append((w[:, None] * factors).ravel())
+
+        if not rule.keep_source and gi not in targets:
+            sources.append(gi)
+        applied += 1
+
+    if sources:
+        table.filter(~np.isin(table.groups, sources))
+    if new_verts:
+        table.merge_entries(np.concatenate(new_verts), np.concatenate(new_groups),
+                            np.concatenate(new_values), 'ADD')
+
+    return applied, warnings
@@ -0,0 +1,231 @@
+import json, zlib
+import numpy as np
+from .weights import WeightTable, interpolate
+from .spatial import PointTree, inverse_distance_factors, vertex_positions
+
+# file layout:
+#   magic (4 bytes) | version (uint32) | header length (uint32) | JSON header | padding to 16
+#   data section: per mesh uint32 vertex indices, then float32 weights, sorted by group,
+#   then float32 vertex positions (version 2)
+# header offsets are relative to the start of the data section
+MAGIC = b"MXWS"
+VERSION = 2
+ALIGN = 16
+
+_PROLOGUE = np.dtype([('magic', 'S4'), ('version', '<u4'), ('header_len', '<u4')])
+
+
+def topology_hash(mesh):
+    # vertex count + edge list, changes whenever vertex indices would no longer match
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    h = zlib.crc32(np.int64(len(mesh.vertices)).tobytes())
+    return zlib.crc32(edges.tobytes(), h)
+
+
+def position_hash(positions, precision=1e-4):
+    # quantized, so float noise from re-export does not count as a change
+    quantized = np.round(np.asarray(positions, dtype=np.float64) / precision).astype(np.int64)
+    return zlib.crc32(quantized.tobytes())
+
+
+class SnapshotMesh:
+    # weights of one mesh, entries grouped by vertex group: group g owns verts[group_ptr[g]:group_ptr[g+1]]
+
+    def __init__(self, name, num_verts, topology_hash, group_names, locked, group_ptr, verts, weights,
+                 positions=None, position_hash=None, legacy=False):
+        self.name = name
+        self.num_verts = int(num_verts)
+        self.topology_hash = topology_hash
+        self.group_names = list(group_names)
+        self.locked = list(locked)
+        self.group_ptr = np.asarray(group_ptr, dtype=np.int64)
+        self.verts = verts
+        self.weights = weights
+        self.positions = positions
+        self.position_hash = position_hash
+        # legacy JSON: no vertex count or topology hash stored
+        self.legacy = legacy
+
+    @classmethod
+    def from_table(cls, name, table, topology_hash=None, positions=None):
+        order = np.lexsort((table.rows, table.groups))
+        counts = np.bincount(table.groups, minlength=table.num_groups)
+        group_ptr = np.zeros(table.num_groups + 1, dtype=np.int64)
+        np.cumsum(counts, out=group_ptr[1:])
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        return cls(name, table.num_verts, topology_hash, table.group_names, table.locked.tolist(), group_ptr,
+                   table.rows[order].astype(np.uint32), table.weights[order].astype(np.float32),
+                   positions, position_hash(positions) if positions is not None else None)
+
+    @classmethod
+    def from_object(cls, obj, table=None):
+        if table is None:
+            table = WeightTable.from_object(obj)
+        return cls.from_table(obj.name, table, topology_hash(obj.data), vertex_positions(obj.data))
+
+    @property
+    def nnz(self):
+        return int(self.group_ptr[-1])
+
+    def group(self, gi):
+        s, e = self.group_ptr[gi], self.group_ptr[gi + 1]
+        return self.verts[s:e], self.weights[s:e]
+
+    def matches(self, mesh):
+        # True if the stored vertex indices are still valid for this mesh; decided by topology only,
+        # moved vertices (applied transforms, rescaling) keep their indices
+        if self.legacy:
+            return self.num_verts <= len(mesh.vertices)
+        if len(mesh.vertices) != self.num_verts:
+            return False
+        return self.topology_hash is None or self.topology_hash == topology_hash(mesh)
+
+    @property
+    def can_transfer(self):
+        return self.positions is not None and self.nnz > 0
+
+    def to_table(self, num_verts=None):
+        num_verts = self.num_verts if num_verts is None else num_verts
+        groups = np.repeat(np.arange(len(self.group_names), dtype=np.int64), np.diff(self.group_ptr))
+        return WeightTable(num_verts, self.verts, groups, self.weights, self.group_names, self.locked)
+
+    def transfer_table(self, positions, k=4):
+        # retopo / decimation: interpolate from the k nearest stored vertices
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        tree = PointTree(self.positions)
+        dist, index = tree.query(positions, k)
+        return interpolate(self.to_table(), index, inverse_distance_factors(dist), len(positions))
+
+
+# ----------  Binary  ----------
+def save_snapshot(filepath, meshes):
+    header = {'meshes': []}
+    offset = 0
+    for m in meshes:
+        verts_offset = offset
+        offset += m.nnz * 4
+        weights_offset = offset
+        offset += m.nnz * 4
+        positions_offset = None
+        if m.positions is not None:
+            positions_offset = offset
+            offset += m.positions.size * 4
+        header['meshes'].append({
+            'name': m.name,
+            'num_verts': m.num_verts,
+            'topology_hash': m.topology_hash,
+            'groups': m.group_names,
+            'locked': [bool(x) for x in m.locked],
+            'group_ptr': m.group_ptr.tolist(),
+            'verts_offset': verts_offset,
+            'weights_offset': weights_offset,
+            'position_hash': m.position_hash,
+            'positions_offset': positions_offset,
+        })
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    prologue = np.array([(MAGIC, VERSION, len(header_bytes))], dtype=_PROLOGUE).tobytes()
+    used = len(prologue) + len(header_bytes)
+    padding = b"\0" * (-used % ALIGN)
+
+    with open(filepath, 'wb') as f:
+        f.write(prologue)
+        f.write(header_bytes)
+        f.write(padding)
+        for m in meshes:
+            f.write(np.ascontiguousarray(m.verts, dtype='<u4').tobytes())
+            f.write(np.ascontiguousarray(m.weights, dtype='<f4').tobytes())
+            if m.positions is not None:
+                f.write(np.ascontiguousarray(m.positions, dtype='<f4').tobytes())
+
+
+def is_snapshot(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_snapshot(filepath):
+    # arrays are views into a read-only memory map, nothing is copied until applied
+    data = np.memmap(filepath, dtype=np.uint8, mode='r')
+    prologue = np.frombuffer(data, dtype=_PROLOGUE, count=1)[0]
+    if prologue['magic'] != MAGIC:
+        raise ValueError("Keine Weight-Snapshot-Datei")
+    if prologue['version'] > VERSION:
+        raise ValueError(f"Snapshot-Version {prologue['version']} wird nicht unterstützt")
+
+    start = _PROLOGUE.itemsize
+    header_len = int(prologue['header_len'])
+    header = json.loads(bytes(data[start:start + header_len]).decode('utf-8'))
+    data_start = start + header_len
+    data_start += -data_start % ALIGN
+
+    meshes = {}
+    for entry in header['meshes']:
+        nnz = entry['group_ptr'][-1]
+        verts = np.frombuffer(data, dtype='<u4', count=nnz, offset=data_start + entry['verts_offset'])
+        weights = np.frombuffer(data, dtype='<f4', count=nnz, offset=data_start + entry['weights_offset'])
+        positions = None
+        if entry.get('positions_offset') is not None:
+            positions = np.frombuffer(data, dtype='<f4', count=entry['num_verts'] * 3,
+                                      offset=data_start + entry['positions_offset']).reshape(-1, 3)
+        meshes[entry['name']] = SnapshotMesh(entry['name'], entry['num_verts'], entry['topology_hash'],
+                                             entry['groups'], entry['locked'], entry['group_ptr'], verts, weights,
+                                             positions, entry.get('position_hash'))
+    return meshes
+
+
+# ----------  JSON (legacy)  ----------
+def _json_mesh(name, groups):
+    group_names = list(groups)
+    verts, weights, counts = [], [], []
+    for group_name in group_names:
+        entries = groups[group_name]
+        verts.extend(int(i) for i in entries.keys())
+        weights.extend(float(w) for w in entries.values())
+        counts.append(len(entries))
+
+    verts = np.array(verts, dtype=np.int64)
+    group_ptr = np.zeros(len(group_names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=group_ptr[1:])
+    num_verts = int(verts.max()) + 1 if verts.size else 0
+
+    return SnapshotMesh(name, num_verts, None, group_names, [False] * len(group_names), group_ptr,
+                        verts, np.array(weights, dtype=np.float32), legacy=True)
+
+
+def load_json(filepath):
+    # {mesh: {group: {"vertex_index": weight}}} or the older {group: {"vertex_index": weight}}
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("Ungültiges Weight-Format")
+
+    first = next(iter(data.values()), {})
+    per_mesh = isinstance(first, dict) and any(isinstance(v, dict) for v in first.values())
+    if not per_mesh:
+        return {None: _json_mesh(None, data)}
+    return {name: _json_mesh(name, groups) for name, groups in data.items()}
+
+
+def save_json(filepath, meshes):
+    data = {}
+    for m in meshes:
+        groups = {}
+        for gi, name in enumerate(m.group_names):
+            verts, w = m.group(gi)
+            positive = w > 0.0
+            if positive.any():
+                groups[name] = dict(zip(map(str, verts[positive].tolist()), w[positive].tolist()))
+        if groups:
+            data[m.name] = groups
+
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def load(filepath):
+    if is_snapshot(filepath):
+        return load_snapshot(filepath)
+    return load_json(filepath)
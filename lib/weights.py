@@ -0,0 +1,572 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from .bone_map import strip_namespace, mirror_name
+
+# SciPy is not bundled with Blender: sparse products with it when installed, else NumPy gathers
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# key = vertex * KEY_STRIDE + group, unique per (vertex, group) entry
+KEY_STRIDE = 1 << 20
+
+# (parent, child) limb joints for harden_joints, SL/Bento and Mixamo names
+JOINT_PAIRS = (
+    ("mCollarLeft", "mShoulderLeft"), ("mShoulderLeft", "mElbowLeft"), ("mElbowLeft", "mWristLeft"),
+    ("mCollarRight", "mShoulderRight"), ("mShoulderRight", "mElbowRight"), ("mElbowRight", "mWristRight"),
+    ("mHipLeft", "mKneeLeft"), ("mKneeLeft", "mAnkleLeft"), ("mAnkleLeft", "mFootLeft"),
+    ("mHipRight", "mKneeRight"), ("mKneeRight", "mAnkleRight"), ("mAnkleRight", "mFootRight"),
+    ("LeftShoulder", "LeftArm"), ("LeftArm", "LeftForeArm"), ("LeftForeArm", "LeftHand"),
+    ("RightShoulder", "RightArm"), ("RightArm", "RightForeArm"), ("RightForeArm", "RightHand"),
+    ("LeftUpLeg", "LeftLeg"), ("LeftLeg", "LeftFoot"), ("LeftFoot", "LeftToeBase"),
+    ("RightUpLeg", "RightLeg"), ("RightLeg", "RightFoot"), ("RightFoot", "RightToeBase"),
+)
+
+# weight-data revision per mesh datablock, and group statistics computed at a revision
+_revisions = {}
+_stats_cache = {}
+
+
+def _split_keys_by_group(keys):
+    # yields (group index, vertex indices) for a key array
+    if not keys.size:
+        return
+    groups = keys % KEY_STRIDE
+    verts = keys // KEY_STRIDE
+    order = np.argsort(groups, kind='stable')
+    groups = groups[order]
+    verts = verts[order]
+    uniq, starts = np.unique(groups, return_index=True)
+    ends = np.append(starts[1:], len(groups))
+    for g, s, e in zip(uniq.tolist(), starts.tolist(), ends.tolist()):
+        yield g, verts[s:e]
+
+
+class WeightTable:
+    # sparse vertices x groups weights of one mesh, CSR layout:
+    # entries of vertex v are rows[indptr[v]:indptr[v+1]], sorted by group
+
+    def __init__(self, num_verts, rows, groups, weights, group_names, locked=None):
+        self.num_verts = int(num_verts)
+        self.group_names = list(group_names)
+        if locked is None:
+            locked = np.zeros(len(self.group_names), dtype=bool)
+        self.locked = np.asarray(locked, dtype=bool)
+
+        # original entries of the source mesh, used to write back only the difference
+        self.source = None
+        self._orig_keys = None
+        self._orig_weights = None
+
+        self._set_entries(rows, groups, weights)
+
+    # ----------  Extraction / write-back  ----------
+    @classmethod
+    def from_object(cls, obj, mesh=None):
+        # mesh: evaluated copy of obj.data (same vertex groups), not used for write-back
+        verts = (obj.data if mesh is None else mesh).vertices
+        num_verts = len(verts)
+        vgroups = obj.vertex_groups
+        num_groups = len(vgroups)
+
+        # one pass over the vertex group memberships
+        counts = np.fromiter((len(v.groups) for v in verts), dtype=np.int64, count=num_verts)
+        pairs = np.array([(g.group, g.weight) for v in verts for g in v.groups], dtype=np.float64).reshape(-1, 2)
+
+        rows = np.repeat(np.arange(num_verts, dtype=np.int64), counts)
+        groups = pairs[:, 0].astype(np.int64)
+        weights = pairs[:, 1].astype(np.float32)
+
+        # dangling memberships of deleted groups
+        valid = groups < num_groups
+        if not valid.all():
+            rows, groups, weights = rows[valid], groups[valid], weights[valid]
+
+        table = cls(num_verts, rows, groups, weights,
+                    [vg.name for vg in vgroups], [vg.lock_weight for vg in vgroups])
+        if mesh is not None:
+            return table
+        table.source = obj.name
+        table._orig_keys = table.keys()
+        table._orig_weights = table.weights.copy()
+        return table
+
+    def write(self, obj, tolerance=1e-6):
+        # bulk write-back: one remove/add call per group, exact weights in one pass over changed vertices
+        vgroups = obj.vertex_groups
+        index_map = np.empty(len(self.group_names), dtype=np.int64)
+        for gi, name in enumerate(self.group_names):
+            vg = vgroups.get(name)
+            if vg is None:
+                vg = vgroups.new(name=name)
+            index_map[gi] = vg.index
+
+        if self.source == obj.name and self._orig_keys is not None and len(obj.data.vertices) == self.num_verts:
+            old_keys, old_weights = self._orig_keys, self._orig_weights
+        else:
+            current = WeightTable.from_object(obj)
+            old_keys, old_weights = current.keys(), current.weights
+
+        new_keys = self.rows * KEY_STRIDE + index_map[self.groups]
+        order = np.argsort(new_keys, kind='stable')
+        new_keys = new_keys[order]
+        new_weights = self.weights[order]
+
+        in_new = np.isin(old_keys, new_keys, assume_unique=True)
+        in_old = np.isin(new_keys, old_keys, assume_unique=True)
+
+        removed = old_keys[~in_new]
+        added = new_keys[~in_old]
+        changed = np.abs(new_weights[in_old] - old_weights[in_new]) > tolerance
+        changed_keys = new_keys[in_old][changed]
+
+        for g, verts in _split_keys_by_group(removed):
+            vgroups[g].remove(verts.tolist())
+        for g, verts in _split_keys_by_group(added):
+            vgroups[g].add(verts.tolist(), 0.0, 'REPLACE')
+
+        touched_keys = np.concatenate([added, changed_keys])
+        touched_weights = np.concatenate([new_weights[~in_old], new_weights[in_old][changed]])
+        if touched_keys.size:
+            lookup = dict(zip(touched_keys.tolist(), touched_weights.tolist()))
+            mesh_verts = obj.data.vertices
+            for v in np.unique(touched_keys // KEY_STRIDE).tolist():
+                base = v * KEY_STRIDE
+                for g in mesh_verts[v].groups:
+                    w = lookup.get(base + g.group)
+                    if w is not None:
+                        g.weight = w
+
+        obj.data.update()
+        bump_revision(obj.data)
+
+        # the mesh now matches this table
+        self.group_names = [vg.name for vg in vgroups]
+        self.locked = np.array([vg.lock_weight for vg in vgroups], dtype=bool)
+        self._set_entries(self.rows, index_map[self.groups], self.weights)
+        self.source = obj.name
+        self._orig_keys = self.keys()
+        self._orig_weights = self.weights.copy()
+
+        return {'removed': int(removed.size), 'added': int(added.size), 'changed': int(changed_keys.size)}
+
+    # ----------  Entries  ----------
+    def _set_entries(self, rows, groups, weights):
+        rows = np.asarray(rows, dtype=np.int64)
+        groups = np.asarray(groups, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float32)
+
+        order = np.lexsort((groups, rows))
+        self.rows = rows[order]
+        self.groups = groups[order].astype(np.int32)
+        self.weights = weights[order]
+
+        self.indptr = np.zeros(self.num_verts + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rows, minlength=self.num_verts), out=self.indptr[1:])
+
+    @property
+    def nnz(self):
+        return int(self.weights.size)
+
+    @property
+    def num_groups(self):
+        return len(self.group_names)
+
+    def keys(self):
+        return self.rows * KEY_STRIDE + self.groups
+
+    def row_counts(self):
+        return np.diff(self.indptr)
+
+    def row_sums(self):
+        return np.bincount(self.rows, weights=self.weights, minlength=self.num_verts)
+
+    def group_index(self, name):
+        try:
+            return self.group_names.index(name)
+        except ValueError:
+            return None
+
+    def add_group(self, name):
+        gi = self.group_index(name)
+        if gi is None:
+            self.group_names.append(name)
+            self.locked = np.append(self.locked, False)
+            gi = len(self.group_names) - 1
+        return gi
+
+    def column(self, gi):
+        mask = self.groups == gi
+        return self.rows[mask], self.weights[mask]
+
+    def dense_column(self, gi):
+        col = np.zeros(self.num_verts, dtype=np.float32)
+        verts, w = self.column(gi)
+        col[verts] = w
+        return col
+
+    def filter(self, mask):
+        # keep only the entries where mask is True
+        self._set_entries(self.rows[mask], self.groups[mask], self.weights[mask])
+
+    def merge_rows(self, labels, num_verts):
+        # table over merged vertices (vertex v -> labels[v], -1 = dropped), weights averaged per merged vertex
+        labels = np.asarray(labels, dtype=np.int64)
+        valid = labels[self.rows] >= 0
+        keys = labels[self.rows[valid]] * KEY_STRIDE + self.groups[valid]
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        sums = np.bincount(inverse.reshape(-1), weights=self.weights[valid], minlength=uniq.size)
+        members = np.bincount(labels[labels >= 0], minlength=num_verts)
+        rows = uniq // KEY_STRIDE
+        return WeightTable(num_verts, rows, uniq % KEY_STRIDE, sums / np.maximum(members[rows], 1),
+                           self.group_names, self.locked.copy())
+
+    def merge(self, verts, gi, values, mode='REPLACE'):
+        # like VertexGroup.add: 'REPLACE', 'ADD' or 'SUBTRACT', clamped to 0..1
+        verts = np.asarray(verts, dtype=np.int64)
+        self.merge_entries(verts, np.full(verts.size, gi, dtype=np.int64), values, mode)
+
+    def merge_entries(self, verts, groups, values, mode='REPLACE'):
+        # merge() for entries of several groups at once
+        verts = np.asarray(verts, dtype=np.int64)
+        groups = np.asarray(groups, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float32)
+
+        if mode == 'REPLACE':
+            # duplicate (vertex, group) pairs in the input: the last value wins
+            keys = verts * KEY_STRIDE + groups
+            _, last = np.unique(keys[::-1], return_index=True)
+            last = keys.size - 1 - last
+            verts, groups, values = verts[last], groups[last], values[last]
+            keep = ~np.isin(self.keys(), verts * KEY_STRIDE + groups)
+            rows = np.concatenate([self.rows[keep], verts])
+            grps = np.concatenate([self.groups[keep], groups])
+            wts = np.concatenate([self.weights[keep], np.clip(values, 0.0, 1.0)])
+        else:
+            sign = 1.0 if mode == 'ADD' else -1.0
+            keys = np.concatenate([self.keys(), verts * KEY_STRIDE + groups])
+            wts = np.concatenate([self.weights, values * sign])
+            uniq, inverse = np.unique(keys, return_inverse=True)
+            wts = np.clip(np.bincount(inverse, weights=wts), 0.0, 1.0)
+            rows = uniq // KEY_STRIDE
+            grps = uniq % KEY_STRIDE
+
+        self._set_entries(rows, grps, wts)
+
+    def remove_group_entries(self, gi):
+        self.filter(self.groups != gi)
+
+    # ----------  Statistics  ----------
+    def group_stats(self):
+        # per group: vertices with weight > 0, their sum and max, and all other vertices as zero
+        num_groups = self.num_groups
+        positive = self.weights > 0.0
+        groups = self.groups[positive]
+        weights = self.weights[positive]
+
+        count = np.bincount(groups, minlength=num_groups)
+        total = np.bincount(groups, weights=weights, minlength=num_groups)
+        maximum = np.zeros(num_groups, dtype=np.float32)
+        np.maximum.at(maximum, groups, weights)
+
+        return {
+            'count': count,
+            'sum': total,
+            'max': maximum,
+            'zero': self.num_verts - count,
+        }
+
+
+# ----------  Operations  ----------
+def deform_group_mask(table, armature):
+    # per group: True if it belongs to a deform bone of the armature
+    bones = armature.data.bones
+    return np.array([bones.get(name) is not None and bones[name].use_deform for name in table.group_names],
+                    dtype=bool)
+
+
+def limit_influences(table, max_influences=4, threshold=0.0, normalize=True, groups=None):
+    # prune below threshold, keep the N strongest influences, normalize to 1.0;
+    # entries of locked groups are never removed or rescaled; groups (bool per group or indices, e.g. the
+    # deform bones) limits all of this to those groups, entries of other groups (masks, hair) stay as they are
+    old_keys = table.keys()
+    old_weights = table.weights.copy()
+
+    rows, weights = table.rows, table.weights
+    active = np.ones(table.num_groups, dtype=bool)
+    if groups is not None:
+        active[:] = False
+        active[np.asarray(groups)] = True
+    inside = active[table.groups] if table.nnz else np.zeros(0, dtype=bool)
+    other = (rows[~inside], table.groups[~inside], weights[~inside])
+    rows, groups, weights = rows[inside], table.groups[inside], weights[inside]
+    locked = table.locked[groups] if table.num_groups else np.zeros(0, dtype=bool)
+
+    # 1. small weights
+    keep = locked | ((weights >= threshold) & (weights > 0.0))
+    pruned = int(keep.size - keep.sum())
+    rows, groups, weights, locked = rows[keep], groups[keep], weights[keep], locked[keep]
+
+    # 2. per vertex: locked entries first, then by descending weight
+    order = np.lexsort((-weights, ~locked, rows))
+    rows, groups, weights, locked = rows[order], groups[order], weights[order], locked[order]
+    rank = np.arange(rows.size) - np.searchsorted(rows, rows, side='left')
+    keep = locked | (rank < max_influences)
+    limited = int(keep.size - keep.sum())
+    rows, groups, weights, locked = rows[keep], groups[keep], weights[keep], locked[keep]
+
+    # 3. unlocked weights fill what the locked ones leave to 1.0
+    if normalize and rows.size:
+        n = table.num_verts
+        locked_sum = np.bincount(rows[locked], weights=weights[locked], minlength=n)
+        free_sum = np.bincount(rows[~locked], weights=weights[~locked], minlength=n)
+        target = np.clip(1.0 - locked_sum, 0.0, 1.0)
+        scale = np.divide(target, free_sum, out=np.ones(n), where=free_sum > 0.0)
+        weights = np.where(locked, weights, weights * scale[rows]).astype(np.float32)
+
+        keep = locked | (weights > 0.0)
+        rows, groups, weights = rows[keep], groups[keep], weights[keep]
+
+    table._set_entries(np.concatenate([rows, other[0]]), np.concatenate([groups, other[1]]),
+                       np.concatenate([weights, other[2]]))
+
+    # vertices that lost an entry or got a different weight
+    present = np.isin(old_keys, table.keys(), assume_unique=True)
+    lost = old_keys[~present] // KEY_STRIDE
+    diff = np.abs(old_weights[present] - table.weights) > 1e-6
+    rescaled = table.rows[diff]
+    changed = np.unique(np.concatenate([lost, rescaled])).size
+
+    return {'pruned': pruned, 'limited': limited, 'vertices_changed': int(changed)}
+
+
+def _segment_projection(points, head, tail):
+    # parameter along head -> tail (0..1 on the bone), distance to the segment, bone length
+    direction = tail - head
+    length2 = float(direction @ direction) or 1e-12
+    t = (points - head) @ direction / length2
+    closest = head + np.clip(t, 0.0, 1.0)[:, None] * direction
+    return t, np.linalg.norm(points - closest, axis=1), np.sqrt(length2)
+
+
+def joint_closeness(points, parent_axis, child_axis, radius=0.25):
+    # 1.0 at the joint, falling to 0.0 at radius * (shorter bone length) along the limb
+    tp, dp, lp = _segment_projection(points, *parent_axis)
+    tc, dc, lc = _segment_projection(points, *child_axis)
+    along = np.where(dp <= dc, (tp - 1.0) * lp, tc * lc)
+    reach = max(radius * min(lp, lc), 1e-8)
+    return 1.0 - np.clip(np.abs(along) / reach, 0.0, 1.0)
+
+
+def harden_joints(table, positions, axes, pairs=JOINT_PAIRS, power=2.0, radius=0.25):
+    # sharpen the parent/child falloff near each joint; the pair's sum per vertex is kept
+    lookup = {strip_namespace(name): gi for gi, name in enumerate(table.group_names)}
+    hardened = 0
+
+    for parent, child in pairs:
+        gp, gc = lookup.get(parent), lookup.get(child)
+        if gp is None or gc is None or parent not in axes or child not in axes:
+            continue
+        if table.locked[gp] or table.locked[gc]:
+            continue
+
+        # entries of the vertices weighted to both bones
+        entries_p = np.flatnonzero(table.groups == gp)
+        entries_c = np.flatnonzero(table.groups == gc)
+        verts, ip, ic = np.intersect1d(table.rows[entries_p], table.rows[entries_c],
+                                       assume_unique=True, return_indices=True)
+        if not verts.size:
+            continue
+        entries_p, entries_c = entries_p[ip], entries_c[ic]
+
+        wp = table.weights[entries_p].astype(np.float64)
+        wc = table.weights[entries_c].astype(np.float64)
+        total = wp + wc
+        closeness = joint_closeness(positions[verts], axes[parent], axes[child], radius)
+        near = (closeness > 0.0) & (total > 0.0)
+        if not near.any():
+            continue
+
+        f = wc[near] / total[near]
+        sharp = f ** power / (f ** power + (1.0 - f) ** power)
+        f = f + (sharp - f) * closeness[near]
+
+        table.weights[entries_p[near]] = total[near] * (1.0 - f)
+        table.weights[entries_c[near]] = total[near] * f
+        hardened += int(near.sum())
+
+    return hardened
+
+
+def mesh_adjacency(mesh):
+    # CSR vertex neighbours from the edge list; isolated vertices are their own neighbour
+    num_verts = len(mesh.vertices)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int64)
+    mesh.edges.foreach_get("vertices", edges)
+    edges = edges.reshape(-1, 2)
+
+    src = np.concatenate([edges[:, 0], edges[:, 1]])
+    dst = np.concatenate([edges[:, 1], edges[:, 0]])
+    isolated = np.flatnonzero(np.bincount(src, minlength=num_verts) == 0)
+    src = np.concatenate([src, isolated])
+    dst = np.concatenate([dst, isolated])
+
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(num_verts + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_verts), out=indptr[1:])
+    return indptr, dst[order]
+
+
+def _smooth_step_numpy(rows, groups, weights, indptr, indices, factor):
+    # w' = (1 - factor) * w + factor * mean of the neighbours' w
+    degree = np.diff(indptr)
+    counts = degree[rows]
+    pair = np.repeat(np.arange(rows.size), counts)
+    offsets = np.arange(pair.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    neighbours = indices[indptr[rows][pair] + offsets]
+
+    keys = np.concatenate([neighbours * KEY_STRIDE + groups[pair], rows * KEY_STRIDE + groups])
+    values = np.concatenate([factor * weights[pair] / degree[neighbours], (1.0 - factor) * weights])
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    return uniq // KEY_STRIDE, uniq % KEY_STRIDE, np.bincount(inverse, weights=values)
+
+
+def smooth(table, adjacency, groups, iterations=1, factor=0.5):
+    # Laplacian smoothing of all given groups at once; locked groups are left out
+    indptr, indices = adjacency
+    selected = np.zeros(table.num_groups, dtype=bool)
+    selected[np.asarray(groups, dtype=np.int64)] = True
+    selected &= ~table.locked
+    if not selected.any() or iterations < 1:
+        return 0
+
+    mask = selected[table.groups]
+    rows = table.rows[mask]
+    grps = table.groups[mask].astype(np.int64)
+    weights = table.weights[mask].astype(np.float64)
+
+    if sparse is not None:
+        n = table.num_verts
+        degree = np.diff(indptr)
+        laplace = sparse.csr_matrix((np.repeat(1.0 / degree, degree), indices, indptr), shape=(n, n))
+        matrix = sparse.csr_matrix((weights, (rows, grps)), shape=(n, table.num_groups))
+        for _ in range(iterations):
+            matrix = (1.0 - factor) * matrix + factor * (laplace @ matrix)
+        matrix = matrix.tocoo()
+        rows, grps, weights = matrix.row.astype(np.int64), matrix.col.astype(np.int64), matrix.data
+    else:
+        for _ in range(iterations):
+            rows, grps, weights = _smooth_step_numpy(rows, grps, weights, indptr, indices, factor)
+
+    touched = np.unique(rows).size
+    table._set_entries(np.concatenate([table.rows[~mask], rows]),
+                       np.concatenate([table.groups[~mask], grps]),
+                       np.concatenate([table.weights[~mask], weights]))
+    return touched
+
+
+def mirror_group_map(table):
+    # group -> group of the mirrored name (missing partners are added), others map to themselves
+    index = {name: gi for gi, name in enumerate(table.group_names)}
+    for name in list(table.group_names):
+        mirrored = mirror_name(name)
+        if mirrored not in index:
+            index[mirrored] = table.add_group(mirrored)
+    return np.array([index[mirror_name(name)] for name in table.group_names], dtype=np.int64)
+
+
+def mirror(table, partner, verts, swap, mode='SYMMETRIZE'):
+    # verts take their partner's weights with Left/Right groups swapped ('COPY'),
+    # or the average of their own and those ('SYMMETRIZE'); locked groups stay as they are
+    verts = np.asarray(verts, dtype=np.int64)
+    if not verts.size:
+        return 0
+
+    gathered = interpolate(table, partner[verts][:, None], np.ones((verts.size, 1)), verts.size)
+    rows = verts[gathered.rows]
+    groups = swap[gathered.groups]
+    weights = gathered.weights
+    free = ~table.locked[groups]
+    rows, groups, weights = rows[free], groups[free], weights[free]
+
+    affected = np.zeros(table.num_verts, dtype=bool)
+    affected[verts] = True
+    own = affected[table.rows] & ~table.locked[table.groups]
+
+    if mode == 'COPY':
+        table.filter(~own)
+        table.merge_entries(rows, groups, weights, 'REPLACE')
+    else:
+        table.weights[own] *= 0.5
+        table.merge_entries(rows, groups, weights * 0.5, 'ADD')
+    return int(verts.size)
+
+
+def interpolate(table, index, factors, num_verts):
+    # new vertex v = sum over j of factors[v, j] * source vertex index[v, j]
+    k = index.shape[1]
+    query = np.repeat(np.arange(len(index), dtype=np.int64), k)
+    source = index.ravel()
+    factors = factors.ravel()
+
+    starts = table.indptr[source]
+    counts = table.indptr[source + 1] - starts
+    pair = np.repeat(np.arange(source.size), counts)
+    offsets = np.arange(pair.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    entry = starts[pair] + offsets
+
+    keys = query[pair] * KEY_STRIDE + table.groups[entry]
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    weights = np.bincount(inverse, weights=table.weights[entry] * factors[pair])
+
+    return WeightTable(num_verts, uniq // KEY_STRIDE, uniq % KEY_STRIDE, weights,
+                       table.group_names, table.locked)
+
+
+# ----------  Revision / statistics cache  ----------
+def revision(mesh):
+    return _revisions.get(mesh.session_uid, 0)
+
+
+def bump_revision(mesh):
+    key = mesh.session_uid
+    _revisions[key] = _revisions.get(key, 0) + 1
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    # weight painting, edit mode and applied modifiers tag the Mesh datablock itself; object updates
+    # (pose, frame change, modifier evaluation) leave the weights alone
+    for update in depsgraph.updates:
+        if update.is_updated_geometry and isinstance(update.id, bpy.types.Mesh):
+            bump_revision(update.id.original)
+
+
+def get_group_stats(obj):
+    # group_stats() of the mesh, recomputed only when its weights changed
+    mesh = obj.data
+    key = (mesh.session_uid, obj.name)
+    stamp = (revision(mesh), len(mesh.vertices), tuple(vg.name for vg in obj.vertex_groups))
+
+    cached = _stats_cache.get(key)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, WeightTable.from_object(obj).group_stats())
+        _stats_cache[key] = cached
+    return cached[1]
+
+
+def clear_stats_cache():
+    _stats_cache.clear()
+
+
+def register_handlers():
+    if on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update)
+
+
+def unregister_handlers():
+    if on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update)
+    clear_stats_cache()
@@ -0,0 +1,284 @@
+"""
+MIXAMO -> SECOND LIFE/OPENSIM BATCH CONVERTER (headless)
+- Runs one `blender -b` worker per input file, several in parallel
+- Each worker: FBX import -> rename_mixamo_bones -> optimize_weights -> opensim_dae export
+- Writes the DAE files plus a JSON summary (timings, bone counts, warnings)
+
+Usage (plain Python, Blender on PATH or via --blender):
+    python mixamo_batch.py INPUT_DIR OUTPUT_DIR --jobs 4 --preset BENTO_FULL
+    python mixamo_batch.py INPUT_DIR OUTPUT_DIR --settings settings.json
+    python mixamo_batch.py INPUT_DIR OUTPUT_DIR --lods 0.5,0.25,0.1
+
+settings.json:
+    {"props": {"weight_threshold": 0.02, "harden_joints": false},
+     "export": {}}
+"props" are BoneMappingProperties values, "export" are keyword arguments of
+export_scene.opensim_dae.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_NAME = os.path.basename(ADDON_DIR)
+
+INPUT_EXTENSIONS = (".fbx",)
+
+
+# ------------------------------------------------------------------------
+# ARGUMENTS
+# ------------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless Mixamo FBX -> OpenSim/SL DAE conversion")
+    parser.add_argument("input", help="Input directory (or a single file in worker mode)")
+    parser.add_argument("output", help="Output directory (or DAE file in worker mode)")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable")
+    parser.add_argument("--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Parallel workers")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="Seconds per file")
+    parser.add_argument("--preset", default="BENTO_FULL", help="Bone mapping preset")
+    parser.add_argument("--prefix", default="", help="Custom bone prefix (default: auto-detect)")
+    parser.add_argument("--weight-threshold", type=float, default=None, help="Remove weights below this value")
+    parser.add_argument("--settings", default="", help="JSON file with 'props' and 'export' settings")
+    parser.add_argument("--lods", default="", help="Triangle ratios of the LOD DAEs, e.g. 0.5,0.25,0.1")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result", default="", help=argparse.SUPPRESS)
+    return parser
+
+
+def load_settings(args):
+    settings = {"props": {}, "export": {}}
+    if args.settings:
+        with open(args.settings, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        settings["props"].update(data.get("props", {}))
+        settings["export"].update(data.get("export", {}))
+
+    settings["props"]["preset"] = args.preset
+    if args.prefix:
+        settings["props"]["prefix_mode"] = 'CUSTOM'
+        settings["props"]["custom_prefix"] = args.prefix
+    if args.weight_threshold is not None:
+        settings["props"]["weight_threshold"] = args.weight_threshold
+    if args.lods:
+        settings["export"]["generate_lods"] = True
+        settings["export"]["lod_ratios"] = args.lods
+    return settings
+
+
+# ------------------------------------------------------------------------
+# WORKER (runs inside Blender)
+# ------------------------------------------------------------------------
+def enable_addon():
+    import addon_utils
+
+    addon_parent = os.path.dirname(ADDON_DIR)
+    if addon_parent not in sys.path:
+        sys.path.insert(0, addon_parent)
+    addon_utils.enable(ADDON_NAME, default_set=True)
+
+
+def timed(timings, name, func, *args, **kwargs):
+    t0 = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[name] = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def run_operator(result, name, operator, **kwargs):
+    # a step counts only when the operator finished; CANCELLED is recorded as a warning
+    status = timed(result["timings"], name, operator, **kwargs)
+    if 'FINISHED' not in status:
+        result["warnings"].append(f"{name}: {', '.join(sorted(status))}")
+        return False
+    return True
+
+
+def target_bone_names(props):
+    # names a successful rename produces: values of the preset (or of the custom map)
+    if props.preset == 'CUSTOM':
+        return set(bpy.context.scene.get('custom_bone_map', {}).values())
+    addon = importlib.import_module(ADDON_NAME + ".mixamo_rename_opensim")
+    return set(addon.PRESETS.get(props.preset, {}).values())
+
+
+def run_worker(args):
+    settings = load_settings(args)
+    result = {"input": args.input, "output": args.output, "timings": {}, "warnings": [], "ok": False}
+    timings = result["timings"]
+    t_start = time.perf_counter()
+
+    try:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        enable_addon()
+
+        timed(timings, "import", bpy.ops.import_scene.fbx, filepath=args.input)
+
+        armatures = [o for o in bpy.context.scene.objects if o.type == 'ARMATURE']
+        meshes = [o for o in bpy.context.scene.objects if o.type == 'MESH']
+        if not armatures:
+            raise RuntimeError("No armature in file")
+
+        result["bones_in"] = sum(len(a.data.bones) for a in armatures)
+        result["meshes"] = len(meshes)
+        result["vertices"] = sum(len(m.data.vertices) for m in meshes)
+
+        props = bpy.context.scene.bone_mapping_props
+        for key, value in settings["props"].items():
+            if not hasattr(props, key):
+                result["warnings"].append(f"Unknown setting: {key}")
+                continue
+            setattr(props, key, value)
+
+        bpy.ops.object.select_all(action='DESELECT')
+        for obj in armatures + meshes:
+            obj.select_set(True)
+        bpy.context.view_layer.objects.active = armatures[0]
+
+        finished = run_operator(result, "convert", bpy.ops.object.rename_mixamo_bones)
+        finished &= run_operator(result, "weights", bpy.ops.object.optimize_weights)
+
+        # a DAE left over from an earlier run must not count as output of this one
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        if os.path.exists(args.output):
+            os.remove(args.output)
+        finished &= run_operator(result, "export", bpy.ops.export_scene.opensim_dae,
+                                 filepath=args.output, **settings["export"])
+
+        targets = target_bone_names(props)
+        result["bones_out"] = sum(len(a.data.bones) for a in armatures)
+        result["bento_bones"] = sum(1 for a in armatures for b in a.data.bones if b.name in targets)
+        result["ok"] = finished and os.path.exists(args.output)
+
+    except Exception as e:
+        result["error"] = str(e)
+
+    timings["total"] = round(time.perf_counter() - t_start, 4)
+
+    with open(args.result, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+
+
+# ------------------------------------------------------------------------
+# FARM (plain Python)
+# ------------------------------------------------------------------------
+def find_inputs(directory):
+    files = []
+    for root, dirs, names in os.walk(directory):
+        for name in sorted(names):
+            if name.lower().endswith(INPUT_EXTENSIONS):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def parse_report_lines(text):
+    # operator reports are printed as "Warning: ..." / "Error: ..." in background mode
+    return [line.strip() for line in text.splitlines()
+            if line.startswith("Warning:") or line.startswith("Error:")]
+
+
+def convert_file(args, passthrough, filepath):
+    stem = os.path.splitext(os.path.relpath(filepath, args.input))[0]
+    dae_path = os.path.join(args.output, stem + ".dae")
+    result_path = os.path.join(args.output, stem + ".json")
+    os.makedirs(os.path.dirname(dae_path), exist_ok=True)
+    # results of an earlier run must not stand in for a worker that times out or crashes
+    for stale in (dae_path, result_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    cmd = [args.blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--",
+           filepath, dae_path, "--worker", "--result", result_path] + passthrough
+
+    t0 = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout)
+        output = proc.stdout + proc.stderr
+    except subprocess.TimeoutExpired:
+        output = ""
+        proc = None
+
+    result = {"input": filepath, "output": dae_path, "ok": False, "timings": {}, "warnings": []}
+    if os.path.exists(result_path):
+        with open(result_path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+    elif proc is None:
+        result["error"] = f"Timeout after {args.timeout}s"
+    else:
+        result["error"] = f"Worker exited with code {proc.returncode}"
+
+    result["warnings"] = result.get("warnings", []) + parse_report_lines(output)
+    result["wall_time"] = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def run_farm(args):
+    files = find_inputs(args.input)
+    if not files:
+        print(f"No input files in {args.input}")
+        return 1
+
+    os.makedirs(args.output, exist_ok=True)
+
+    # settings are forwarded unchanged to every worker
+    passthrough = ["--preset", args.preset]
+    if args.prefix:
+        passthrough += ["--prefix", args.prefix]
+    if args.weight_threshold is not None:
+        passthrough += ["--weight-threshold", str(args.weight_threshold)]
+    if args.settings:
+        passthrough += ["--settings", os.path.abspath(args.settings)]
+    if args.lods:
+        passthrough += ["--lods", args.lods]
+
+    print(f"Converting {len(files)} files with {args.jobs} workers...")
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        results = list(pool.map(lambda f: convert_file(args, passthrough, f), files))
+
+    for r in results:
+        status = "OK  " if r.get("ok") else "FAIL"
+        print(f"  {status} {os.path.basename(r['input'])} ({r.get('wall_time', 0):.1f}s, {len(r['warnings'])} warnings)")
+
+    summary = {
+        "files": len(results),
+        "converted": sum(1 for r in results if r.get("ok")),
+        "failed": sum(1 for r in results if not r.get("ok")),
+        "wall_time": round(time.perf_counter() - t0, 4),
+        "results": results,
+    }
+    with open(os.path.join(args.output, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"{summary['converted']}/{summary['files']} converted in {summary['wall_time']:.1f}s")
+    return 0 if not summary["failed"] else 2
+
+
+def main(argv):
+    args = build_parser().parse_args(argv)
+    if args.worker:
+        if bpy is None:
+            print("Worker mode must run inside Blender")
+            return 1
+        run_worker(args)
+        return 0
+    return run_farm(args)
+
+
+if __name__ == "__main__":
+    # inside Blender the script arguments follow "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    code = main(argv)
+    if bpy is None:
+        sys.exit(code)
@@ -32,12 +32,13 @@ bl_info = {
 
 # === SYSTEM IMPORTS ===
 import os
-import re
 import json
+import time
 import xml.etree.ElementTree as ET
 
 # === BLENDER CORE ===
 import bpy
+from bpy.app.handlers import persistent
 
 # === BLENDER TYPES ===
 # UI Components
@@ -52,6 +53,7 @@ from bpy.types import PropertyGroup
 from bpy.props import StringProperty
 from bpy.props import BoolProperty
 from bpy.props import FloatProperty
+from bpy.props import IntProperty
 
 # Special Types
 from bpy.props import EnumProperty
@@ -61,9 +63,34 @@ from bpy.props import PointerProperty
 from bpy_extras.io_utils import ImportHelper
 from bpy_extras.io_utils import ExportHelper
 
+# === ADDON MODULES ===
+from .lib import pose_blend
+from .lib import bone_map
+from .lib import convert_pipeline
+from .lib import weights as weight_table
+from .lib import weight_snapshot
+from .lib import spatial
+from .lib import weight_rules
+from .lib import proxy_weights
+from .lib import rig_validation
+from .lib import live_validation
+from .lib import bone_fix
+from .lib import dae_writer
+from .lib import bvh_writer
+from .lib import anim_writer
+from .lib import transform_apply
+from .lib import measure
+
 # ------------------------------------------------------------------------
 # PRESET MAPPINGS
 # ------------------------------------------------------------------------
+PRESETS_DIR = os.path.join(os.path.dirname(__file__), "presets")
+WEIGHT_RULES_FILE = os.path.join(os.path.dirname(__file__), "weight_rules", "mixamo_bento.json")
+SKELETON_FILE = os.path.join(os.path.dirname(__file__), "avatar_skeleton.xml")
+
+# Letztes Ranking der Preset-Erkennung pro Armature (für das Panel)
+preset_rankings = {}
+
 PRESETS = {
     'BENTO_FULL': {
         # Core bones (required for basic functionality)
@@ -1416,6 +1443,12 @@ class OBJECT_OT_auto_scale_bones(Operator):
     bl_label = "Auto Scale Bones"
     bl_options = {'REGISTER', 'UNDO'}
     
+    deform_only: BoolProperty(
+        name="Deform Vertices Only",
+        default=False,
+        description="Measure only vertices weighted to deform bones (ignores hair, props and attachments)"
+    )
+    
     @classmethod
     def poll(cls, context):
         return (context.active_object and 
@@ -1431,10 +1464,11 @@ class OBJECT_OT_auto_scale_bones(Operator):
                 self.report({'ERROR'}, "Select both mesh and armature")
                 return {'CANCELLED'}
             
-            # 1. Berechne Mesh-Höhe in Weltkoordinaten
-            bbox = mesh.bound_box
-            local_height = bbox[6][2] - bbox[0][2]
-            mesh_height = local_height * mesh.scale.z
+            # 1. Berechne Mesh-Höhe in Weltkoordinaten (ausgewertetes Mesh, Rotation/Parent/Modifier inklusive)
+            mesh_height = measure.height(context, [mesh], self.deform_only)
+            if props.scale_mode == 'AUTO' and mesh_height <= 0.0:
+                self.report({'ERROR'}, "Mesh has no measurable height")
+                return {'CANCELLED'}
             
             # 2. Bestimme Skalierungsfaktor basierend auf Modus
             if props.scale_mode == 'MIXAMO':
@@ -1444,9 +1478,14 @@ class OBJECT_OT_auto_scale_bones(Operator):
             else:  # MANUAL
                 scale_factor = props.manual_scale
             
-            # 3. Skaliere Armature
+            # 3. Skaliere Armature, Faktor einmal direkt in die Daten
+            if context.mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode='OBJECT')
             armature.scale = (scale_factor, scale_factor, scale_factor)
-            bpy.ops.object.transform_apply(scale=True)
+            # Kinder folgen der neuen Skalierung, wie beim Operator
+            context.view_layer.update()
+            transform_apply.apply_scale(armature, armature.children, context.view_layer)
+            context.view_layer.update()
             
             self.report({'INFO'}, f"Scaled to {props.target_height}m (Factor: {scale_factor:.4f})")
             return {'FINISHED'}
@@ -1455,6 +1494,91 @@ class OBJECT_OT_auto_scale_bones(Operator):
             self.report({'ERROR'}, f"Scaling failed: {str(e)}")
             return {'CANCELLED'}
 
+# ------------------------------------------------------------------------
+# POSE BLENDING (hand_data / bento_data)
+# ------------------------------------------------------------------------
+def detect_mixamo_prefix(armature):
+    """Automatically detects Mixamo prefix in armature"""
+    prefixes = ['mixamorig:', 'mixamorig1:', 'mixamorig2:']
+    for bone in armature.data.bones:
+        for prefix in prefixes:
+            if bone.name.startswith(prefix):
+                return prefix
+    return None
+
+def find_pose_bone(armature, bento_name, prefix=""):
+    """Findet einen Pose-Bone über den Bento-Namen oder den Mixamo-Namen mit Prefix"""
+    bone = armature.pose.bones.get(bento_name)
+    if bone:
+        return bone
+
+    if prefix:
+        for mixamo_name, preset_name in PRESETS['BENTO_FULL'].items():
+            if preset_name == bento_name:
+                bone = armature.pose.bones.get(prefix + mixamo_name)
+                if bone:
+                    return bone
+
+    return None
+
+def get_pose_blender(armature, key, tree):
+    """Kompilierte Pose, gebunden an die Pose-Bones der Armature"""
+    prefix = detect_mixamo_prefix(armature)
+    return pose_blend.get_pose_blender(
+        armature, key, tree,
+        lambda arm, name: find_pose_bone(arm, name, prefix)
+    )
+
+def blend_hand_pose(context, side):
+    armature = context.active_object
+    if not armature or armature.type != 'ARMATURE':
+        return
+    props = context.scene.bone_mapping_props
+    weight = props.hand_blend_left if side == 'left' else props.hand_blend_right
+    blender = get_pose_blender(armature, 'hand_' + side, hand_data[side])
+    blender.apply(armature, weight, props.pose_blend_base)
+
+def blend_bento_pose(context):
+    armature = context.active_object
+    if not armature or armature.type != 'ARMATURE':
+        return
+    props = context.scene.bone_mapping_props
+    # Reihenfolge wie pose_blend.BLEND_GROUPS
+    weights = (props.bento_blend_spine, props.bento_blend_hands,
+               props.bento_blend_face, props.bento_blend_body)
+    blender = get_pose_blender(armature, 'bento', bento_data)
+    blender.apply(armature, weights, props.pose_blend_base)
+
+def update_hand_blend_left(self, context):
+    blend_hand_pose(context, 'left')
+
+def update_hand_blend_right(self, context):
+    blend_hand_pose(context, 'right')
+
+def update_bento_blend(self, context):
+    blend_bento_pose(context)
+
+def update_live_validation(self, context):
+    if self.live_validation:
+        live_validation.start(context.scene, bone_parents=load_bone_parents())
+    else:
+        live_validation.stop()
+
+@persistent
+def clear_pose_caches(dummy):
+    """Gebundene Pose-Blender gelten nur für die Bones der zuvor geladenen Datei"""
+    pose_blend.clear_pose_blenders()
+
+@persistent
+def restore_live_validation(dummy):
+    """Startet die Live-Validierung nach dem Laden neu, wenn sie in der Datei eingeschaltet ist"""
+    scene = bpy.context.scene
+    props = getattr(scene, "bone_mapping_props", None)
+    if props is not None and props.live_validation:
+        live_validation.start(scene, bone_parents=load_bone_parents())
+    else:
+        live_validation.stop()
+
 # ------------------------------------------------------------------------
 # PROPERTY GROUP (stores addon settings)
 # ------------------------------------------------------------------------
@@ -1569,10 +1693,33 @@ class BoneMappingProperties(PropertyGroup):
     # Weight optimization
     weight_threshold: FloatProperty(name="Weight Threshold", description="Remove small weights", default=0.01, min=0.0, max=0.5)
     harden_joints: BoolProperty(name="Harden Joints", description="Sharper joint transitions", default=True)
+    harden_power: FloatProperty(name="Power", description="Sharpening exponent of the joint falloff (1 = unchanged)", default=2.0, min=1.0, max=8.0)
+    harden_radius: FloatProperty(name="Radius", description="Joint region as a fraction of the shorter bone", default=0.25, min=0.01, max=1.0, subtype='FACTOR')
+    smooth_iterations: IntProperty(name="Smooth", description="Laplacian smoothing iterations (0 = off)", default=0, min=0, max=50)
+    smooth_factor: FloatProperty(name="Factor", description="Smoothing strength per iteration", default=0.5, min=0.0, max=1.0, subtype='FACTOR')
+    smooth_groups: EnumProperty(name="Groups", description="Vertex groups to smooth", items=[('BONE_DEFORM', "Deform Bones", "Groups of deforming bones"), ('BONE_SELECT', "Selected Bones", "Groups of selected bones"), ('ALL', "All", "All unlocked groups")], default='BONE_DEFORM')
+    max_influences: IntProperty(name="Max Influences", description="Maximum joint influences per vertex (SL/OpenSim: 4)", default=4, min=1, max=8)
+    normalize_weights: BoolProperty(name="Normalize", description="Normalize the weights of every vertex to 1.0 (locked groups are kept)", default=True)
+    auto_weight_proxy: BoolProperty(name="Use Proxy", description="Heat-weight a decimated proxy and transfer the weights back (dense meshes)", default=False)
+    proxy_ratio: FloatProperty(name="Proxy Ratio", description="Proxy resolution: lower is faster, higher is more accurate", default=0.1, min=0.01, max=1.0, subtype='FACTOR')
+    use_split_rules: BoolProperty(name="Split Weights", description="Split Mixamo groups onto Bento bones by the rules file", default=True)
+    split_rules_file: StringProperty(name="Split Rules", description="JSON rules file (empty: built-in Mixamo -> Bento rules)", default="", maxlen=1024, subtype='FILE_PATH')
+    
+    # Validation
+    live_validation: BoolProperty(name="Live Validation", description="Re-check changed bones and weights in the background and show the issues here", default=False, update=update_live_validation)
     
     # Hand posing
     apply_left_hand: BoolProperty(name="Left Hand", description="Apply to left hand", default=True)
     apply_right_hand: BoolProperty(name="Right Hand", description="Apply to right hand", default=True)
+
+    # Pose blending
+    pose_blend_base: EnumProperty(name="Blend From", description="Pose the blend starts from", items=[('CURRENT', "Current", "Blend from the pose at the start of the drag"), ('REST', "Rest", "Blend from the rest pose")], default='CURRENT')
+    hand_blend_left: FloatProperty(name="Left Hand", description="Blend weight of the left hand pose", default=0.0, min=0.0, max=1.0, subtype='FACTOR', update=update_hand_blend_left)
+    hand_blend_right: FloatProperty(name="Right Hand", description="Blend weight of the right hand pose", default=0.0, min=0.0, max=1.0, subtype='FACTOR', update=update_hand_blend_right)
+    bento_blend_spine: FloatProperty(name="Spine", description="Blend weight of the Bento pose for spine bones", default=0.0, min=0.0, max=1.0, subtype='FACTOR', update=update_bento_blend)
+    bento_blend_hands: FloatProperty(name="Hands", description="Blend weight of the Bento pose for hand bones", default=0.0, min=0.0, max=1.0, subtype='FACTOR', update=update_bento_blend)
+    bento_blend_face: FloatProperty(name="Face", description="Blend weight of the Bento pose for face bones", default=0.0, min=0.0, max=1.0, subtype='FACTOR', update=update_bento_blend)
+    bento_blend_body: FloatProperty(name="Body", description="Blend weight of the Bento pose for all other bones", default=0.0, min=0.0, max=1.0, subtype='FACTOR', update=update_bento_blend)
     
     # Deformation repair
     spine_scale: FloatProperty(name="Spine Scale", description="Spine bone scaling factor", default=1.2, min=0.5, max=3.0)
@@ -1677,13 +1824,8 @@ class OBJECT_OT_rename_mixamo_bones(Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def detect_prefix(self, armature):
-        """Automatically detects Mixamo prefix in armature"""
-        prefixes = ['mixamorig:', 'mixamorig1:', 'mixamorig2:']
-        for bone in armature.data.bones:
-            for prefix in prefixes:
-                if bone.name.startswith(prefix):
-                    return prefix
-        return None
+        """Automatically detects the namespace prefix in armature"""
+        return bone_map.detect_prefix([bone.name for bone in armature.data.bones])
 
     def get_prefix(self, context, armature):
         """Gets prefix based on user settings"""
@@ -1705,67 +1847,107 @@ class OBJECT_OT_rename_mixamo_bones(Operator):
 
         processed = 0
         skipped = 0
+        groups_renamed = 0
         armatures = [obj for obj in context.selected_objects if obj.type == 'ARMATURE']
-        meshes = [obj for obj in context.selected_objects if obj.type == 'MESH']
 
-        for armature in armatures:
-            prefix = self.get_prefix(context, armature)
-            if not prefix:
-                self.report({'WARNING'}, f"No Mixamo prefix found in {armature.name}")
-                continue
+        # Every mesh deformed by an armature (parent or Armature modifier), one scene scan
+        deform_index = convert_pipeline.build_deform_index(context.scene.objects)
 
-            pattern = re.compile(f"^{re.escape(prefix)}")
-            
-            # Store original active object
-            original_active = context.view_layer.objects.active
-            
-            try:
-                # Set armature active and enter edit mode
+        # Store original active object and selection
+        original_active = context.view_layer.objects.active
+        original_selection = list(context.selected_objects)
+
+        try:
+            for armature in armatures:
+                prefix = self.get_prefix(context, armature)
+                if not prefix:
+                    self.report({'WARNING'}, f"No Mixamo prefix found in {armature.name}")
+                    continue
+
+                state = convert_pipeline.make_conversion_state(
+                    bone_map, prefix, BONE_PARENTS, deform_index.get(armature.name, [])
+                )
+
+                # Only this armature active + selected, so EDIT/POSE don't pick up other objects
+                for obj in context.selected_objects:
+                    obj.select_set(False)
+                armature.select_set(True)
                 context.view_layer.objects.active = armature
-                bpy.ops.object.mode_set(mode='EDIT')
-                
-                # Single rename loop
-                for bone in armature.data.edit_bones:
-                    if not pattern.match(bone.name):
-                        skipped += 1
-                        continue
-
-                    base_name = pattern.sub("", bone.name)
-                    if base_name in bone_map:
-                        new_name = bone_map[base_name]
-                        
-                        # Skip if name exists (unless it's the same bone)
-                        if new_name in armature.data.edit_bones:
-                            if armature.data.edit_bones[new_name] != bone:
-                                self.report({'WARNING'}, f"Skipped: {new_name} already exists")
-                                skipped += 1
-                                continue
-                                
-                        bone.name = new_name
-                        processed += 1
-                
-                # Return to object mode before helper ops
-                bpy.ops.object.mode_set(mode='OBJECT')
-                
-                # Execute helper operators
-                bpy.ops.object.fix_bone_roll()
-                bpy.ops.object.auto_parenting()
-                bpy.ops.object.apply_rest_pose()
-                
-                # Rename vertex groups
-                for mesh in meshes:
-                    if mesh.parent == armature:
-                        for vg in mesh.vertex_groups:
-                            if pattern.match(vg.name):
-                                base_name = pattern.sub("", vg.name)
-                                if base_name in bone_map:
-                                    vg.name = bone_map[base_name]
-            
-            finally:
-                # Restore original active object
-                context.view_layer.objects.active = original_active
 
-        self.report({'INFO'}, f"Renamed {processed} bones, skipped {skipped}")
+                # rename, roll, reparent (one EDIT session) -> rest pose (one POSE session) -> vertex groups
+                timings = convert_pipeline.run_pipeline(armature, convert_pipeline.CONVERSION_STAGES, state)
+
+                for warning in state['warnings']:
+                    self.report({'WARNING'}, warning)
+                processed += state['renamed']
+                skipped += state['skipped']
+                groups_renamed += state['groups_renamed']
+
+                timing_text = convert_pipeline.format_timings(timings)
+                print(f"[INFO] {armature.name}: {timing_text}")
+                self.report({'INFO'}, f"{armature.name}: {timing_text}")
+
+        finally:
+            # Restore original selection and active object
+            for obj in context.selected_objects:
+                obj.select_set(False)
+            for obj in original_selection:
+                obj.select_set(True)
+            context.view_layer.objects.active = original_active
+
+        self.report({'INFO'}, f"Renamed {processed} bones, {groups_renamed} vertex groups, skipped {skipped}")
+        return {'FINISHED'}
+
+class OBJECT_OT_detect_preset(Operator):
+    """Wählt das passende Mapping-Preset anhand der Bone-Namen der Armature"""
+    bl_idname = "object.detect_preset"
+    bl_label = "Detect Preset"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    preset_key: StringProperty(name="Preset", default="", options={'HIDDEN'})
+
+    @classmethod
+    def poll(cls, context):
+        return (context.active_object and 
+                context.active_object.type == 'ARMATURE')
+
+    def execute(self, context):
+        props = context.scene.bone_mapping_props
+        armature = context.active_object
+        names = [bone.name for bone in armature.data.bones]
+
+        # Index über alle Presets (eingebaut + presets/*.json), gecacht
+        index = bone_map.get_preset_index(PRESETS, PRESETS_DIR)
+        ranking = [(score, key, index.presets[key]['label']) for score, key in index.rank(names)]
+        preset_rankings[armature.name] = ranking
+
+        if not ranking:
+            self.report({'WARNING'}, f"Kein passendes Preset für {armature.name} gefunden")
+            return {'CANCELLED'}
+
+        key = self.preset_key or ranking[0][1]
+        preset = index.presets.get(key)
+        if not preset:
+            self.report({'ERROR'}, f"Preset nicht gefunden: {key}")
+            return {'CANCELLED'}
+
+        enum_ids = {item.identifier for item in props.bl_rna.properties['preset'].enum_items}
+        if preset['source'] == 'BUILTIN' and key in enum_ids:
+            props.preset = key
+        else:
+            context.scene['custom_bone_map'] = {
+                bone_map.strip_namespace(src): dst for src, dst in preset['mapping'].items()
+            }
+            props.preset = 'CUSTOM'
+
+        # Prefix nur über Bones bestimmen, die das Preset kennt
+        prefix = bone_map.detect_prefix(names, preset['signature'])
+        if prefix:
+            props.prefix_mode = 'CUSTOM'
+            props.custom_prefix = prefix
+
+        score = next((r[0] for r in ranking if r[1] == key), 0.0)
+        self.report({'INFO'}, f"Preset: {preset['label']} ({score:.0%}), Prefix: {prefix or '-'}")
         return {'FINISHED'}
 
 # ------------------------------------------------------------------------
@@ -1782,68 +1964,18 @@ class OBJECT_OT_apply_hand_data(Operator):
         return (context.active_object and 
                 context.active_object.type == 'ARMATURE')
     
-    def detect_prefix(self, armature):
-        """Automatically detects Mixamo prefix in armature"""
-        prefixes = ['mixamorig:', 'mixamorig1:', 'mixamorig2:']
-        for bone in armature.data.bones:
-            for prefix in prefixes:
-                if bone.name.startswith(prefix):
-                    return prefix
-        return None
-    
-    def find_bone(self, armature, bento_name, prefix=""):
-        """
-        Finds a bone by:
-        1. Original Bento name (e.g., "mWristLeft")
-        2. Mixamo name with prefix (e.g., "mixamorig:LeftHand")
-        3. Fallback to Bento-to-Mixamo mapping (if defined in PRESETS)
-        """
-        # Try exact Bento name first (from hand_data)
-        bone = armature.pose.bones.get(bento_name)
-        if bone:
-            return bone
-        
-        # Try Mixamo name if prefix exists (e.g., "mixamorig:LeftHand")
-        if prefix:
-            # Reverse lookup in PRESETS to find Mixamo equivalent
-            for mixamo_name, preset_name in PRESETS['BENTO_FULL'].items():
-                if preset_name == bento_name:
-                    prefixed_name = prefix + mixamo_name
-                    bone = armature.pose.bones.get(prefixed_name)
-                    if bone:
-                        return bone
-        
-        return None
-    
     def execute(self, context):
         props = context.scene.bone_mapping_props
         armature = context.active_object
-        prefix = self.detect_prefix(armature)  # Auto-detect Mixamo prefix
-        
-        def apply_bone_recursive(bone_dict):
-            """Applies pose data recursively"""
-            for bento_name, data in bone_dict.items():
-                if isinstance(data, dict) and 'pos' in data:
-                    bone = self.find_bone(armature, bento_name, prefix)
-                    if not bone:
-                        self.report({'WARNING'}, f"Bone '{bento_name}' not found!")
-                        continue
-                    
-                    # Apply position and rotation
-                    bone.location = data['pos']
-                    if 'rot' in data:
-                        bone.rotation_mode = 'XYZ'
-                        bone.rotation_euler = data['rot']
-                
-                # Process children
-                if 'children' in data:
-                    apply_bone_recursive(data['children'])
-
-        # Apply to left/right hands based on settings
-        if props.apply_left_hand:
-            apply_bone_recursive(hand_data['left'])
-        if props.apply_right_hand:
-            apply_bone_recursive(hand_data['right'])
+
+        # Apply to left/right hands based on settings (compiled, full strength)
+        for side, enabled in (('left', props.apply_left_hand), ('right', props.apply_right_hand)):
+            if not enabled:
+                continue
+            blender = get_pose_blender(armature, 'hand_' + side, hand_data[side])
+            for bento_name in blender.missing:
+                self.report({'WARNING'}, f"Bone '{bento_name}' not found!")
+            blender.apply(armature, 1.0, base_mode='REST')
         
         self.report({'INFO'}, "Hand pose applied!")
         return {'FINISHED'}
@@ -1861,65 +1993,14 @@ class OBJECT_OT_apply_bento_data(Operator):
         return (context.active_object and 
                 context.active_object.type == 'ARMATURE')
     
-    def detect_prefix(self, armature):
-        """Automatically detects Mixamo prefix in armature"""
-        prefixes = ['mixamorig:', 'mixamorig1:', 'mixamorig2:']
-        for bone in armature.data.bones:
-            for prefix in prefixes:
-                if bone.name.startswith(prefix):
-                    return prefix
-        return None
-    
-    def find_bone(self, armature, bento_name, prefix=""):
-        """
-        Finds a bone by:
-        1. Original Bento name (e.g., "mWristLeft")
-        2. Mixamo name with prefix (e.g., "mixamorig:LeftHand")
-        3. Fallback to Bento-to-Mixamo mapping (if defined in PRESETS)
-        """
-        # Try exact Bento name first
-        bone = armature.pose.bones.get(bento_name)
-        if bone:
-            return bone
-        
-        # Try Mixamo name if prefix exists (e.g., "mixamorig:LeftHand")
-        if prefix:
-            # Reverse lookup in PRESETS to find Mixamo equivalent
-            for mixamo_name, preset_name in PRESETS['BENTO_FULL'].items():
-                if preset_name == bento_name:
-                    prefixed_name = prefix + mixamo_name
-                    bone = armature.pose.bones.get(prefixed_name)
-                    if bone:
-                        return bone
-        
-        return None
-    
     def execute(self, context):
-        props = context.scene.bone_mapping_props
         armature = context.active_object
-        prefix = self.detect_prefix(armature)  # Auto-detect Mixamo prefix
-        
-        def apply_bone_recursive(bone_dict):
-            """Applies pose data recursively"""
-            for bento_name, data in bone_dict.items():
-                if isinstance(data, dict) and 'pos' in data:
-                    bone = self.find_bone(armature, bento_name, prefix)
-                    if not bone:
-                        self.report({'WARNING'}, f"Bone '{bento_name}' not found!")
-                        continue
-                    
-                    # Apply position and rotation
-                    bone.location = data['pos']
-                    if 'rot' in data:
-                        bone.rotation_mode = 'XYZ'
-                        bone.rotation_euler = data['rot']
-                
-                # Process children
-                if 'children' in data:
-                    apply_bone_recursive(data['children'])
 
-        # Apply the full Bento pose
-        apply_bone_recursive(bento_data)
+        # Apply the full Bento pose (compiled, full strength)
+        blender = get_pose_blender(armature, 'bento', bento_data)
+        for bento_name in blender.missing:
+            self.report({'WARNING'}, f"Bone '{bento_name}' not found!")
+        blender.apply(armature, 1.0, base_mode='REST')
         
         self.report({'INFO'}, "Bento pose applied!")
         return {'FINISHED'}
@@ -1944,15 +2025,6 @@ class OBJECT_OT_apply_group_data(Operator):
         return (context.active_object and 
                 context.active_object.type == 'ARMATURE')
     
-    def detect_prefix(self, armature):
-        """Automatically detects Mixamo prefix in armature"""
-        prefixes = ['mixamorig:', 'mixamorig1:', 'mixamorig2:']
-        for bone in armature.data.bones:
-            for prefix in prefixes:
-                if bone.name.startswith(prefix):
-                    return prefix
-        return None
-    
     def find_bone(self, armature, bone_name, prefix=""):
         """
         Finds a bone by:
@@ -2059,7 +2131,7 @@ class OBJECT_OT_apply_group_data(Operator):
     
     def execute(self, context):
         armature = context.active_object
-        prefix = self.detect_prefix(armature)
+        prefix = detect_mixamo_prefix(armature)
         
         # Parse XML file
         bone_data = self.parse_xml(self.filepath)
@@ -2157,77 +2229,122 @@ class OBJECT_OT_optimize_weights(bpy.types.Operator):
     def execute(self, context):
         props = context.scene.bone_mapping_props
         
+        rules = []
+        if props.use_split_rules:
+            rules_file = bpy.path.abspath(props.split_rules_file) if props.split_rules_file else WEIGHT_RULES_FILE
+            try:
+                rules = weight_rules.load_rules(rules_file)
+            except Exception as e:
+                self.report({'ERROR'}, f"Split-Regeln konnten nicht geladen werden: {str(e)}")
+                return {'CANCELLED'}
+        
+        changed = 0
+        split = 0
+        hardened = 0
+        smoothed = 0
         for obj in context.selected_objects:
             if obj.type != 'MESH':
                 continue
             
-            # 1. Niedrige Gewichte entfernen  ------------------------------
-            self.cleanup_small_weights(obj, props.weight_threshold)
+            # Gewichte einmal lesen, alle Schritte auf der Tabelle
+            table = weight_table.WeightTable.from_object(obj)
+            
+            # Bone‑Achsen im Mesh‑Raum (Split‑Verlauf und Gelenk‑Härtung)
+            positions = axes = None
+            armature = weight_rules.find_armature(obj)
+            if armature is not None and (props.harden_joints or weight_rules.needs_axes(rules)):
+                positions = spatial.vertex_positions(obj.data)
+                axes = weight_rules.bone_axes(armature, obj)
+            
+            # 1. Gewicht‑Split nach Regeldatei  ----------------------
+            #    (Quell‑Group → N Bento‑Bones, fester Anteil oder Verlauf entlang einer Bone‑Achse)
+            if rules:
+                applied, warnings = weight_rules.apply_split_rules(table, rules, positions, axes)
+                split += applied
+                for warning in warnings:
+                    self.report({'WARNING'}, f"{obj.name}: {warning}")
             
             # 2. Optionale Gelenk‑Härtung ----------------------------------
-            if props.harden_joints:
-                self.harden_joints(obj)
+            #    (Gewichtsverlauf an Schulter/Ellenbogen, Hüfte/Knie ... schärfen)
+            if props.harden_joints and axes is not None:
+                hardened += weight_table.harden_joints(
+                    table, positions, axes,
+                    power=props.harden_power,
+                    radius=props.harden_radius
+                )
             
-            # 3. Beispiel für Gewicht‑Split  ------------------------------
-            #    (falls du Finger‑Weights auf mehrere Bento‑Bones teilen willst)
-            #    -> hier exemplarisch: Mixamo‑"Head" → mHead & mSkull
-            if "Head" in obj.vertex_groups:
-                self.split_group(
-                    mesh=obj,
-                    src="Head",
-                    dst1="mHead",
-                    dst2="mSkull",
-                    ratio=0.7          # 70 % auf mHead, 30 % auf mSkull
+            # 3. Laplace‑Glättung aller gewählten Groups ------------------
+            if props.smooth_iterations > 0:
+                smoothed += weight_table.smooth(
+                    table,
+                    weight_table.mesh_adjacency(obj.data),
+                    self.smooth_group_indices(table, armature, props.smooth_groups),
+                    iterations=props.smooth_iterations,
+                    factor=props.smooth_factor
                 )
+            
+            # 4. Limit + Normalisieren + Prune ----------------------------
+            stats = weight_table.limit_influences(
+                table,
+                max_influences=props.max_influences,
+                threshold=props.weight_threshold,
+                normalize=props.normalize_weights,
+                groups=weight_table.deform_group_mask(table, armature) if armature is not None else None
+            )
+            changed += stats['vertices_changed']
+            
+            # Einmal zurückschreiben
+            table.write(obj)
         
-        self.report({'INFO'}, "Weights optimiert")
+        self.report({'INFO'}, f"Weights optimiert ({split} Split-Regeln angewendet, {hardened} Gelenk-Vertices gehärtet, {smoothed} geglättet, {changed} Vertices geändert)")
         return {'FINISHED'}
     
-    # ----------  Helfer: kleine Gewichte löschen  ----------
-    def cleanup_small_weights(self, mesh_obj, threshold):
-        for vg in mesh_obj.vertex_groups:
-            to_remove = [
-                v.index
-                for v in mesh_obj.data.vertices
-                if vg.index in [g.group for g in v.groups]
-                and vg.weight(v.index) < threshold
-            ]
-            if to_remove:
-                vg.remove(to_remove)
+    # ----------  Helfer: Groups für die Glättung  ----------
+    def smooth_group_indices(self, table, armature, mode):
+        if mode == 'ALL' or armature is None:
+            return list(range(table.num_groups))
+        if mode == 'BONE_SELECT':
+            names = {b.name for b in armature.data.bones if b.select}
+        else:
+            names = {b.name for b in armature.data.bones if b.use_deform}
+        return [gi for gi, name in enumerate(table.group_names) if name in names]
+
+class OBJECT_OT_mirror_weights(bpy.types.Operator):
+    """Spiegelt Left/Right-Gewichte über die X-Achse (räumliche Partnersuche, topologie-unabhängig)"""
+    bl_idname = "object.mirror_weights"
+    bl_label = "Mirror Weights"
+    bl_options = {'REGISTER', 'UNDO'}
     
-    # ----------  Helfer: Gelenke härten (Platzhalter)  ----------
-    def harden_joints(self, mesh_obj):
-        # Hier könntest du z.B. Gewichte an Ellenbogen/Knie stärker auf den
-        # entsprechenden Bone fokussieren.  Implementation bleibt dir überlassen.
-        print(f"Harden joints on {mesh_obj.name}")
+    mode: EnumProperty(name="Modus", items=[('SYMMETRIZE', "Symmetrisieren", "Mittelwert beider Seiten"), ('LEFT_TO_RIGHT', "Links → Rechts", "Linke Seite (+X) auf die rechte kopieren"), ('RIGHT_TO_LEFT', "Rechts → Links", "Rechte Seite (-X) auf die linke kopieren")], default='SYMMETRIZE')
+    tolerance: FloatProperty(name="Toleranz", description="Maximaler Abstand zum gespiegelten Partner-Vertex", default=0.001, min=0.0, max=1.0, precision=4)
     
-    # ----------  NEU: Gewichte aufteilen  ----------
-    def split_group(self, mesh, src, dst1, dst2, ratio=0.5):
-        """
-        Teilt die Gewichte des Vertex‑Groups *src* im Verhältnis *ratio*
-        auf zwei Ziel‑Groups *dst1* und *dst2* auf.
-        """
-        vg_src  = mesh.vertex_groups.get(src)
-        if not vg_src:
-            return
-        
-        vg_dst1 = mesh.vertex_groups.get(dst1)
-        if not vg_dst1:
-            vg_dst1 = mesh.vertex_groups.new(name=dst1)
+    def execute(self, context):
+        meshes = [o for o in context.selected_objects if o.type == 'MESH']
+        if not meshes:
+            self.report({'ERROR'}, "Kein Mesh-Objekt ausgewählt")
+            return {'CANCELLED'}
         
-        vg_dst2 = mesh.vertex_groups.get(dst2)
-        if not vg_dst2:
-            vg_dst2 = mesh.vertex_groups.new(name=dst2)
-
-        for v in mesh.data.vertices:
-            try:
-                w = vg_src.weight(v.index)
-                if w > 0:
-                    vg_dst1.add([v.index], w * ratio, 'ADD')
-                    vg_dst2.add([v.index], w * (1 - ratio), 'ADD')
-            except RuntimeError:
-                # Vertex nicht im src‑Group – überspringen
-                continue
+        mirrored = 0
+        unmatched = 0
+        for obj in meshes:
+            table = weight_table.WeightTable.from_object(obj)
+            
+            # Ein KD-Tree der an X gespiegelten Positionen, eine Abfrage für alle Vertices
+            # (Links → Rechts schreibt die rechte Seite -X, Rechts → Links die linke +X)
+            side = {'LEFT_TO_RIGHT': 'NEGATIVE', 'RIGHT_TO_LEFT': 'POSITIVE'}.get(self.mode)
+            partner, verts, missing = spatial.mirror_partners(
+                spatial.vertex_positions(obj.data), self.tolerance, side)
+            unmatched += missing
+            
+            swap = weight_table.mirror_group_map(table)
+            mirrored += weight_table.mirror(table, partner, verts, swap,
+                                            'SYMMETRIZE' if self.mode == 'SYMMETRIZE' else 'COPY')
+            table.write(obj)
+        
+        if unmatched:
+            self.report({'WARNING'}, f"{unmatched} Vertices ohne Spiegelpartner (Toleranz {self.tolerance})")
+        self.report({'INFO'}, f"Gewichte gespiegelt: {mirrored} Vertices")
+        return {'FINISHED'}
 
 # ------------------------------------------------------------------------
 # Auto Parenting and Auto Weighting Section
@@ -2274,13 +2391,23 @@ class OBJECT_OT_auto_parenting(bpy.types.Operator):
 # ------------------------------------------------------------------------
 
 class OBJECT_OT_save_weights_json(bpy.types.Operator, ExportHelper):
-    """Speichert Vertex-Gewichtungen aller Meshes als JSON-Datei"""
+    """Speichert Vertex-Gewichtungen aller Meshes als binären Snapshot oder JSON-Datei"""
     bl_idname = "object.save_weights_json"
     bl_label = "Weights exportieren"
-    bl_description = "Speichert alle Vertex-Gewichte aller Meshes als JSON"
-    filename_ext = ".json"
+    bl_description = "Speichert alle Vertex-Gewichte aller Meshes (Snapshot .mxw oder JSON)"
+    filename_ext = ".mxw"
+
+    filter_glob: bpy.props.StringProperty(default="*.mxw;*.json", options={'HIDDEN'})
+    file_format: EnumProperty(name="Format", items=[('SNAPSHOT', "Snapshot (.mxw)", "Kompaktes Binärformat mit Topologie-Hash"), ('JSON', "JSON", "Lesbares JSON (groß)")], default='SNAPSHOT')
 
-    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+    def check(self, context):
+        # Dateiendung folgt dem gewählten Format
+        ext = ".json" if self.file_format == 'JSON' else ".mxw"
+        filepath = bpy.path.ensure_ext(os.path.splitext(self.filepath)[0], ext)
+        if filepath != self.filepath:
+            self.filepath = filepath
+            return True
+        return False
 
     def find_meshes(self, context):
         obj = context.active_object
@@ -2309,34 +2436,22 @@ class OBJECT_OT_save_weights_json(bpy.types.Operator, ExportHelper):
             self.report({'ERROR'}, "Kein Mesh mit Vertex Groups gefunden")
             return {'CANCELLED'}
 
-        weights_data = {}
-
+        snapshots = []
         for obj in meshes:
-            obj_weights = {}
-            mesh = obj.data
-
-            for vg in obj.vertex_groups:
-                group_weights = {}
-                for v in mesh.vertices:
-                    try:
-                        w = vg.weight(v.index)
-                        if w > 0.0:
-                            group_weights[str(v.index)] = w
-                    except RuntimeError:
-                        continue
-                if group_weights:
-                    obj_weights[vg.name] = group_weights
-
-            if obj_weights:
-                weights_data[obj.name] = obj_weights
-
-        if not weights_data:
+            table = weight_table.WeightTable.from_object(obj)
+            if table.nnz:
+                snapshots.append(weight_snapshot.SnapshotMesh.from_object(obj, table))
+
+        if not snapshots:
             self.report({'ERROR'}, "Keine Gewichte gefunden")
             return {'CANCELLED'}
 
+        self.check(context)
         try:
-            with open(self.filepath, 'w', encoding='utf-8') as f:
-                json.dump(weights_data, f, indent=2)
+            if self.file_format == 'JSON':
+                weight_snapshot.save_json(self.filepath, snapshots)
+            else:
+                weight_snapshot.save_snapshot(self.filepath, snapshots)
             self.report({'INFO'}, f"Weights exportiert: {os.path.basename(self.filepath)}")
             return {'FINISHED'}
         except Exception as e:
@@ -2350,67 +2465,259 @@ class OBJECT_OT_export_opensim_dae(Operator):
     bl_options = {'REGISTER'}
 
     filepath: StringProperty(subtype="FILE_PATH")
+    max_influences: IntProperty(name="Max Influences", description="Joint-Einflüsse pro Vertex (SL/OpenSim: max. 4)", default=4, min=1, max=4)
+    apply_modifiers: BoolProperty(name="Apply Modifiers", description="Modifier (außer Armature) anwenden", default=True)
+    use_builtin: BoolProperty(name="Built-in Collada", description="Blenders Collada-Exporter statt des eigenen DAE-Writers verwenden", default=False)
+    benchmark: BoolProperty(name="Benchmark", description="Zusätzlich mit dem eingebauten Collada-Exporter exportieren und die Laufzeit vergleichen", default=False)
+    generate_lods: BoolProperty(name="LODs erzeugen", description="Zusätzliche LOD-DAEs (_LOD2, _LOD1, _LOD0) mit gleichem Skin schreiben", default=False)
+    lod_ratios: StringProperty(name="LOD-Verhältnisse", description="Dreiecksanteil je LOD-Stufe, kommagetrennt (mittel, niedrig, niedrigste)", default="0.5, 0.25, 0.1")
+    lod_jobs: IntProperty(name="LOD-Prozesse", description="Parallele Worker-Prozesse für die Dezimierung (0 = automatisch)", default=0, min=0, max=64)
 
     def execute(self, context):
         if not self.filepath.lower().endswith(".dae"):
             self.filepath += ".dae"
 
+        builtin_available = "collada_export" in dir(bpy.ops.wm)
+        if self.use_builtin:
+            if not builtin_available:
+                self.report({'ERROR'}, "Collada-Exporter ist in dieser Blender-Version nicht vorhanden")
+                return {'CANCELLED'}
+            self.builtin_export(self.filepath)
+            self.report({'INFO'}, f"DAE exportiert nach {self.filepath}")
+            return {'FINISHED'}
+
+        lod_ratios = ()
+        if self.generate_lods:
+            try:
+                lod_ratios = [float(r) for r in self.lod_ratios.replace(";", ",").split(",") if r.strip()]
+            except ValueError:
+                self.report({'ERROR'}, f"Ungültige LOD-Verhältnisse: {self.lod_ratios}")
+                return {'CANCELLED'}
+            if not all(0.0 < r <= 1.0 for r in lod_ratios):
+                self.report({'ERROR'}, "LOD-Verhältnisse müssen zwischen 0 und 1 liegen")
+                return {'CANCELLED'}
+
+        # Eigener Writer: nur SL-relevante Daten, direkt in die Datei gestreamt
+        try:
+            stats = dae_writer.export(context, context.selected_objects, self.filepath,
+                                      max_influences=self.max_influences, apply_modifiers=self.apply_modifiers,
+                                      lod_ratios=lod_ratios, jobs=self.lod_jobs or None)
+        except Exception as e:
+            self.report({'ERROR'}, f"DAE-Export fehlgeschlagen: {e}")
+            return {'CANCELLED'}
+
+        message = (f"DAE exportiert nach {self.filepath} ({stats['meshes']} Meshes, {stats['vertices']} Vertices, "
+                   f"{stats['bytes'] / 1024:.0f} KB, {stats['time']:.2f}s)")
+        if stats.get('lods'):
+            levels = ", ".join(f"{os.path.basename(l['file'])}: {l['triangles']} Dreiecke" for l in stats['lods'])
+            message += f" | LODs in {stats['lod_time']:.2f}s: {levels}"
+
+        if self.benchmark and builtin_available:
+            reference = os.path.splitext(self.filepath)[0] + "_builtin.dae"
+            t0 = time.perf_counter()
+            self.builtin_export(reference)
+            builtin_time = time.perf_counter() - t0
+            message += (f" | Collada: {builtin_time:.2f}s, {os.path.getsize(reference) / 1024:.0f} KB "
+                        f"(x{builtin_time / max(stats['time'], 1e-6):.1f})")
+
+        self.report({'INFO'}, message)
+        return {'FINISHED'}
+
+    def builtin_export(self, filepath):
         # Aktuelle Export-Einstellungen für Collada in Blender 4.4
         bpy.ops.wm.collada_export(
-            filepath=self.filepath,
+            filepath=filepath,
             selected=True,
             export_armatures=True,
             export_meshes=True,
             export_uvs=True,
             export_normals=True,
             export_materials=True,
-            apply_modifiers=True,
+            apply_modifiers=self.apply_modifiers,
             triangulate=True,
             use_object_instantiation=False,
             keep_bind_info=True
         )
-        
-        self.report({'INFO'}, f"DAE exportiert nach {self.filepath}")
+
+def bento_name_map(context, armature):
+    """Vollständiger Quellname -> Bento-Name für die Bones der Armature (aktuelles Preset, erkannter Präfix)"""
+    props = context.scene.bone_mapping_props
+    mapping = context.scene.get('custom_bone_map', {}) if props.preset == 'CUSTOM' else PRESETS[props.preset]
+    prefix = bone_map.detect_prefix([bone.name for bone in armature.data.bones])
+    return bone_map.compile_name_map(dict(mapping), prefix)
+
+class OBJECT_OT_export_opensim_bvh(Operator, ExportHelper):
+    """Exportiert die auf die Deform-Bones gebackene Animation als BVH mit Bento-Namen"""
+    bl_idname = "export_anim.opensim_bvh"
+    bl_label = "Export BVH (OpenSim)"
+    bl_options = {'REGISTER'}
+
+    filename_ext = ".bvh"
+    filter_glob: StringProperty(default="*.bvh", options={'HIDDEN'})
+    all_actions: BoolProperty(name="Alle Actions", description="Jede Action des Rigs als eigene BVH-Datei in den Zielordner schreiben", default=False)
+    frame_step: IntProperty(name="Frame-Schritt", description="Nur jeden n-ten Frame abtasten", default=1, min=1, max=10)
+    use_skeleton_offsets: BoolProperty(name="Offsets aus avatar_skeleton.xml", description="Gelenk-Offsets aus dem SL-Referenzskelett statt aus der Ruhepose", default=False)
+    rotation_order: EnumProperty(name="Rotationsreihenfolge", items=[(o, o, "") for o in ('ZXY', 'XYZ', 'XZY', 'YXZ', 'YZX', 'ZYX')], default='ZXY')
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and context.active_object.type == 'ARMATURE'
+
+    def execute(self, context):
+        armature = context.active_object
+        directory = os.path.dirname(self.filepath)
+        if self.all_actions:
+            actions, filenames = None, None
+        else:
+            anim = armature.animation_data
+            if anim is None or anim.action is None:
+                self.report({'ERROR'}, "Keine aktive Action auf dem Rig")
+                return {'CANCELLED'}
+            actions, filenames = [anim.action], [os.path.basename(self.filepath)]
+
+        reference = None
+        if self.use_skeleton_offsets:
+            if not os.path.exists(SKELETON_FILE):
+                self.report({'ERROR'}, f"avatar_skeleton.xml nicht gefunden: {SKELETON_FILE}")
+                return {'CANCELLED'}
+            reference = bone_fix.Skeleton.from_xml(SKELETON_FILE)
+
+        try:
+            stats = bvh_writer.export(context, armature, directory, actions=actions,
+                                      name_map=bento_name_map(context, armature), reference=reference,
+                                      step=self.frame_step, order=self.rotation_order, filenames=filenames)
+        except Exception as e:
+            self.report({'ERROR'}, f"BVH-Export fehlgeschlagen: {e}")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"{stats['clips']} BVH-Dateien ({stats['frames']} Frames, {stats['joints']} Gelenke, "
+                              f"{stats['bytes'] / 1024:.0f} KB) in {stats['time']:.2f}s nach {directory}")
+        return {'FINISHED'}
+
+class OBJECT_OT_export_opensim_anim(Operator, ExportHelper):
+    """Exportiert die auf die Deform-Bones gebackene Animation als SL-.anim mit Key-Reduktion"""
+    bl_idname = "export_anim.opensim_anim"
+    bl_label = "Export .anim (OpenSim)"
+    bl_options = {'REGISTER'}
+
+    filename_ext = ".anim"
+    filter_glob: StringProperty(default="*.anim", options={'HIDDEN'})
+    all_actions: BoolProperty(name="Alle Actions", description="Jede Action des Rigs als eigene .anim-Datei in den Zielordner schreiben", default=False)
+    frame_step: IntProperty(name="Frame-Schritt", description="Nur jeden n-ten Frame abtasten", default=1, min=1, max=10)
+    priority: IntProperty(name="Priorität", description="Animationspriorität (0-6)", default=3, min=0, max=6)
+    loop: BoolProperty(name="Loop", description="Animation in Schleife abspielen (ganzer Clip)", default=False)
+    ease_in: FloatProperty(name="Ease In", description="Einblendzeit in Sekunden", default=0.3, min=0.0, max=10.0)
+    ease_out: FloatProperty(name="Ease Out", description="Ausblendzeit in Sekunden", default=0.3, min=0.0, max=10.0)
+    hand_pose: EnumProperty(name="Handpose", items=[(p, p.replace('_', ' ').title(), "") for p in anim_writer.HAND_POSES], default='RELAXED')
+    tolerance: FloatProperty(name="Toleranz", description="Maximaler Fehler der Key-Reduktion (Quaternion-Komponenten bzw. Meter)", default=0.001, min=0.0, max=0.05, precision=4)
+    only_sl_joints: BoolProperty(name="Nur SL-Gelenke", description="Nur Gelenke aus avatar_skeleton.xml schreiben", default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None and context.active_object.type == 'ARMATURE'
+
+    def execute(self, context):
+        armature = context.active_object
+        directory = os.path.dirname(self.filepath)
+        if self.all_actions:
+            actions, filenames = None, None
+        else:
+            anim = armature.animation_data
+            if anim is None or anim.action is None:
+                self.report({'ERROR'}, "Keine aktive Action auf dem Rig")
+                return {'CANCELLED'}
+            actions, filenames = [anim.action], [os.path.basename(self.filepath)]
+
+        joint_names = None
+        if self.only_sl_joints and os.path.exists(SKELETON_FILE):
+            joint_names = set(bone_fix.Skeleton.from_xml(SKELETON_FILE).names)
+
+        try:
+            stats = anim_writer.export(context, armature, directory, actions=actions,
+                                       name_map=bento_name_map(context, armature), joint_names=joint_names,
+                                       step=self.frame_step, tolerance=self.tolerance,
+                                       position_tolerance=self.tolerance, filenames=filenames,
+                                       priority=self.priority, loop=self.loop, ease_in=self.ease_in,
+                                       ease_out=self.ease_out, hand_pose=self.hand_pose)
+        except Exception as e:
+            self.report({'ERROR'}, f".anim-Export fehlgeschlagen: {e}")
+            return {'CANCELLED'}
+
+        for name in stats['too_large']:
+            self.report({'WARNING'}, f"{name}: größer als {anim_writer.SIZE_LIMIT // 1000} KB")
+        for name in stats['too_long']:
+            self.report({'WARNING'}, f"{name}: länger als {anim_writer.MAX_DURATION:.0f}s")
+        self.report({'INFO'}, f"{stats['clips']} .anim-Dateien ({stats['keys']} Keys, {stats['bytes'] / 1024:.0f} KB) "
+                              f"in {stats['time']:.2f}s nach {directory}")
         return {'FINISHED'}
 
 class OBJECT_OT_load_weights_json(bpy.types.Operator, ImportHelper):
-    """Lädt Vertex-Gewichtungen aus JSON-Datei"""
+    """Lädt Vertex-Gewichtungen aus Snapshot- oder JSON-Datei"""
     bl_idname = "object.load_weights_json"
     bl_label = "Weights importieren"
-    bl_description = "Lädt Vertex-Gewichte aus JSON"
-    filename_ext = ".json"
+    bl_description = "Lädt Vertex-Gewichte aus Snapshot (.mxw) oder JSON"
     
-    filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+    filter_glob: bpy.props.StringProperty(default="*.mxw;*.json", options={'HIDDEN'})
+    transfer_neighbors: IntProperty(name="Nachbarn", description="Nächste gespeicherte Vertices pro Vertex, wenn die Topologie nicht passt", default=4, min=1, max=16)
+
+    def find_targets(self, context, snapshots):
+        """Ordnet gespeicherte Meshes den Objekten zu (Name, sonst aktives Mesh)"""
+        candidates = [o for o in context.selected_objects if o.type == 'MESH']
+        active = context.active_object
+        if active and active.type == 'MESH' and active not in candidates:
+            candidates.append(active)
+
+        by_name = {o.name: o for o in candidates}
+        targets = []
+        for name, snap in snapshots.items():
+            obj = (by_name.get(name) or context.scene.objects.get(name)) if name else None
+            if (obj is None or obj.type != 'MESH') and len(snapshots) == 1 and active and active.type == 'MESH':
+                obj = active
+            if obj is not None and obj.type == 'MESH':
+                targets.append((snap, obj))
+        return targets
 
     def execute(self, context):
-        obj = context.active_object
-        if not obj or obj.type != 'MESH':
-            self.report({'ERROR'}, "Kein Mesh-Objekt ausgewählt")
-            return {'CANCELLED'}
-            
         try:
-            with open(self.filepath, 'r') as f:
-                weights = json.load(f)
-                
-            # Vorhandene Groups löschen
-            for vg in obj.vertex_groups:
-                obj.vertex_groups.remove(vg)
-                
-            # Neue Groups erstellen
-            for vg_name in weights:
-                vg = obj.vertex_groups.new(name=vg_name)
-                for v_idx, weight in weights[vg_name].items():
-                    vg.add([int(v_idx)], weight, 'REPLACE')
-                    
+            snapshots = weight_snapshot.load(self.filepath)
         except Exception as e:
             self.report({'ERROR'}, f"Import fehlgeschlagen: {str(e)}")
             return {'CANCELLED'}
-            
-        self.report({'INFO'}, f"Weights importiert: {os.path.basename(self.filepath)}")
+
+        targets = self.find_targets(context, snapshots)
+        if not targets:
+            self.report({'ERROR'}, "Kein passendes Mesh-Objekt gefunden")
+            return {'CANCELLED'}
+
+        applied = 0
+        transferred = 0
+        for snap, obj in targets:
+            if snap.matches(obj.data):
+                table = snap.to_table(len(obj.data.vertices))
+            elif snap.can_transfer:
+                # Retopo/Decimation: Gewichte von den nächsten gespeicherten Vertices übernehmen
+                table = snap.transfer_table(spatial.vertex_positions(obj.data), self.transfer_neighbors)
+                transferred += 1
+            else:
+                self.report({'WARNING'}, f"{obj.name}: Topologie passt nicht zum Snapshot, übersprungen")
+                continue
+
+            # Vorhandene Groups ersetzen, Gewichte gruppenweise schreiben
+            obj.vertex_groups.clear()
+            table.write(obj)
+            applied += 1
+
+        if transferred:
+            self.report({'WARNING'}, f"{transferred} Meshes mit abweichender Topologie räumlich übertragen")
+
+        if not applied:
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Weights importiert: {os.path.basename(self.filepath)} ({applied} Meshes)")
         return {'FINISHED'}
 
 class OBJECT_OT_auto_weighting(bpy.types.Operator):
-    """Automatische Gewichtszuweisung via Armature"""
+    """Automatische Gewichtszuweisung via Armature (optional über ein dezimiertes Proxy-Mesh)"""
     bl_idname = "object.auto_weighting"
     bl_label = "Auto-Gewichtung"
     bl_options = {'REGISTER', 'UNDO'}
@@ -2426,29 +2733,62 @@ class OBJECT_OT_auto_weighting(bpy.types.Operator):
             self.report({'ERROR'}, "Keine Armature ausgewählt")
             return {'CANCELLED'}
             
+        props = context.scene.bone_mapping_props
+        
+        # Backup der aktuellen Selektion
+        prev_active = context.view_layer.objects.active
+        prev_selected = list(context.selected_objects)
+        
         try:
-            # Backup der aktuellen Selektion
-            prev_active = context.view_layer.objects.active
-            prev_selected = context.selected_objects
-            
-            # Parenting durchführen
-            context.view_layer.objects.active = obj
-            obj.select_set(True)
-            armature.select_set(True)
-            
-            bpy.ops.object.parent_set(type='ARMATURE_AUTO')
-            
-            # Originale Selektion wiederherstellen
-            context.view_layer.objects.active = prev_active
-            for o in prev_selected:
-                o.select_set(True)
+            if props.auto_weight_proxy:
+                self.proxy_weighting(context, obj, armature, props)
+            else:
+                # Parenting durchführen (Armature muss aktiv sein)
+                bpy.ops.object.select_all(action='DESELECT')
+                obj.select_set(True)
+                armature.select_set(True)
+                context.view_layer.objects.active = armature
+                bpy.ops.object.parent_set(type='ARMATURE_AUTO')
+                self.report({'INFO'}, "Automatische Gewichtung erfolgreich")
                 
         except Exception as e:
             self.report({'ERROR'}, f"Fehler: {str(e)}")
             return {'CANCELLED'}
             
-        self.report({'INFO'}, "Automatische Gewichtung erfolgreich")
+        finally:
+            # Originale Selektion wiederherstellen
+            bpy.ops.object.select_all(action='DESELECT')
+            for o in prev_selected:
+                o.select_set(True)
+            context.view_layer.objects.active = prev_active
+            
         return {'FINISHED'}
+    
+    def proxy_weighting(self, context, obj, armature, props):
+        """Heat-Weighting auf einem dezimierten Proxy, Übertragung über die nächste Proxy-Oberfläche"""
+        t0 = time.perf_counter()
+        
+        proxy = proxy_weights.make_proxy(context, obj, props.proxy_ratio)
+        proxy_verts = len(proxy.data.vertices)
+        try:
+            proxy_weights.heat_weight(context, proxy, armature)
+            transferred = proxy_weights.transfer_from_proxy(proxy, obj)
+        finally:
+            proxy_weights.remove_proxy(proxy)
+        
+        # Übertragene Bone-Groups ersetzen, dann Limit + Normalisieren
+        table = proxy_weights.replace_groups(weight_table.WeightTable.from_object(obj), transferred)
+        weight_table.limit_influences(
+            table,
+            max_influences=props.max_influences,
+            threshold=props.weight_threshold,
+            normalize=True,
+            groups=weight_table.deform_group_mask(table, armature)
+        )
+        table.write(obj)
+        proxy_weights.bind_to_armature(obj, armature)
+        
+        self.report({'INFO'}, f"Proxy-Gewichtung: {proxy_verts} / {len(obj.data.vertices)} Vertices, {time.perf_counter() - t0:.1f}s")
 
 # ------------------------------------------------------------------------
 # Bone Info Report Operator
@@ -2507,32 +2847,36 @@ class OBJECT_OT_bone_info(Operator):
         return {'FINISHED'}
 
     def get_weight_stats(self, context, bone_name):
-        """Analysiert die Vertex-Gewichte für diesen Knochen"""
+        """Analysiert die Vertex-Gewichte für diesen Knochen (gecachte Statistik aller deformierten Meshes)"""
         obj = context.active_object
-        if not obj or obj.type != 'MESH':
+        if not obj:
             return None
 
-        vertex_group = obj.vertex_groups.get(bone_name)
-        if not vertex_group:
-            return None
+        if obj.type == 'MESH':
+            meshes = [obj]
+        else:
+            meshes = convert_pipeline.build_deform_index(context.scene.objects).get(obj.name, [])
 
-        mesh = obj.data
-        total = 0
         count = 0
-        max_weight = 0
+        total = 0.0
+        max_weight = 0.0
         zero_count = 0
+        found = False
 
-        for v in mesh.vertices:
-            try:
-                weight = vertex_group.weight(v.index)
-                if weight > 0:
-                    total += weight
-                    count += 1
-                    max_weight = max(max_weight, weight)
-                else:
-                    zero_count += 1
-            except:
-                zero_count += 1
+        for mesh in meshes:
+            vertex_group = mesh.vertex_groups.get(bone_name)
+            if not vertex_group:
+                continue
+            found = True
+            stats = weight_table.get_group_stats(mesh)
+            gi = vertex_group.index
+            count += int(stats['count'][gi])
+            total += float(stats['sum'][gi])
+            max_weight = max(max_weight, float(stats['max'][gi]))
+            zero_count += int(stats['zero'][gi])
+
+        if not found:
+            return None
 
         return {
             'vertex_count': count,
@@ -2558,6 +2902,8 @@ class OBJECT_OT_bone_info(Operator):
         
         return warnings
 
+STRUCTURE_RULES = ('missing', 'extra_roots', 'wrong_parents', 'disconnected')
+
 class OBJECT_OT_analyze_bone_structure(Operator):
     """Erweiterte Bone-Struktur Analyse"""
     bl_idname = "object.analyze_bone_structure"
@@ -2569,6 +2915,12 @@ class OBJECT_OT_analyze_bone_structure(Operator):
         default="UI",
         options={'HIDDEN'}
     )
+    json_path: StringProperty(
+        name="JSON Report",
+        description="Optional: Ergebnis zusätzlich als JSON speichern",
+        default="",
+        subtype='FILE_PATH'
+    )
 
     def execute(self, context):
         bone_parents = load_bone_parents()
@@ -2594,40 +2946,11 @@ class OBJECT_OT_analyze_bone_structure(Operator):
         return armatures[0]
 
     def check_structure(self, armature, bone_parents):
-        """Führt alle Prüfungen durch"""
-        issues = {
-            'missing': [],
-            'extra_roots': [],
-            'wrong_parents': [],
-            'disconnected': []
-        }
-        
-        with bpy.context.temp_override(active_object=armature):
-            bpy.ops.object.mode_set(mode='EDIT')
-            bones = armature.data.edit_bones
-            
-            # 1. Fehlende Bones
-            expected_bones = set(bone_parents.keys()).union(bone_parents.values()) - {None}
-            issues['missing'] = [b for b in expected_bones if b not in bones]
-            
-            # 2. Hierarchie-Prüfung
-            for bone in bones:
-                if not bone.parent:
-                    if bone.name != "mPelvis":
-                        issues['extra_roots'].append(bone.name)
-                else:
-                    expected_parent = bone_parents.get(bone.name)
-                    if expected_parent and bone.parent.name != expected_parent:
-                        issues['wrong_parents'].append(
-                            f"{bone.name} (erwartet: {expected_parent}, aktuell: {bone.parent.name})"
-                        )
-                    
-                    if bone.use_connect and (bone.head - bone.parent.tail).length > 0.001:
-                        issues['disconnected'].append(bone.name)
-            
-            bpy.ops.object.mode_set(mode='OBJECT')
-        
-        return issues
+        """Führt alle Prüfungen durch (liest Bone-Daten direkt, ohne Edit-Mode)"""
+        report = rig_validation.validate(armature, rules=STRUCTURE_RULES, bone_parents=bone_parents)
+        if self.json_path:
+            rig_validation.write_json(bpy.path.abspath(self.json_path), [report])
+        return {name: [issue['message'] for issue in found] for name, found in report['issues'].items()}
 
     def report_results(self, issues):
         """Erzeugt detaillierte Reports"""
@@ -2673,6 +2996,12 @@ class OBJECT_OT_fix_bone_structure(bpy.types.Operator):
     bl_label = "Fix Bone Structure"
     bl_options = {'REGISTER', 'UNDO'}
 
+    dry_run: BoolProperty(
+        name="Dry Run",
+        description="Nur die geplanten Änderungen anzeigen, nichts verändern",
+        default=False
+    )
+
     def execute(self, context):
         # Direkte Armature-Auswahl ohne separate Methode
         armature = next((obj for obj in context.selected_objects 
@@ -2682,51 +3011,50 @@ class OBJECT_OT_fix_bone_structure(bpy.types.Operator):
             self.report({'ERROR'}, "Keine Armature ausgewählt")
             return {'CANCELLED'}
 
-        # Rest Ihrer Reparatur-Logik hier...
-        self.report({'INFO'}, "Bone-Struktur repariert")
+        # Reparatur wird ohne Moduswechsel aus den Rest-Daten geplant
+        skeleton = None
+        try:
+            skeleton = bone_fix.Skeleton.from_xml(SKELETON_FILE)
+        except Exception as e:
+            self.report({'WARNING'}, f"avatar_skeleton.xml nicht lesbar, Fallback-Positionen: {e}")
+
+        plan = bone_fix.plan_fixes(rig_validation.RigData(armature), load_bone_parents(), skeleton)
+
+        if plan.is_empty():
+            self.report({'INFO'}, "✅ Bone-Struktur ist korrekt")
+            return {'FINISHED'}
+
+        if self.dry_run:
+            self.show_diff(context, plan)
+            return {'FINISHED'}
+
+        results = self.apply_fixes(armature, plan)
+        self.report_results(results)
         return {'FINISHED'}
 
-    def apply_fixes(self, armature, bone_parents):
-        """Wendet Korrekturen an"""
-        results = {
-            'added': 0,
-            'parented': 0,
-            'connected': 0
-        }
-        
+    def apply_fixes(self, armature, plan):
+        """Wendet alle Korrekturen in einer einzigen Edit-Mode-Sitzung an"""
         with bpy.context.temp_override(active_object=armature):
             bpy.ops.object.mode_set(mode='EDIT')
-            bones = armature.data.edit_bones
-            
-            # 1. Fehlende Bones hinzufügen
-            for bone_name in bone_parents:
-                if bone_name not in bones:
-                    new_bone = bones.new(bone_name)
-                    new_bone.head = (0, 0, 0)
-                    new_bone.tail = (0, 0.1, 0)
-                    results['added'] += 1
-            
-            # 2. Parenting korrigieren
-            for child, parent in bone_parents.items():
-                if child in bones and parent in bones:
-                    child_bone = bones[child]
-                    parent_bone = bones[parent]
-                    
-                    if child_bone.parent != parent_bone:
-                        child_bone.parent = parent_bone
-                        child_bone.use_connect = False
-                        results['parented'] += 1
-                    
-                    # Auto-Connect wenn möglich
-                    if (not child_bone.use_connect and 
-                        (child_bone.head - parent_bone.tail).length < 0.001):
-                        child_bone.use_connect = True
-                        results['connected'] += 1
-            
-            bpy.ops.object.mode_set(mode='OBJECT')
-        
+            try:
+                results = bone_fix.apply_plan(armature, plan)
+            finally:
+                bpy.ops.object.mode_set(mode='OBJECT')
         return results
 
+    def show_diff(self, context, plan):
+        """Zeigt die geplanten Änderungen (Dry Run)"""
+        lines = plan.lines()
+        print("Bone-Struktur Reparatur (Dry Run):\n" + "\n".join(lines))
+        counts = plan.counts()
+        self.report({'INFO'}, f"Dry Run: {counts['added']} neu, {counts['parented']} Parentings, "
+                              f"{counts['connected']} Verbindungen (Details in der Systemkonsole)")
+        context.window_manager.popup_menu(
+            lambda self, ctx: [self.layout.label(text=line) for line in lines[:40]],
+            title="Fix Structure (Dry Run)",
+            icon='INFO'
+        )
+
     def report_results(self, results):
         """Zeigt Reparatur-Ergebnisse"""
         report = [
@@ -2741,6 +3069,8 @@ class OBJECT_OT_fix_bone_structure(bpy.types.Operator):
 # ------------------------------------------------------------------------
 # Validate Rig Operator
 # ------------------------------------------------------------------------
+RIG_RULES = ('non_uniform_scale', 'tiny_bones', 'weak_weights', 'extra_roots')
+
 class ARMATURE_OT_validate_rig(Operator):
     """Überprüft das gesamte Rig auf häufige Probleme"""
     bl_idname = "armature.validate_rig"
@@ -2753,39 +3083,21 @@ class ARMATURE_OT_validate_rig(Operator):
             self.report({'ERROR'}, "Keine Armature ausgewählt")
             return {'CANCELLED'}
 
-        issues = []
-        bone_count = 0
-        weight_issues = 0
-        scale_issues = 0
+        # Gewichtsstatistik nur für ausgewählte Meshes, Root-Anzahl statt fester Root-Name
+        meshes = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        report = rig_validation.validate(armature, meshes, rules=RIG_RULES, root=None)
+        bone_count = report['bones']
+        weight_issues = report['counts']['weak_weights']
+        scale_issues = report['counts']['non_uniform_scale']
 
-        # 1. Knochen-Hierarchie prüfen
-        for bone in armature.pose.bones:
-            bone_count += 1
-            
-            # A. Nicht-uniforme Skalierung
-            if abs(bone.scale.x - bone.scale.y) > 0.001 or abs(bone.scale.y - bone.scale.z) > 0.001:
-                issues.append(f"⚠️ Nicht-uniforme Skalierung: {bone.name}")
-                scale_issues += 1
-
-            # B. Extrem kurze Knochen
-            if bone.length < 0.001:
-                issues.append(f"⚠️ Extrem kurzer Knochen: {bone.name} (Länge: {bone.length:.4f})")
-
-            # C. Gewichtungsprobleme (nur wenn Mesh ausgewählt)
-            if context.selected_objects and context.selected_objects[0].type == 'MESH':
-                mesh = context.selected_objects[0]
-                vg = mesh.vertex_groups.get(bone.name)
-                if vg:
-                    weights = [vg.weight(v.index) for v in mesh.data.vertices if vg.weight(v.index) > 0]
-                    if weights:
-                        avg = sum(weights) / len(weights)
-                        if avg < 0.2:
-                            issues.append(f"⚠️ Geringer Einfluss: {bone.name} (Avg: {avg:.2f})")
-                            weight_issues += 1
-
-        # 2. Root-Bone check
-        root_bones = [b for b in armature.pose.bones if not b.parent]
-        if len(root_bones) != 1:
+        issues = []
+        for issue in report['issues']['non_uniform_scale']:
+            issues.append(f"⚠️ Nicht-uniforme Skalierung: {issue['message']}")
+        for issue in report['issues']['tiny_bones']:
+            issues.append(f"⚠️ Extrem kurzer Knochen: {issue['message']}")
+        for issue in report['issues']['weak_weights']:
+            issues.append(f"⚠️ Geringer Einfluss: {issue['message']}")
+        if report['issues']['extra_roots']:
             issues.append("⚠️ Mehrere Root-Bones vorhanden")
 
         # 3. Ergebnis anzeigen
@@ -2815,57 +3127,31 @@ class ARMATURE_OT_validate_rig(Operator):
 # ------------------------------------------------------------------------
         
 class OBJECT_OT_apply_all_transforms(Operator):
-    """Wendet alle Transformationen (Location, Rotation, Scale) auf das ausgewählte Objekt an"""
+    """Wendet alle Transformationen (Location, Rotation, Scale) auf die ausgewählten Objekte an"""
     bl_idname = "object.apply_all_transforms"
     bl_label = "Apply All Transforms"
     bl_options = {'REGISTER', 'UNDO'}
-    
+
+    clear_pose: BoolProperty(name="Pose zurücksetzen", description="Pose-Transformationen der Armatures zurücksetzen", default=True)
+
     @classmethod 
     def poll(cls, context):
         return context.active_object is not None
 
     def execute(self, context):
         try:
-            # Store current selection
-            original_active = context.active_object
-            selected_objects = context.selected_objects
-            
-            # Process all selected objects
-            for obj in selected_objects:
-                # Ensure we're in object mode
-                if obj.mode != 'OBJECT':
-                    bpy.ops.object.mode_set(mode='OBJECT')
-                
-                # Make object active and selected
-                bpy.ops.object.select_all(action='DESELECT')
-                obj.select_set(True)
-                context.view_layer.objects.active = obj
-                
-                # Apply transforms with matrix backup
-                original_matrix = obj.matrix_world.copy()
-                bpy.ops.object.transform_apply(
-                    location=True,
-                    rotation=True,
-                    scale=True
-                )
-                
-                # Restore original position
-                obj.matrix_world = original_matrix
-                
-                # Special handling for armatures
-                if obj.type == 'ARMATURE':
-                    # Apply transforms to pose bones
-                    bpy.ops.object.mode_set(mode='POSE')
-                    bpy.ops.pose.transforms_clear()
-                    bpy.ops.object.mode_set(mode='OBJECT')
-            
-            # Restore original selection
-            bpy.ops.object.select_all(action='DESELECT')
-            for obj in selected_objects:
-                obj.select_set(True)
-            context.view_layer.objects.active = original_active
-            
-            self.report({'INFO'}, "Transforms applied to {} objects".format(len(selected_objects)))
+            # Daten werden direkt transformiert: Edit-Daten vorher zurückschreiben
+            if context.mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode='OBJECT')
+
+            # Alle Objekte in einem Durchgang, Kinder behalten ihre Weltposition, ein Depsgraph-Update am Ende
+            stats = transform_apply.apply_transforms(context.selected_objects, context.scene.objects,
+                                                     context.view_layer, clear_poses=self.clear_pose)
+
+            for name, reason in stats['skipped']:
+                self.report({'WARNING'}, f"{name} übersprungen: {reason}")
+            self.report({'INFO'}, f"Transforms applied to {stats['applied']} objects "
+                                  f"({stats['children']} children, {stats['modifiers']} modifier values adjusted)")
             return {'FINISHED'}
             
         except Exception as e:
@@ -2907,11 +3193,15 @@ class OBJECT_OT_fix_deformations(Operator):
                 self.report({'ERROR'}, "No armature selected")
                 return {'CANCELLED'}
             
-            # === 1. Store original scale ===
-            original_scale = armature.scale.copy()
+            # === 1. Measure the meshes before any change (world space, cached) ===
+            mesh_size = max(measure.size(context, [mesh]) for mesh in meshes) if meshes else 1.0
             
-            # === 2. Apply transforms FIRST ===
-            bpy.ops.object.transform_apply(scale=True)
+            # === 2. Bake the scale once at data level, world size stays the same ===
+            if context.mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode='OBJECT')
+            for obj in [armature] + meshes:
+                if transform_apply.can_apply(obj)[0]:
+                    transform_apply.apply_scale(obj, obj.children, context.view_layer)
             
             # === 3. Proportional bone adjustments ===
             bpy.ops.object.mode_set(mode='EDIT')
@@ -2920,7 +3210,6 @@ class OBJECT_OT_fix_deformations(Operator):
             root_bones = [b for b in armature.data.edit_bones if not b.parent]
             if root_bones:
                 ref_length = sum(b.length for b in root_bones)
-                mesh_size = max(mesh.dimensions.length for mesh in meshes) if meshes else 1.0
                 size_ratio = mesh_size / max(ref_length, 0.0001)
                 
                 for bone in armature.data.edit_bones:
@@ -2931,11 +3220,7 @@ class OBJECT_OT_fix_deformations(Operator):
             
             bpy.ops.object.mode_set(mode='OBJECT')
             
-            # === 4. Restore original proportions ===
-            armature.scale = original_scale
-            bpy.ops.object.transform_apply(scale=True)
-            
-            # === 5. Weight reprocessing ===
+            # === 4. Weight reprocessing ===
             for mesh in meshes:
                 # Clean vertex groups
                 vgroups = mesh.vertex_groups
@@ -2980,7 +3265,20 @@ class OBJECT_PT_mixamo_bone_panel(Panel):
         config_box.label(text="1. Configuration", icon='SETTINGS')
         
         # Preset Selection
-        config_box.prop(props, "preset", text="Rig Preset")
+        row = config_box.row(align=True)
+        row.prop(props, "preset", text="Rig Preset")
+        row.operator("object.detect_preset", text="", icon='VIEWZOOM')
+
+        # Ranking of the last preset detection
+        obj = context.active_object
+        ranking = preset_rankings.get(obj.name) if obj else None
+        if ranking:
+            col = config_box.column(align=True)
+            for score, key, label in ranking[:3]:
+                row = col.row(align=True)
+                row.label(text=f"{label}: {score:.0%}")
+                op = row.operator("object.detect_preset", text="", icon='CHECKMARK')
+                op.preset_key = key
         
         # Prefix Handling
         row = config_box.row()
@@ -3038,11 +3336,18 @@ class OBJECT_PT_mixamo_bone_panel(Panel):
         hand_row.prop(props, "apply_left_hand", toggle=True, text="Left")
         hand_row.prop(props, "apply_right_hand", toggle=True, text="Right")        
         hand_col.operator("object.apply_hand_data", text="Apply Hand Pose", icon='HAND')
+        hand_col.prop(props, "hand_blend_left", slider=True)
+        hand_col.prop(props, "hand_blend_right", slider=True)
 
         # Bento Full Pose Controls
         bento_col = pose_box.column(align=True)
         bento_col.label(text="Full Body Pose:")
         bento_col.operator("object.apply_bento_data", text="Apply Bento Pose", icon='OUTLINER_OB_ARMATURE')
+        bento_col.prop(props, "bento_blend_spine", slider=True)
+        bento_col.prop(props, "bento_blend_hands", slider=True)
+        bento_col.prop(props, "bento_blend_face", slider=True)
+        bento_col.prop(props, "bento_blend_body", slider=True)
+        bento_col.prop(props, "pose_blend_base", text="Blend From")
 
         # Advanced Pose Controls
         adv_col = pose_box.column(align=True)
@@ -3068,11 +3373,36 @@ class OBJECT_PT_mixamo_bone_panel(Panel):
         
         # Weight Tools
         weight_box.prop(props, "weight_threshold", slider=True)
-        weight_box.prop(props, "harden_joints")
+        row = weight_box.row(align=True)
+        row.prop(props, "max_influences")
+        row.prop(props, "normalize_weights")
+        row = weight_box.row(align=True)
+        row.prop(props, "use_split_rules", text="")
+        sub = row.row(align=True)
+        sub.active = props.use_split_rules
+        sub.prop(props, "split_rules_file", text="Split Rules")
+        row = weight_box.row(align=True)
+        row.prop(props, "harden_joints")
+        sub = row.row(align=True)
+        sub.active = props.harden_joints
+        sub.prop(props, "harden_power")
+        sub.prop(props, "harden_radius")
+        row = weight_box.row(align=True)
+        row.prop(props, "smooth_iterations")
+        sub = row.row(align=True)
+        sub.active = props.smooth_iterations > 0
+        sub.prop(props, "smooth_factor", slider=True)
+        sub.prop(props, "smooth_groups", text="")
         
         row = weight_box.row(align=True)
         row.operator("object.optimize_weights", text="Optimize Weights")
         row.operator("object.auto_weighting", text="Auto Weights")
+        row.operator("object.mirror_weights", text="Mirror", icon='MOD_MIRROR')
+        row = weight_box.row(align=True)
+        row.prop(props, "auto_weight_proxy")
+        sub = row.row(align=True)
+        sub.active = props.auto_weight_proxy
+        sub.prop(props, "proxy_ratio", slider=True)
         
         # Weight Presets
         row = weight_box.row(align=True)
@@ -3089,9 +3419,26 @@ class OBJECT_PT_mixamo_bone_panel(Panel):
         col.operator("armature.validate_rig", text="Validate Rig", icon='CHECKMARK')
         col.operator("armature.bone_info", text="Bone Info", icon='INFO')
         
+        # Live Validation (gecachte Ergebnisse, kein Neuberechnen beim Zeichnen)
+        validate_box.prop(context.scene.bone_mapping_props, "live_validation", icon='REC')
+        armature = context.active_object
+        if live_validation.is_running() and armature and armature.type == 'ARMATURE':
+            report = live_validation.cached_report(armature)
+            col = validate_box.column(align=True)
+            if report is None:
+                col.label(text="Checking...", icon='TIME')
+            elif report['ok']:
+                col.label(text=f"No issues ({report['bones']} bones)", icon='CHECKMARK')
+            else:
+                for name, count in report['counts'].items():
+                    if count:
+                        col.label(text=f"{rig_validation.RULES[name].title}: {count}", icon='ERROR')
+        
         # Cleanup Tools
         col = validate_box.column(align=True)
-        col.operator("object.fix_bone_structure", text="Fix Structure", icon='TOOL_SETTINGS')
+        row = col.row(align=True)
+        row.operator("object.fix_bone_structure", text="Fix Structure", icon='TOOL_SETTINGS')
+        row.operator("object.fix_bone_structure", text="", icon='HIDE_OFF').dry_run = True
         col.operator("object.remove_unwanted_bones", text="Remove Unused Bones", icon='TRASH')
         col.operator("object.repair_pairing", text="Repair Connections", icon='CONSTRAINT_BONE')
 
@@ -3121,6 +3468,8 @@ class OBJECT_PT_mixamo_bone_panel(Panel):
         col = final_box.column(align=True)
         col.operator("object.apply_all_transforms", text="Apply All Transforms", icon='CON_LOCLIKE')
         #col.operator("export_scene.opensim_dae", text="Export OpenSim DAE", icon='EXPORT')
+        col.operator("export_anim.opensim_bvh", text="Export BVH", icon='ARMATURE_DATA')
+        col.operator("export_anim.opensim_anim", text="Export .anim", icon='ACTION')
 
 # ------------------------------------------------------------------------
 # REGISTRATION
@@ -3130,7 +3479,9 @@ def register():
     bpy.utils.register_class(OBJECT_OT_import_mapping)
     bpy.utils.register_class(OBJECT_OT_export_mapping)
     bpy.utils.register_class(OBJECT_OT_rename_mixamo_bones)
+    bpy.utils.register_class(OBJECT_OT_detect_preset)
     bpy.utils.register_class(OBJECT_OT_optimize_weights)
+    bpy.utils.register_class(OBJECT_OT_mirror_weights)
     bpy.utils.register_class(OBJECT_PT_mixamo_bone_panel)
     bpy.utils.register_class(OBJECT_OT_auto_parenting)
     bpy.utils.register_class(OBJECT_OT_save_weights_json)
@@ -3147,6 +3498,8 @@ def register():
     bpy.utils.register_class(OBJECT_OT_fix_bone_roll)
     bpy.utils.register_class(OBJECT_OT_apply_rest_pose)
     bpy.utils.register_class(OBJECT_OT_export_opensim_dae)
+    bpy.utils.register_class(OBJECT_OT_export_opensim_bvh)
+    bpy.utils.register_class(OBJECT_OT_export_opensim_anim)
 
     bpy.utils.register_class(OBJECT_OT_repair_pairing)
     bpy.utils.register_class(OBJECT_OT_remove_unwanted_bones)
@@ -3164,13 +3517,19 @@ def register():
     
     
     bpy.types.Scene.bone_mapping_props = PointerProperty(type=BoneMappingProperties)
+    weight_table.register_handlers()
+    measure.register_handlers()
+    bpy.app.handlers.load_post.append(restore_live_validation)
+    bpy.app.handlers.load_post.append(clear_pose_caches)
 
 def unregister():
     bpy.utils.unregister_class(BoneMappingProperties)
     bpy.utils.unregister_class(OBJECT_OT_import_mapping)
     bpy.utils.unregister_class(OBJECT_OT_export_mapping)
     bpy.utils.unregister_class(OBJECT_OT_rename_mixamo_bones)
+    bpy.utils.unregister_class(OBJECT_OT_detect_preset)
     bpy.utils.unregister_class(OBJECT_OT_optimize_weights)
+    bpy.utils.unregister_class(OBJECT_OT_mirror_weights)
     bpy.utils.unregister_class(OBJECT_PT_mixamo_bone_panel)
     bpy.utils.unregister_class(OBJECT_OT_auto_parenting)
     bpy.utils.unregister_class(OBJECT_OT_auto_weighting)
@@ -3184,6 +3543,8 @@ def unregister():
     bpy.utils.unregister_class(ARMATURE_OT_validate_rig)
     bpy.utils.unregister_class(OBJECT_OT_apply_all_transforms)
 
+    bpy.utils.unregister_class(OBJECT_OT_export_opensim_anim)
+    bpy.utils.unregister_class(OBJECT_OT_export_opensim_bvh)
     bpy.utils.unregister_class(OBJECT_OT_export_opensim_dae)
     bpy.utils.unregister_class(OBJECT_OT_apply_rest_pose)
     bpy.utils.unregister_class(OBJECT_OT_fix_bone_roll)
@@ -3201,6 +3562,14 @@ def unregister():
 
     bpy.utils.unregister_class(OBJECT_OT_auto_scale_bones)
 
+    weight_table.unregister_handlers()
+    measure.unregister_handlers()
+    if restore_live_validation in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(restore_live_validation)
+    if clear_pose_caches in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(clear_pose_caches)
+    pose_blend.clear_pose_blenders()
+    live_validation.stop()
     del bpy.types.Scene.bone_mapping_props
 
 if __name__ == "__main__":
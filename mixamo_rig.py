@@ -3,8 +3,10 @@ import math
 from math import *
 from mathutils import *
 from bpy.types import Panel, UIList
+from bpy_extras.io_utils import ExportHelper
 from .utils import *
 from .define import *
+from .lib import anim_bake, gltf_writer
 
 
 # OPERATOR CLASSES
@@ -34,13 +36,26 @@ class MR_OT_update(bpy.types.Operator):
 
 
 
-class MR_OT_exportGLTF(bpy.types.Operator):
-    """Export to GLTF format"""
+class MR_OT_exportGLTF(bpy.types.Operator, ExportHelper):
+    """Export the character with every action of the rig as glTF animations (.glb), baked to the deform bones"""
 
     bl_idname = "mr.export_gltf"
-    bl_label = "export_gltf"
+    bl_label = "Export GLTF Clips"
     bl_options = {'UNDO'}
 
+    filename_ext = ".glb"
+    filter_glob: bpy.props.StringProperty(default="*.glb", options={'HIDDEN'})
+
+    all_actions: bpy.props.BoolProperty(name="All Actions", default=True,
+                                        description="Export every action of the rig, otherwise only the active one")
+    frame_step: bpy.props.IntProperty(name="Frame Step", default=1, min=1, max=10,
+                                      description="Sample every n-th frame")
+    use_key_reduction: bpy.props.BoolProperty(name="Reduce Keys", default=True,
+                                              description="Drop keys that linear interpolation reproduces")
+    tolerance: bpy.props.FloatProperty(name="Tolerance", default=0.0005, min=0.0, max=0.1, precision=4,
+                                       description="Maximum channel error of the key reduction")
+    max_influences: bpy.props.IntProperty(name="Max Influences", default=4, min=1, max=4)
+
     @classmethod
     def poll(cls, context):
         if context.active_object:
@@ -49,11 +64,34 @@ class MR_OT_exportGLTF(bpy.types.Operator):
 
 
     def execute(self, context):
+        armature = context.active_object
+        if self.all_actions:
+            actions = None
+        else:
+            anim = armature.animation_data
+            if anim is None or anim.action is None:
+                self.report({'ERROR'}, "No active action on the rig")
+                return {'CANCELLED'}
+            actions = [anim.action]
+
+        if not len(anim_bake.DeformSkeleton(armature)):
+            self.report({'ERROR'}, "The rig has no deform bones")
+            return {'CANCELLED'}
+
+        mode = armature.mode
+        if mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
         try:
-            bpy.ops.export_scene.gltf()
+            stats = gltf_writer.export(context, armature, self.filepath, actions=actions, step=self.frame_step,
+                                       tolerance=self.tolerance if self.use_key_reduction else 0.0,
+                                       max_influences=self.max_influences)
         finally:
-            pass
+            if mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode=mode)
 
+        self.report({'INFO'}, f"{stats['clips']} clips, {stats['joints']} joints, {stats['keys']} keys, "
+                              f"{stats['meshes']} meshes in {stats['time']:.2f}s, "
+                              f"{stats['bytes'] / 1024:.1f} KB")
         return {'FINISHED'}
 
 
@@ -2785,7 +2823,8 @@ class MR_PT_MenuExport(Panel, MixamoRigPanel):
 
     def draw(self, context):
         layt = self.layout
-        layt.operator('export_scene.gltf', text="GLTF Export...")#MR_OT_exportGLTF.bl_idname
+        layt.operator(MR_OT_exportGLTF.bl_idname, text="GLTF Clips Export...")
+        layt.operator('export_scene.gltf', text="GLTF Export...")
 
 
 ###########  REGISTER  ##################
@@ -0,0 +1,149 @@
+"""
+HEADLESS RIG VALIDATION
+- Opens every .blend file (a single file or all files of a directory) in one `blender -b` session
+- Validates every armature with the rig validation engine, no mode changes
+- Writes one JSON report: per file, per armature the issues of every rule
+
+Usage (plain Python, Blender on PATH or via --blender, or directly with blender -b --python):
+    python validate_rigs.py FILE_OR_DIR --output report.json
+    python validate_rigs.py FILE_OR_DIR --output report.json --rules missing wrong_parents --parents bone_parents.json
+
+Exit code: 0 all rigs clean, 2 issues found, 1 error.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import subprocess
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_NAME = os.path.basename(ADDON_DIR)
+
+
+# ------------------------------------------------------------------------
+# ARGUMENTS
+# ------------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless rig validation with JSON report")
+    parser.add_argument("input", help=".blend file or directory")
+    parser.add_argument("--output", default="rig_report.json", help="JSON report file")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Blender executable")
+    parser.add_argument("--rules", nargs="*", default=None, help="Rules to run (default: all)")
+    parser.add_argument("--parents", default="", help="JSON file {bone: parent} (default: addon bone_parents)")
+    parser.add_argument("--root", default="mPelvis", help="Expected root bone ('' = only one root allowed)")
+    parser.add_argument("--no-weights", action="store_true", help="Skip the weight statistics of the meshes")
+    return parser
+
+
+# ------------------------------------------------------------------------
+# WORKER (runs inside Blender)
+# ------------------------------------------------------------------------
+def enable_addon():
+    import addon_utils
+
+    addon_parent = os.path.dirname(ADDON_DIR)
+    if addon_parent not in sys.path:
+        sys.path.insert(0, addon_parent)
+    addon_utils.enable(ADDON_NAME, default_set=True)
+
+
+def find_blend_files(path):
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        files.extend(os.path.join(root, name) for name in names if name.lower().endswith(".blend"))
+    return sorted(files)
+
+
+def load_parents(args):
+    if args.parents:
+        with open(args.parents, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return importlib.import_module(ADDON_NAME + ".mixamo_rename_opensim").load_bone_parents()
+
+
+def validate_file(engine, filepath, args, bone_parents):
+    result = {"file": filepath, "armatures": []}
+    t0 = time.perf_counter()
+    try:
+        bpy.ops.wm.open_mainfile(filepath=filepath, load_ui=False)
+        objects = list(bpy.data.objects)
+        for armature in (o for o in objects if o.type == 'ARMATURE'):
+            meshes = [] if args.no_weights else engine.deformed_meshes(armature, objects)
+            result["armatures"].append(engine.validate(armature, meshes, args.rules,
+                                                       bone_parents=bone_parents, root=args.root or None))
+    except Exception as e:
+        result["error"] = str(e)
+    result["time"] = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def run_worker(args):
+    enable_addon()
+    engine = importlib.import_module(ADDON_NAME + ".lib.rig_validation")
+    bone_parents = load_parents(args)
+
+    files = find_blend_files(args.input)
+    results = [validate_file(engine, f, args, bone_parents) for f in files]
+
+    summary = {
+        "files": len(results),
+        "armatures": sum(len(r["armatures"]) for r in results),
+        "failed": sum(1 for r in results if "error" in r),
+        "with_issues": sum(1 for r in results for a in r["armatures"] if not a["ok"]),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    engine.write_json(args.output, summary)
+
+    for r in results:
+        for a in r["armatures"]:
+            status = "OK    " if a["ok"] else "ISSUES"
+            counts = ", ".join(f"{k}={v}" for k, v in a["counts"].items() if v)
+            print(f"  {status} {os.path.basename(r['file'])}: {a['armature']} {counts}")
+        if "error" in r:
+            print(f"  ERROR  {os.path.basename(r['file'])}: {r['error']}")
+    print(f"{summary['armatures']} armatures in {summary['files']} files, {summary['with_issues']} with issues")
+
+    if summary["failed"]:
+        return 1
+    return 2 if summary["with_issues"] else 0
+
+
+# ------------------------------------------------------------------------
+# LAUNCHER (plain Python)
+# ------------------------------------------------------------------------
+def launch_blender(args):
+    cmd = [args.blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--"]
+    cmd += [os.path.abspath(args.input), "--output", os.path.abspath(args.output)]
+    if args.rules is not None:
+        cmd += ["--rules"] + args.rules
+    if args.parents:
+        cmd += ["--parents", os.path.abspath(args.parents)]
+    cmd += ["--root", args.root]
+    if args.no_weights:
+        cmd.append("--no-weights")
+    return subprocess.run(cmd).returncode
+
+
+def main(argv):
+    args = build_parser().parse_args(argv)
+    if bpy is None:
+        return launch_blender(args)
+    return run_worker(args)
+
+
+if __name__ == "__main__":
+    # inside Blender the script arguments follow "--"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    code = main(argv)
+    sys.exit(code)